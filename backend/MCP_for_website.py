@@ -1,7 +1,9 @@
 import os
+import time
 import asyncio
+from contextlib import asynccontextmanager
 from typing import List, Dict, Optional
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
@@ -9,7 +11,16 @@ import logging
 
 # 导入自定义模块
 from .spark_api import SparkAPI
-from .crawlers import CrawlerManager, InterviewExperience
+from .crawlers import CrawlerManager, InterviewExperience, QUERY_KEYWORD_COUNT, build_query
+from .query_planner import QueryPlanner
+from .prewarm import PrewarmScheduler, prewarm_enabled
+from .keyword_extractor import get_keyword_extractor
+from .metrics import (ANALYSES_IN_FLIGHT, CONTENT_TYPE, CRAWLS_IN_FLIGHT, ERRORS, HTTP_IN_FLIGHT, HTTP_REQUESTS,
+                      HTTP_SECONDS, SPARK_REQUESTS, STAGE_SECONDS, render_latest)
+from .tracing import REQUEST_ID_HEADER, TRACE_ID_HEADER, start_span, trace_middleware
+from .profiling import require_admin, router as admin_router
+from .circuit_breaker import CircuitBreaker
+from .health import create_health_monitor, create_router as create_health_router
 
 # 加载环境变量
 load_dotenv()
@@ -18,11 +29,35 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """启动时开始后台健康检查与预热；退出时先停止预热并排空，等待进行中的分析和爬取结束"""
+    health_monitor.start()
+    if controller.prewarm is not None:
+        controller.prewarm.start()
+    yield
+    health_monitor.draining = True
+    if controller.prewarm is not None:
+        await controller.prewarm.stop()
+    await wait_for_in_flight(float(os.getenv("GRACEFUL_TIMEOUT", "30")))
+    await health_monitor.stop()
+
+async def wait_for_in_flight(timeout: float):
+    """等待进行中的分析请求和爬取任务结束，最多等待timeout秒"""
+    deadline = time.monotonic() + timeout
+    while ANALYSES_IN_FLIGHT.value > 0 or CRAWLS_IN_FLIGHT.value > 0:
+        if time.monotonic() >= deadline:
+            logger.warning(f"等待超时，仍有 {int(ANALYSES_IN_FLIGHT.value)} 个分析、"
+                           f"{int(CRAWLS_IN_FLIGHT.value)} 个爬取任务未完成")
+            return
+        await asyncio.sleep(0.1)
+
 # 创建FastAPI应用
 app = FastAPI(
     title="面经爬取与分析系统",
     description="基于MCP架构的智能面经爬取系统，使用讯飞星火大模型分析职位JD",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 添加CORS中间件
@@ -32,8 +67,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[REQUEST_ID_HEADER, TRACE_ID_HEADER],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """记录每个请求的耗时与状态码，路由按模板聚合避免标签爆炸"""
+    start = time.perf_counter()
+    status = 500
+    HTTP_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        HTTP_REQUESTS.labels(request.method, path, status).inc()
+        HTTP_SECONDS.labels(request.method, path).observe(time.perf_counter() - start)
+
+# 追踪中间件最后注册，位于最外层，指标中间件的耗时也计入请求span
+app.middleware("http")(trace_middleware("backend"))
+
+# 剖析接口，未设置 ADMIN_TOKEN 时全部返回404
+app.include_router(admin_router)
+
 # Model: 数据模型定义
 class JobDescription(BaseModel):
     """职位描述模型"""
@@ -64,6 +123,15 @@ class InterviewAnalysisContext:
     def __init__(self):
         """初始化上下文管理器"""
         self.spark_api = None
+        self.keyword_extractor = get_keyword_extractor()
+        # 讯飞星火提取关键词的超时时间，超时后使用本地提取器
+        self.spark_timeout = float(os.getenv("SPARK_KEYWORD_TIMEOUT", "8"))
+        # 连续失败后熔断，冷却期内直接使用本地提取器，不再等待超时
+        self.spark_breaker = CircuitBreaker(
+            "spark",
+            failure_threshold=int(os.getenv("SPARK_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("SPARK_BREAKER_RESET", "30"))
+        )
         self._initialize_spark_api()
     
     def _initialize_spark_api(self):
@@ -85,46 +153,58 @@ class InterviewAnalysisContext:
     
     async def analyze_job_description(self, job: JobDescription) -> List[str]:
         """分析职位描述，提取关键词"""
+        keywords = await self.extract_spark_keywords(job)
+        if keywords:
+            return keywords
+        
+        # 备用方案：基于规则的关键词提取
+        logger.info("使用备用关键词提取方案")
+        return self._extract_keywords_fallback(job)
+    
+    async def extract_spark_keywords(self, job: JobDescription) -> List[str]:
+        """使用讯飞星火API提取关键词，未配置、超时或失败时返回空列表"""
+        if not self.spark_api:
+            return []
+        if not self.spark_breaker.allow():
+            SPARK_REQUESTS.labels("circuit_open").inc()
+            return []
         try:
-            if self.spark_api:
-                # 使用讯飞星火API分析
-                keywords = await self.spark_api.analyze_job_keywords(
-                    job.position, job.company, job.requirements
+            with start_span("spark.keywords"), STAGE_SECONDS.labels("spark_keywords").time():
+                keywords = await asyncio.wait_for(
+                    self.spark_api.analyze_job_keywords(job.position, job.company, job.requirements),
+                    timeout=self.spark_timeout
                 )
-                if keywords:
-                    logger.info(f"成功提取关键词: {keywords}")
-                    return keywords
-            
-            # 备用方案：基于规则的关键词提取
-            logger.info("使用备用关键词提取方案")
-            return self._extract_keywords_fallback(job)
-            
+            if keywords:
+                logger.info(f"成功提取关键词: {keywords}")
+                self.spark_breaker.record_success()
+            else:
+                # SparkAPI在鉴权失败、配额耗尽等情况下返回空结果
+                self.spark_breaker.record_failure("empty response")
+            SPARK_REQUESTS.labels("ok" if keywords else "empty").inc()
+            return keywords
+        except asyncio.CancelledError:
+            # 客户端断开、关闭或对冲任务被取消，试探调用没有结果，释放名额以便下次再试
+            self.spark_breaker.release()
+            raise
+        except asyncio.TimeoutError:
+            self.spark_breaker.record_failure("timeout")
+            SPARK_REQUESTS.labels("timeout").inc()
+            logger.warning(f"讯飞星火提取关键词超时({self.spark_timeout}s)，使用本地提取器")
         except Exception as e:
+            self.spark_breaker.record_failure(str(e))
+            SPARK_REQUESTS.labels("error").inc()
             logger.error(f"分析职位描述失败: {str(e)}")
-            return self._extract_keywords_fallback(job)
+        return []
     
     def _extract_keywords_fallback(self, job: JobDescription) -> List[str]:
-        """备用关键词提取方案"""
-        keywords = []
-        
-        # 从职位名称提取
-        position_keywords = job.position.lower().split()
-        keywords.extend(position_keywords)
+        """备用关键词提取方案：基于技能词典的本地提取，无网络请求"""
+        keywords = [job.position]
+        with start_span("keywords.local"), STAGE_SECONDS.labels("keyword_extraction").time():
+            keywords.extend(self.keyword_extractor.extract(job.position, job.requirements))
         
-        # 从要求中提取技术关键词
-        tech_keywords = [
-            'python', 'java', 'javascript', 'react', 'vue', 'django', 'flask',
-            'mysql', 'redis', 'mongodb', 'docker', 'kubernetes', 'aws', 'git',
-            'linux', 'nginx', 'spring', 'node.js', 'typescript', 'golang'
-        ]
-        
-        requirements_lower = job.requirements.lower()
-        for keyword in tech_keywords:
-            if keyword in requirements_lower:
-                keywords.append(keyword)
-        
-        # 添加通用面试关键词
-        keywords.extend([job.position, '面试', '面经'])
+        # 词典未命中任何词条时，补充通用面试关键词
+        if len(keywords) == 1:
+            keywords.extend(['面试', '面经'])
         
         # 去重并返回前8个
         unique_keywords = list(dict.fromkeys(keywords))
@@ -138,47 +218,122 @@ class InterviewController:
         """初始化控制器"""
         self.context = InterviewAnalysisContext()
         self.crawler_manager = CrawlerManager()
+        # 查询规划：每组关键词生成多个查询变体，在全局预算内并行爬取并去重
+        self.query_planner = QueryPlanner(self.crawler_manager) \
+            if os.getenv("QUERY_PLANNER", "True").lower() == "true" else None
+        # 对冲模式：本地关键词立即开始爬取，讯飞星火结果返回后只补爬新增关键词
+        self.hedged = os.getenv("HEDGED_CRAWL", "True").lower() == "true"
+        # 预热：记录各岗位的请求频率，低峰期提前爬取热门岗位写入缓存
+        self.prewarm = PrewarmScheduler(self) if prewarm_enabled() else None
+    
+    def prewarm_queries(self, position: str, company: str = "", requirements: str = "") -> List[str]:
+        """预热使用的查询：与分析请求相同的规划方式，关键词来自本地提取器"""
+        job = JobDescription(position=position, company=company, requirements=requirements)
+        keywords = self.context._extract_keywords_fallback(job)
+        if self.query_planner is not None:
+            return self.query_planner.plan(keywords, position, company)
+        return [build_query(keywords)]
+    
+    async def _hedged_crawl(self, job: JobDescription):
+        """本地提取与讯飞星火并行，爬取不等待大模型返回
+
+        :return: (关键词列表, 合并去重后的面经列表)
+        """
+        local_keywords = self.context._extract_keywords_fallback(job)
+        logger.info(f"本地关键词: {local_keywords}，立即开始爬取")
+        
+        spark_task = asyncio.create_task(self.context.extract_spark_keywords(job))
+        if self.query_planner is not None:
+            # 讯飞星火的关键词生成的新变体追加到同一个计划，共享预算、去重与早停
+            plan = self.query_planner.new_plan()
+            crawl_tasks = [asyncio.create_task(
+                plan.run(self.query_planner.plan(local_keywords, job.position, job.company)))]
+            spark_keywords = await spark_task
+            if spark_keywords:
+                crawl_tasks.append(asyncio.create_task(
+                    plan.run(self.query_planner.plan(spark_keywords, job.position, job.company))))
+            await asyncio.gather(*crawl_tasks)
+            logger.info(f"查询规划完成: {plan.yields}，停止原因: {plan.stop_reason or 'planned'}")
+            return spark_keywords or local_keywords, plan.experiences
+        
+        crawl_tasks = [asyncio.create_task(self.crawler_manager.crawl_all_platforms(local_keywords))]
+        
+        spark_keywords = await spark_task
+        keywords = spark_keywords or local_keywords
+        
+        # 只有实际进入查询的关键词算作已覆盖
+        covered = {kw.lower() for kw in local_keywords[:QUERY_KEYWORD_COUNT]}
+        missing = [kw for kw in spark_keywords if kw.lower() not in covered]
+        if missing:
+            logger.info(f"讯飞星火新增关键词: {missing}，补充爬取")
+            # 每个查询只用前 QUERY_KEYWORD_COUNT 个关键词，按组拆分，每组一个查询
+            for i in range(0, len(missing), QUERY_KEYWORD_COUNT):
+                crawl_tasks.append(asyncio.create_task(
+                    self.crawler_manager.crawl_all_platforms(missing[i:i + QUERY_KEYWORD_COUNT])))
+        
+        results = await asyncio.gather(*crawl_tasks)
+        return keywords, self.crawler_manager.merge_results(*results)
     
     async def process_job_analysis(self, job: JobDescription) -> AnalysisResult:
         """处理职位分析请求"""
+        ANALYSES_IN_FLIGHT.inc()
         try:
             logger.info(f"开始分析职位: {job.position} - {job.company}")
+            if self.prewarm is not None:
+                self.prewarm.record(job.position, job.company, job.requirements)
             
-            # 1. 分析职位描述，提取关键词
-            keywords = await self.context.analyze_job_description(job)
-            if not keywords:
-                raise HTTPException(status_code=400, detail="无法提取有效关键词")
-            
-            logger.info(f"提取到关键词: {keywords}")
-            
-            # 2. 爬取面经
-            experiences = await self.crawler_manager.crawl_all_platforms(keywords)
-            
-            # 3. 统计结果
-            platform_stats = {}
-            for exp in experiences:
-                platform = exp.source
-                platform_stats[platform] = platform_stats.get(platform, 0) + 1
-            
-            logger.info(f"爬取完成，共获取 {len(experiences)} 条面经")
+            if self.hedged and self.context.spark_api:
+                # 1-2. 关键词提取与爬取并行
+                with start_span("crawl.hedged"), STAGE_SECONDS.labels("crawl").time():
+                    keywords, experiences = await self._hedged_crawl(job)
+            else:
+                # 1. 分析职位描述，提取关键词
+                keywords = await self.context.analyze_job_description(job)
+                if not keywords:
+                    raise HTTPException(status_code=400, detail="无法提取有效关键词")
+                
+                logger.info(f"提取到关键词: {keywords}")
+                
+                # 2. 爬取面经
+                with start_span("crawl"), STAGE_SECONDS.labels("crawl").time():
+                    if self.query_planner is not None:
+                        experiences = await self.query_planner.crawl(keywords, job.position, job.company)
+                    else:
+                        experiences = await self.crawler_manager.crawl_all_platforms(keywords)
             
-            # 4. 构建返回结果
-            result = AnalysisResult(
-                keywords=keywords,
-                experiences=[exp.to_dict() for exp in experiences],
-                total_count=len(experiences),
-                platform_stats=platform_stats
-            )
+            with start_span("response.build"), STAGE_SECONDS.labels("response_build").time():
+                # 3. 统计结果
+                platform_stats = {}
+                for exp in experiences:
+                    platform = exp.source
+                    platform_stats[platform] = platform_stats.get(platform, 0) + 1
+                
+                logger.info(f"爬取完成，共获取 {len(experiences)} 条面经")
+                
+                # 4. 构建返回结果
+                result = AnalysisResult(
+                    keywords=keywords,
+                    experiences=[exp.to_dict() for exp in experiences],
+                    total_count=len(experiences),
+                    platform_stats=platform_stats
+                )
             
             return result
             
         except Exception as e:
+            ERRORS.labels("controller", type(e).__name__).inc()
             logger.error(f"处理职位分析请求失败: {str(e)}")
             raise HTTPException(status_code=500, detail=f"处理请求失败: {str(e)}")
+        finally:
+            ANALYSES_IN_FLIGHT.dec()
 
 # 全局控制器实例
 controller = InterviewController()
 
+# 健康检查：依赖状态由后台任务缓存，/health 与 /ready 只读缓存
+health_monitor = create_health_monitor(controller.context)
+app.include_router(create_health_router(health_monitor))
+
 # API路由定义
 @app.get("/")
 async def root():
@@ -189,10 +344,10 @@ async def root():
         "description": "基于MCP架构的智能面经爬取系统"
     }
 
-@app.get("/health")
-async def health_check():
-    """健康检查"""
-    return {"status": "healthy", "timestamp": asyncio.get_event_loop().time()}
+@app.get("/metrics")
+async def metrics():
+    """Prometheus格式的运行指标"""
+    return Response(content=render_latest(), media_type=CONTENT_TYPE)
 
 @app.post("/analyze", response_model=AnalysisResult)
 async def analyze_job_and_crawl(job: JobDescription) -> AnalysisResult:
@@ -216,6 +371,23 @@ async def extract_keywords_only(job: JobDescription) -> Dict[str, List[str]]:
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/admin/identities", dependencies=[Depends(require_admin)])
+async def identity_stats():
+    """各平台爬虫身份（User-Agent、代理出口、cookie配置）的近期延迟、错误率、得分与隔离状态"""
+    return {platform: crawler.identities.stats()
+            for platform, crawler in controller.crawler_manager.crawlers.items()}
+
+@app.get("/admin/routing", dependencies=[Depends(require_admin)])
+async def routing_stats():
+    """平台路由统计：各平台在各查询类别上的产出（条/秒）与样本数"""
+    router = controller.crawler_manager.router
+    return router.snapshot() if router is not None else {}
+
+@app.get("/admin/prewarm", dependencies=[Depends(require_admin)])
+async def prewarm_stats():
+    """预热状态：热门岗位的衰减请求数、上次预热时间与最近一轮的结果"""
+    return controller.prewarm.snapshot() if controller.prewarm is not None else {}
+
 @app.get("/platforms")
 async def get_supported_platforms():
     """获取支持的平台列表"""
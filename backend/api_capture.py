@@ -0,0 +1,219 @@
+"""
+搜索接口响应捕获
+
+知乎和小红书的搜索结果由页面发出的XHR接口填充。与其等渲染完成再抓DOM文本，
+不如直接监听该接口的响应，把结构化JSON解析成面经记录：字段完整（真实日期、点赞数、ID），
+拿到数据即可结束，省掉渲染等待。
+
+页面在 networkidle 之前都没有发出搜索接口请求时（如接口改版、夹具页面），
+wait() 返回None，调用方退回DOM解析。设置 CRAWL_API_CAPTURE=False 可关闭捕获。
+"""
+import asyncio
+import os
+import re
+from datetime import datetime, timedelta
+from fnmatch import translate
+from typing import Callable, Dict, List, Optional
+
+from .metrics import ERRORS
+
+# 等待搜索接口响应的最长时间(秒)
+API_CAPTURE_TIMEOUT = float(os.getenv("API_CAPTURE_TIMEOUT", "8"))
+
+ApiRecord = Dict[str, object]
+
+_TAG = re.compile(r"<[^>]+>")
+
+
+def _strip_tags(text: Optional[str]) -> str:
+    """去掉接口返回的高亮标签（如 <em>）"""
+    return _TAG.sub("", text or "").strip()
+
+
+def _parse_count(value) -> int:
+    """解析 "1.2万"、"10+"、"356" 这类计数"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value or "").strip().rstrip("+")
+    try:
+        if text.endswith("万"):
+            return int(float(text[:-1]) * 10000)
+        if text.endswith("千"):
+            return int(float(text[:-1]) * 1000)
+        return int(float(text)) if text else 0
+    except ValueError:
+        return 0
+
+
+def _normalize_date(text: str, now: Optional[datetime] = None) -> str:
+    """把 "3天前"、"昨天 12:30"、"05-01" 等相对或省略年份的日期转换为 YYYY-MM-DD"""
+    now = now or datetime.now()
+    text = (text or "").strip()
+    if not text:
+        return ""
+    if "刚刚" in text or "分钟前" in text or "小时前" in text or text.startswith("今天"):
+        return now.strftime("%Y-%m-%d")
+    if text.startswith("昨天"):
+        return (now - timedelta(days=1)).strftime("%Y-%m-%d")
+    if text.startswith("前天"):
+        return (now - timedelta(days=2)).strftime("%Y-%m-%d")
+    match = re.match(r"(\d+)\s*天前", text)
+    if match:
+        return (now - timedelta(days=int(match.group(1)))).strftime("%Y-%m-%d")
+    match = re.match(r"(\d{4})-(\d{1,2})-(\d{1,2})", text)
+    if match:
+        return f"{match.group(1)}-{int(match.group(2)):02d}-{int(match.group(3)):02d}"
+    match = re.match(r"(\d{1,2})-(\d{1,2})", text)
+    if match:
+        return f"{now.year}-{int(match.group(1)):02d}-{int(match.group(2)):02d}"
+    return ""
+
+
+def _timestamp_date(value) -> str:
+    """秒或毫秒时间戳转 YYYY-MM-DD"""
+    if not value:
+        return ""
+    value = float(value)
+    if value > 1e12:
+        value /= 1000
+    return datetime.fromtimestamp(value).strftime("%Y-%m-%d")
+
+
+def parse_zhihu_search(payload: Dict) -> List[ApiRecord]:
+    """解析知乎 /api/v4/search_v3 响应，只保留回答和文章"""
+    records = []
+    for entry in payload.get("data") or []:
+        obj = entry.get("object") or {}
+        kind = obj.get("type")
+        highlight = entry.get("highlight") or {}
+        if kind == "answer":
+            question = obj.get("question") or {}
+            title = question.get("name") or highlight.get("title")
+            url = f"https://www.zhihu.com/question/{question.get('id')}/answer/{obj.get('id')}"
+        elif kind == "article":
+            title = obj.get("title") or highlight.get("title")
+            url = f"https://zhuanlan.zhihu.com/p/{obj.get('id')}"
+        else:
+            continue
+        records.append({
+            "id": str(obj.get("id", "")),
+            "title": _strip_tags(title),
+            "content": _strip_tags(obj.get("excerpt") or highlight.get("description")),
+            "url": url,
+            "author": (obj.get("author") or {}).get("name", ""),
+            "date": _timestamp_date(obj.get("created_time") or obj.get("updated_time")),
+            "upvotes": _parse_count(obj.get("voteup_count")),
+        })
+    return records
+
+
+def parse_xiaohongshu_search(payload: Dict) -> List[ApiRecord]:
+    """解析小红书 /api/sns/web/v1/search/notes 响应"""
+    records = []
+    for item in (payload.get("data") or {}).get("items") or []:
+        if item.get("model_type", "note") != "note":
+            continue
+        card = item.get("note_card") or {}
+        note_id = item.get("id") or card.get("note_id", "")
+        url = f"https://www.xiaohongshu.com/explore/{note_id}"
+        if item.get("xsec_token"):
+            url += f"?xsec_token={item['xsec_token']}&xsec_source=pc_search"
+        date = _timestamp_date(card.get("time"))
+        if not date:
+            for tag in card.get("corner_tag_info") or []:
+                if tag.get("type") == "publish_time":
+                    date = _normalize_date(tag.get("text", ""))
+        records.append({
+            "id": str(note_id),
+            "title": _strip_tags(card.get("display_title") or card.get("title")),
+            "content": _strip_tags(card.get("desc")),
+            "url": url,
+            "author": (card.get("user") or {}).get("nickname") or (card.get("user") or {}).get("nick_name", ""),
+            "date": date,
+            "upvotes": _parse_count((card.get("interact_info") or {}).get("liked_count")),
+        })
+    return records
+
+
+# 平台 -> (搜索接口URL通配符, 解析函数)；通配符不含域名，夹具服务器同样适用
+SEARCH_APIS: Dict[str, tuple] = {
+    "zhihu": ("*/api/v4/search_v3*", parse_zhihu_search),
+    "xiaohongshu": ("*/api/sns/web/v1/search/notes*", parse_xiaohongshu_search),
+}
+
+
+def capture_enabled() -> bool:
+    return os.getenv("CRAWL_API_CAPTURE", "True").lower() == "true"
+
+
+class ResponseCapture:
+    """监听页面上的搜索接口响应并解析，滚动加载触发的后续分页响应依次排队"""
+
+    def __init__(self, platform: str, pattern: str, parser: Callable[[Dict], List[ApiRecord]]):
+        self.platform = platform
+        self.pattern = re.compile(translate(pattern))
+        self.parser = parser
+        self.requested = False
+        self._payloads: asyncio.Queue = asyncio.Queue()
+
+    def attach(self, page):
+        """在导航之前调用"""
+        page.on("request", self._on_request)
+        page.on("response", self._on_response)
+
+    def _on_request(self, request):
+        if self.pattern.match(request.url):
+            self.requested = True
+
+    async def _on_response(self, response):
+        if not self.pattern.match(response.url):
+            return
+        try:
+            records = self.parser(await response.json())
+        except Exception as e:
+            # 接口改版或返回了风控页面，等下一个响应或退回DOM解析
+            ERRORS.labels(self.platform, "api_capture").inc()
+            print(f"解析{self.platform}搜索接口响应失败: {str(e)}")
+            return
+        self._payloads.put_nowait(records)
+
+    async def wait(self, page, timeout: float = API_CAPTURE_TIMEOUT) -> Optional[List[ApiRecord]]:
+        """等到第一个接口响应到达即返回；networkidle时仍未发出接口请求或超时则返回None"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        first = asyncio.ensure_future(self._payloads.get())
+        idle = asyncio.ensure_future(page.wait_for_load_state("networkidle"))
+        try:
+            await asyncio.wait({first, idle}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if first.done():
+                return first.result()
+            if idle.done() and self.requested:
+                # 接口已发出但响应还没到
+                remaining = max(0.0, deadline - loop.time())
+                try:
+                    return await asyncio.wait_for(asyncio.shield(first), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            return None
+        finally:
+            first.cancel()
+            idle.cancel()
+            # 取走异常，避免页面关闭后出现未处理异常的警告
+            idle.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    async def next(self, timeout: float = API_CAPTURE_TIMEOUT) -> Optional[List[ApiRecord]]:
+        """等待下一个分页响应，超时返回None"""
+        try:
+            return await asyncio.wait_for(self._payloads.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+def start_capture(page, platform: str) -> Optional[ResponseCapture]:
+    """为支持的平台在页面上开始捕获，关闭或不支持时返回None"""
+    if not capture_enabled() or platform not in SEARCH_APIS:
+        return None
+    pattern, parser = SEARCH_APIS[platform]
+    capture = ResponseCapture(platform, pattern, parser)
+    capture.attach(page)
+    return capture
@@ -0,0 +1,257 @@
+"""
+浏览器状态复用
+
+每次爬取都从全新的浏览器上下文开始：没有cookie，也没有缓存的静态资源，
+更容易触发反爬验证页，需要额外的导航。这里提供两种跨爬取复用的状态：
+
+- ProfilePool：每个平台每个爬虫身份（identities.Identity）一份 storage state（cookie、localStorage），
+  新上下文载入所选身份的配置，身份池的轮换即配置的轮换；爬取结束后定期刷新保存，
+  遇到验证/登录页时作废该份配置，下次重新积累
+- AssetCache：脚本和样式表的磁盘缓存，由请求拦截层直接返回缓存内容，
+  多个工作进程共享同一目录
+
+目录默认位于 CACHE_DIR 下，CRAWL_PROFILES=False / ASSET_CACHE=False 分别关闭。
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+from .metrics import ERRORS, track_cache
+
+# 配置文件刷新间隔(秒)
+PROFILE_REFRESH_INTERVAL = float(os.getenv("PROFILE_REFRESH_INTERVAL", "1800"))
+# 静态资源缓存容量(字节)与默认有效期(秒)
+ASSET_CACHE_MAX_BYTES = int(os.getenv("ASSET_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+ASSET_CACHE_TTL = float(os.getenv("ASSET_CACHE_TTL", str(24 * 3600)))
+
+# 落在这些页面上说明被反爬拦下或要求登录，对应的配置需要作废
+INTERSTITIAL_PATTERNS: Dict[str, tuple] = {
+    "nowcoder": ("/login", "/verify"),
+    "zhihu": ("/signin", "/account/unhuman", "/captcha"),
+    "xiaohongshu": ("/website-login", "/captcha", "/verify"),
+}
+
+# 可以缓存的资源类型
+CACHEABLE_TYPES = frozenset({"script", "stylesheet"})
+
+
+def is_interstitial(platform: str, url: str) -> bool:
+    """页面是否落在了平台的登录或验证页上"""
+    return any(pattern in url for pattern in INTERSTITIAL_PATTERNS.get(platform, ()))
+
+
+def _state_dir() -> str:
+    from .crawlers import CACHE_DIR
+    return CACHE_DIR
+
+
+def _atomic_write(path: str, data: bytes):
+    """先写临时文件再改名，多个进程同时写同一文件也不会读到半截内容"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def profiles_enabled() -> bool:
+    return os.getenv("CRAWL_PROFILES", "True").lower() == "true"
+
+
+class Profile:
+    """一份storage state配置"""
+
+    def __init__(self, platform: str, key: str, path: str):
+        self.platform = platform
+        self.key = key
+        self.path = path
+
+    @property
+    def storage_state(self) -> Optional[str]:
+        """传给 browser.new_context(storage_state=...)，尚未保存过时为None"""
+        return self.path if os.path.exists(self.path) else None
+
+    def age(self) -> float:
+        try:
+            return time.time() - os.path.getmtime(self.path)
+        except OSError:
+            return float("inf")
+
+
+class ProfilePool:
+    """单个平台的storage state配置，按身份key区分"""
+
+    def __init__(self, platform: str, refresh_interval: float = PROFILE_REFRESH_INTERVAL,
+                 directory: Optional[str] = None):
+        """
+        :param refresh_interval: 配置保存超过该时间(秒)后，下次爬取结束时重新保存
+        :param directory: 配置文件目录，默认 CACHE_DIR/profiles/<平台>
+        """
+        self.platform = platform
+        self.refresh_interval = refresh_interval
+        self.directory = directory or os.path.join(_state_dir(), "profiles", platform)
+        self.profiles: Dict[str, Profile] = {}
+        self.invalidations = 0
+
+    def get(self, key: str) -> Profile:
+        """身份对应的配置，同一份配置可以被并发的爬取同时载入"""
+        profile = self.profiles.get(key)
+        if profile is None:
+            profile = self.profiles[key] = Profile(
+                self.platform, key, os.path.join(self.directory, f"state_{key}.json"))
+        return profile
+
+    async def release(self, profile: Profile, context, final_url: str = ""):
+        """爬取结束、关闭上下文之前调用：被拦截时作废配置，否则按需刷新保存"""
+        if final_url and is_interstitial(self.platform, final_url):
+            self.invalidations += 1
+            ERRORS.labels(self.platform, "interstitial").inc()
+            try:
+                os.remove(profile.path)
+            except OSError:
+                pass
+            return
+        if profile.age() < self.refresh_interval:
+            return
+        try:
+            state = await context.storage_state()
+            _atomic_write(profile.path, json.dumps(state).encode("utf-8"))
+        except Exception as e:
+            ERRORS.labels(self.platform, "profile_save").inc()
+            print(f"保存{self.platform}浏览器配置失败: {str(e)}")
+
+
+def assets_enabled() -> bool:
+    return os.getenv("ASSET_CACHE", "True").lower() == "true"
+
+
+class AssetCache:
+    """静态资源磁盘缓存
+
+    每个资源两个文件：<hash>.bin 为响应体，<hash>.json 为状态码、响应头和过期时间。
+    读写在线程池中执行，不阻塞事件循环；写入次数达到一定数量后按修改时间淘汰到容量以内。
+    """
+
+    def __init__(self, directory: str, max_bytes: int = ASSET_CACHE_MAX_BYTES, ttl: float = ASSET_CACHE_TTL):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+        # 条目数只在启动时统计一次，之后随写入和淘汰增减（近似值，仅用于指标）
+        self._entries = sum(name.endswith(".bin") for _, _, files in os.walk(directory) for name in files)
+
+    def _paths(self, url: str):
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, digest[:2], digest)
+        return f"{base}.bin", f"{base}.json"
+
+    def _read(self, url: str) -> Optional[Dict]:
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["expires"] < time.time():
+                return None
+            with open(body_path, "rb") as f:
+                meta["body"] = f.read()
+            return meta
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _max_age(self, headers: Dict[str, str]) -> Optional[float]:
+        """按Cache-Control计算有效期，不允许缓存时返回None"""
+        cache_control = headers.get("cache-control", "").lower()
+        if "no-store" in cache_control or "private" in cache_control:
+            return None
+        match = re.search(r"max-age=(\d+)", cache_control)
+        if match:
+            return min(float(match.group(1)), self.ttl * 7) or None
+        return self.ttl
+
+    def _write(self, url: str, status: int, headers: Dict[str, str], body: bytes, max_age: float):
+        body_path, meta_path = self._paths(url)
+        # 响应体已解压，去掉与原始编码相关的头
+        headers = {k: v for k, v in headers.items()
+                   if k.lower() not in ("content-encoding", "content-length", "transfer-encoding", "set-cookie")}
+        _atomic_write(body_path, body)
+        _atomic_write(meta_path, json.dumps({"status": status, "headers": headers,
+                                             "expires": time.time() + max_age}).encode("utf-8"))
+        self._writes += 1
+        self._entries += 1
+        if self._writes % 200 == 0:
+            self._prune()
+
+    def _prune(self):
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if path.endswith(".bin"):
+                self.evictions += 1
+                self._entries -= 1
+
+    async def handle(self, route, request):
+        """作为路由处理函数：命中时直接返回缓存，未命中时请求网络并写入缓存"""
+        loop = asyncio.get_running_loop()
+        url = request.url
+        cached = await loop.run_in_executor(None, self._read, url)
+        if cached is not None:
+            self.hits += 1
+            await route.fulfill(status=cached["status"], headers=cached["headers"], body=cached["body"])
+            return
+        self.misses += 1
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except Exception:
+            # 代理错误、连接重置或超时：交回浏览器按原请求处理，由Chromium自行报告网络错误
+            self.errors += 1
+            await route.continue_()
+            return
+        max_age = self._max_age(response.headers)
+        if response.status == 200 and max_age:
+            await loop.run_in_executor(None, self._write, url, response.status, response.headers, body, max_age)
+        await route.fulfill(response=response, body=body)
+
+    def stats(self) -> Dict:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "errors": self.errors, "size": self._entries}
+
+
+_asset_cache: Optional[AssetCache] = None
+
+
+def asset_cache() -> Optional[AssetCache]:
+    """进程内共享的静态资源缓存，关闭时返回None"""
+    global _asset_cache
+    if not assets_enabled():
+        return None
+    if _asset_cache is None:
+        _asset_cache = AssetCache(os.path.join(_state_dir(), "assets"))
+        track_cache("assets", _asset_cache)
+    return _asset_cache
@@ -0,0 +1,405 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """带过期时间的LRU缓存
+
+    - 容量上限：超出max_size时淘汰最久未使用的条目
+    - 过期时间：读取时惰性清理过期条目，写入时顺带清理队首过期条目
+    - 线程安全：所有操作在同一把锁内完成，锁内不做任何IO
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = 3600):
+        """
+        :param max_size: 最大条目数
+        :param ttl: 默认过期时间(秒)，None表示不过期
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        # 键 -> (值, 过期时间)，过期时间为None表示不过期
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = _MISSING):
+        ttl = self.ttl if ttl is _MISSING else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            self._purge_expired_head()
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def _purge_expired_head(self):
+        """清理LRU队首的过期条目，均摊开销为O(1)"""
+        now = time.monotonic()
+        while self._data:
+            key, (_, expires_at) = next(iter(self._data.items()))
+            if expires_at is None or expires_at > now:
+                break
+            del self._data[key]
+            self.expirations += 1
+
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._data.pop(key, _MISSING) is not _MISSING
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            return item is not _MISSING and (item[1] is None or item[1] > time.monotonic())
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self.set(key, value)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """命中/未命中/淘汰统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class DiskCache:
+    """基于SQLite的磁盘缓存，可在同一台机器的多个工作进程之间共享
+
+    值按JSON序列化；过期时间使用墙钟时间，多进程间一致。
+    每个线程使用独立连接，WAL模式下读写互不阻塞。
+    """
+
+    # 每写入多少次清理一次过期和超量条目
+    PRUNE_EVERY = 256
+
+    def __init__(self, path: str, ttl: Optional[float] = 3600, max_entries: int = 100000):
+        """
+        :param path: SQLite文件路径，目录不存在时自动创建
+        :param ttl: 默认过期时间(秒)，None表示不过期
+        :param max_entries: 条目数上限，超出时按写入时间淘汰最早的条目
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, created_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_created ON cache(created_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = _MISSING):
+        ttl = self.ttl if ttl is _MISSING else ttl
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at, created_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), now + ttl if ttl is not None else None, now)
+        )
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """删除过期条目，并把条目数压回上限以内"""
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        overflow = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY created_at LIMIT ?)",
+                (overflow,)
+            )
+            with self._lock:
+                self.evictions += overflow
+
+    def delete(self, key: str) -> bool:
+        return self._conn().execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount > 0
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache")
+
+    def __contains__(self, key: str) -> bool:
+        return self._conn().execute(
+            "SELECT 1 FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self),
+                "max_size": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+class TieredCache:
+    """内存LRU + 磁盘两级缓存
+
+    读取先查本进程内存，未命中再查磁盘并回填内存；写入同时写两级。
+    磁盘层由所有工作进程共享，一个进程爬取的结果其他进程也能直接使用。
+    """
+
+    def __init__(self, memory: TTLCache, disk: Optional[DiskCache] = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.disk is None:
+            return default
+        value = self.disk.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        self.memory.set(key, value)
+        return value
+
+    async def aget(self, key: str, default: Any = None) -> Any:
+        """异步读取：内存命中时不切换线程，只有查磁盘时才放到线程池"""
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.disk is None:
+            return default
+        loop = asyncio.get_running_loop()
+        value = await loop.run_in_executor(None, self.disk.get, key, _MISSING)
+        if value is _MISSING:
+            return default
+        self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = _MISSING):
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = _MISSING):
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.disk.set, key, value, ttl)
+
+    def delete(self, key: str) -> bool:
+        removed = self.memory.delete(key)
+        if self.disk is not None:
+            removed = self.disk.delete(key) or removed
+        return removed
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.memory or (self.disk is not None and key in self.disk)
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        self.set(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        """命中数按最终结果统计：内存或磁盘任一命中即算命中"""
+        memory = self.memory.stats()
+        disk = self.disk.stats() if self.disk is not None else None
+        hits = memory["hits"] + (disk["hits"] if disk else 0)
+        misses = disk["misses"] if disk else memory["misses"]
+        return {
+            "size": disk["size"] if disk else memory["size"],
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "evictions": memory["evictions"] + (disk["evictions"] if disk else 0),
+            "memory": memory,
+            "disk": disk,
+        }
+
+
+def make_key(func: Callable, args: tuple, kwargs: dict, skip_self: bool = False) -> str:
+    """根据函数名和参数生成稳定的缓存键
+
+    skip_self为True时跳过第一个参数，避免把实例的repr（含内存地址）混入键中。
+    参数按JSON序列化，无法序列化的对象退化为repr。
+    """
+    if skip_self:
+        args = args[1:]
+    payload = json.dumps(
+        [func.__module__, func.__qualname__, list(args), sorted(kwargs.items())],
+        ensure_ascii=False, default=repr, sort_keys=True
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _is_method(func: Callable) -> bool:
+    params = list(inspect.signature(func).parameters)
+    return bool(params) and params[0] in ("self", "cls")
+
+
+def cached(ttl: Optional[float] = 3600, max_size: int = 1024,
+           key: Optional[Callable[..., Hashable]] = None,
+           cache: Optional[TTLCache] = None):
+    """缓存装饰器，同时支持同步函数和协程函数
+
+    协程函数对同一键的并发调用只会执行一次，其余调用等待同一结果。
+    被装饰函数上可通过 .cache 访问缓存实例、.cache_stats() 查看统计。
+
+    :param ttl: 过期时间(秒)
+    :param max_size: 最大条目数
+    :param key: 自定义键函数，签名与被装饰函数一致
+    :param cache: 共享的缓存实例，提供时忽略ttl和max_size
+    """
+    def decorator(func):
+        store = cache if cache is not None else TTLCache(max_size=max_size, ttl=ttl)
+        skip_self = _is_method(func)
+
+        def build_key(args, kwargs):
+            return key(*args, **kwargs) if key else make_key(func, args, kwargs, skip_self)
+
+        if asyncio.iscoroutinefunction(func):
+            inflight: Dict[Hashable, asyncio.Future] = {}
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                cache_key = build_key(args, kwargs)
+                value = store.get(cache_key, _MISSING)
+                if value is not _MISSING:
+                    return value
+
+                pending = inflight.get(cache_key)
+                if pending is not None:
+                    return await asyncio.shield(pending)
+
+                future = asyncio.get_running_loop().create_future()
+                inflight[cache_key] = future
+                try:
+                    result = await func(*args, **kwargs)
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except BaseException as e:
+                    future.set_exception(e)
+                    # 避免无人等待时出现"Future exception was never retrieved"
+                    future.exception()
+                    raise
+                else:
+                    store.set(cache_key, result)
+                    future.set_result(result)
+                    return result
+                finally:
+                    inflight.pop(cache_key, None)
+
+            wrapper = async_wrapper
+        else:
+            @functools.wraps(func)
+            def sync_wrapper(*args, **kwargs):
+                cache_key = build_key(args, kwargs)
+                value = store.get(cache_key, _MISSING)
+                if value is not _MISSING:
+                    return value
+                result = func(*args, **kwargs)
+                store.set(cache_key, result)
+                return result
+
+            wrapper = sync_wrapper
+
+        wrapper.cache = store
+        wrapper.cache_stats = store.stats
+        return wrapper
+    return decorator
@@ -0,0 +1,76 @@
+"""
+熔断器
+
+连续失败达到阈值后熔断，冷却期内直接拒绝调用，让调用方立即走备用方案；
+冷却结束后放行一次试探调用，成功则恢复，失败则重新熔断。
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """连续失败计数熔断器"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        :param failure_threshold: 连续失败多少次后熔断
+        :param reset_timeout: 熔断后多久放行试探调用(秒)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return OPEN
+
+    def allow(self) -> bool:
+        """是否允许本次调用；半开状态下同一时间只放行一个试探调用"""
+        with self._lock:
+            state = self.state
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self, error: Optional[str] = None):
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """调用被取消、没有结果时释放试探名额，不计成功也不计失败"""
+        with self._lock:
+            self._probing = False
+
+    def snapshot(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "last_error": self.last_error,
+        }
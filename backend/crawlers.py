@@ -1,20 +1,68 @@
 import asyncio
+import os
 import aiohttp
 from bs4 import BeautifulSoup
 from playwright.async_api import async_playwright
-from typing import List, Dict
+from typing import List, Dict, Optional
 import time
 import random
+from contextlib import contextmanager
 from urllib.parse import quote
 
+from .cache import DiskCache, TieredCache, TTLCache
+from .details import DETAIL_DRAIN_SECONDS, DetailFetcher, details_enabled
+from .identities import BLOCKED_STATUSES, DESKTOP_USER_AGENTS, IdentityPool
+from .routing import PlatformRouter, routing_enabled
+from .api_capture import API_CAPTURE_TIMEOUT, start_capture
+from .browser_state import ProfilePool, is_interstitial, profiles_enabled
+from .interception import install_interception
+from .metrics import (BROWSERS_OPEN, CRAWL_ITEMS, CRAWL_SECONDS, CRAWL_STEP_SECONDS,
+                      CRAWLS_IN_FLIGHT, ERRORS, track_cache)
+from .tracing import start_span
+from .waits import wait_for_more, wait_for_results
+
+# 搜索时实际使用的关键词数量，其余关键词不会进入查询
+QUERY_KEYWORD_COUNT = 3
+
+# 爬取结果缓存：磁盘层由同一台机器上的所有工作进程共享
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(__file__), "..", ".cache"))
+CRAWL_CACHE_TTL = float(os.getenv("CRAWL_CACHE_TTL", str(6 * 3600)))
+
+# 单个平台一次搜索的默认上限：目标条数、时间预算(秒)、最多翻页或滚动加载的次数
+CRAWL_TARGET_ITEMS = int(os.getenv("CRAWL_TARGET_ITEMS", "30"))
+CRAWL_TIME_BUDGET = float(os.getenv("CRAWL_TIME_BUDGET", "30"))
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "5"))
+
+_DEFAULT = object()
+
+
+def build_query(keywords: List[str]) -> str:
+    """由关键词列表构造默认查询：前 QUERY_KEYWORD_COUNT 个关键词加“面经”"""
+    return " ".join(keywords[:QUERY_KEYWORD_COUNT]) + " 面经"
+
+
+def create_crawl_cache() -> Optional[TieredCache]:
+    """按环境变量创建爬取结果缓存，CRAWL_CACHE=False 时不缓存"""
+    if os.getenv("CRAWL_CACHE", "True").lower() != "true":
+        return None
+    disk = DiskCache(os.path.join(CACHE_DIR, "crawl.sqlite3"), ttl=CRAWL_CACHE_TTL)
+    return TieredCache(TTLCache(max_size=512, ttl=CRAWL_CACHE_TTL), disk)
+
 class InterviewExperience:
-    """面经数据结构"""
-    def __init__(self, source: str, title: str, content: str, url: str, author: str = ""):
+    """面经数据结构
+
+    date、upvotes、id 只有从平台搜索接口获取时才有值，DOM解析时为空
+    """
+    def __init__(self, source: str, title: str, content: str, url: str, author: str = "",
+                 date: str = "", upvotes: int = 0, id: str = ""):
         self.source = source
         self.title = title
         self.content = content
         self.url = url
         self.author = author
+        self.date = date
+        self.upvotes = upvotes
+        self.id = id
     
     def to_dict(self):
         return {
@@ -22,252 +70,453 @@ class InterviewExperience:
             "title": self.title,
             "content": self.content,
             "url": self.url,
-            "author": self.author
+            "author": self.author,
+            "date": self.date,
+            "upvotes": self.upvotes,
+            "id": self.id
         }
 
+class CrawlBudget:
+    """单个平台一次搜索的条数目标、时间预算与翻页上限"""
+    
+    def __init__(self, target: int = None, seconds: float = None, max_pages: int = None):
+        self.target = target or CRAWL_TARGET_ITEMS
+        self.max_pages = max_pages or CRAWL_MAX_PAGES
+        self.deadline = time.monotonic() + (seconds or CRAWL_TIME_BUDGET)
+    
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+    
+    def done(self, collected: int) -> bool:
+        return collected >= self.target or self.remaining() <= 0
+
+class CrawlResults:
+    """一次平台搜索的结果：按URL去重，新条目交给详情抓取；同时记录导航耗时供身份池评分"""
+    
+    def __init__(self, details: Optional[DetailFetcher] = None):
+        self.experiences: List[InterviewExperience] = []
+        self.details = details
+        # 每次搜索页导航的耗时(秒)
+        self.navigations: List[float] = []
+        # 是否收到了限流或拒绝访问的响应
+        self.blocked = False
+        # 页面或搜索接口返回的结果条目数（过滤非面经内容之前）
+        self.items_seen = 0
+        self._seen = set()
+    
+    def __len__(self) -> int:
+        return len(self.experiences)
+    
+    def add(self, exp: InterviewExperience):
+        # 翻页或滚动加载可能出现重复条目
+        key = exp.url.split("?")[0] if exp.url else exp.title
+        if key in self._seen:
+            return
+        self._seen.add(key)
+        self.experiences.append(exp)
+        if self.details is not None:
+            self.details.submit(exp)
+
 class BaseCrawler:
-    """爬虫基类"""
+    """爬虫基类
+
+    子类提供 search_url() 和 extract_item()，翻页、滚动加载、预取、去重、详情页补全和预算控制由基类完成。
+    """
+    # 站点根地址，基准测试时可指向本地替身服务器
+    base_url = ""
+    # 指标标签中的平台名
+    platform = ""
+    # 面经来源名称
+    source = ""
+    # 搜索结果条目的选择器，渲染等待与提取共用
+    result_selector = ""
+    # 翻页方式："pages" 按页码打开下一页，"scroll" 在同一页面向下滚动加载
+    pagination = "pages"
+    # 内容摘要的最大长度
+    max_chars = 300
+    
     def __init__(self):
         self.session = None
         self.delay_range = (1, 3)  # 请求延迟范围
+        # User-Agent、代理出口与cookie配置的组合，按近期表现加权选择
+        self.identities = IdentityPool(self.platform or self.source, user_agents=DESKTOP_USER_AGENTS)
+        # 跨爬取复用的cookie/localStorage配置，按身份区分
+        self.profiles = ProfilePool(self.platform) if profiles_enabled() and self.platform else None
     
-    async def random_delay(self):
-        """随机延迟，避免被反爬"""
+    async def random_delay(self, limit: Optional[float] = None):
+        """随机延迟，避免被反爬；每次翻页或滚动加载前调用一次，limit 为剩余预算(秒)"""
         delay = random.uniform(*self.delay_range)
-        await asyncio.sleep(delay)
-
-class NowcoderCrawler(BaseCrawler):
-    """牛客网爬虫"""
+        await asyncio.sleep(delay if limit is None else min(delay, limit))
+    
+    def search_url(self, query: str, page: int = 1) -> str:
+        raise NotImplementedError
+    
+    async def extract_item(self, item) -> Dict[str, str]:
+        """从单个结果条目中提取 title、content、url、author"""
+        raise NotImplementedError
+    
+    def to_experience(self, record: Dict) -> Optional[InterviewExperience]:
+        """过滤面经相关内容并截断摘要，DOM解析与搜索接口共用"""
+        title, content = record["title"].strip(), record["content"].strip()
+        if not (any(keyword in title.lower() for keyword in ['面经', '面试', 'interview']) or
+                any(keyword in content.lower() for keyword in ['面经', '面试', 'interview'])):
+            return None
+        content = content[:self.max_chars] + "..." if len(content) > self.max_chars else content
+        return InterviewExperience(source=self.source, **{
+            **record, "title": title, "content": content, "author": record.get("author", "").strip()})
+    
+    def experiences_from_api(self, records: List[Dict]) -> List[InterviewExperience]:
+        """把搜索接口的结构化记录转换为面经"""
+        return [exp for exp in map(self.to_experience, records) if exp is not None]
+    
+    @contextmanager
+    def step_timer(self, step: str):
+        """记录爬虫内部步骤耗时，同时生成追踪span"""
+        with start_span(f"crawl.{self.platform}.{step}"), CRAWL_STEP_SECONDS.labels(self.platform, step).time():
+            yield
     
-    async def search_interviews(self, keywords: List[str]) -> List[InterviewExperience]:
-        """搜索牛客网面经"""
-        experiences = []
-        search_query = " ".join(keywords[:3]) + " 面经"
+    async def new_context(self, browser, identity, profile=None):
+        """按身份新建浏览器上下文：设置用户代理和代理出口，载入保存的cookie/localStorage"""
+        return await browser.new_context(user_agent=identity.user_agent, proxy=identity.playwright_proxy(),
+                                         storage_state=profile.storage_state if profile else None)
+    
+    async def new_page(self, context):
+        """在上下文中新建页面，拦截图片、字体和统计埋点，静态资源走磁盘缓存"""
+        page = await context.new_page()
+        await install_interception(page, self.platform)
+        return page
+    
+    async def search_interviews(self, keywords: List[str], budget: CrawlBudget = None) -> List[InterviewExperience]:
+        """按关键词构造默认查询并搜索"""
+        return await self.search(build_query(keywords), budget)
+    
+    async def search(self, query: str, budget: CrawlBudget = None) -> List[InterviewExperience]:
+        """执行一个搜索查询，翻页或滚动加载直到达到目标条数、时间预算或没有更多结果
+
+        列表提取的同时并发抓取详情页补全正文。出错时返回已经爬到的部分结果。
+        """
+        budget = budget or CrawlBudget()
+        results = CrawlResults()
         
         async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
+            with self.step_timer("launch"):
+                # Chromium默认不对本机地址走代理，基准测试中的替身代理需要去掉这条例外
+                browser = await p.chromium.launch(
+                    headless=True, args=["--proxy-bypass-list=<-loopback>"] if self.identities.uses_proxies else None)
+            BROWSERS_OPEN.inc()
+            identity = self.identities.acquire()
+            profile = self.profiles.get(identity.key) if self.profiles else None
+            context = page = None
+            failed = True
             
             try:
-                # 设置用户代理
-                await page.set_extra_http_headers({
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                })
-                
-                # 搜索URL
-                search_url = f"https://www.nowcoder.com/search?query={quote(search_query)}&type=all"
-                await page.goto(search_url, wait_until="networkidle")
-                
-                # 等待页面加载
-                await page.wait_for_timeout(2000)
-                
-                # 查找面经相关内容
-                items = await page.query_selector_all('.search-item, .feed-item, .discuss-item')
-                
-                for item in items[:10]:  # 获取前10个结果
-                    try:
-                        # 提取标题
-                        title_elem = await item.query_selector('.title, .feed-title, h3, h4')
-                        title = await title_elem.inner_text() if title_elem else "无标题"
-                        
-                        # 提取链接
-                        link_elem = await item.query_selector('a')
-                        url = await link_elem.get_attribute('href') if link_elem else ""
-                        if url and not url.startswith('http'):
-                            url = f"https://www.nowcoder.com{url}"
-                        
-                        # 提取内容摘要
-                        content_elem = await item.query_selector('.content, .feed-content, .discuss-content')
-                        content = await content_elem.inner_text() if content_elem else ""
-                        content = content[:300] + "..." if len(content) > 300 else content
-                        
-                        # 过滤面经相关内容
-                        if any(keyword in title.lower() for keyword in ['面经', '面试', 'interview']) or \
-                           any(keyword in content.lower() for keyword in ['面经', '面试', 'interview']):
-                            experiences.append(InterviewExperience(
-                                source="牛客网",
-                                title=title.strip(),
-                                content=content.strip(),
-                                url=url
-                            ))
-                        
-                        await self.random_delay()
-                        
-                    except Exception as e:
-                        print(f"提取牛客网内容时出错: {str(e)}")
-                        continue
-                        
+                context = await self.new_context(browser, identity, profile)
+                page = await self.new_page(context)
+                if details_enabled():
+                    results.details = DetailFetcher(self.platform, browser, identity=identity,
+                                                    storage_state=profile.storage_state if profile else None)
+                if self.pagination == "scroll":
+                    await self.crawl_feed(page, query, budget, results)
+                else:
+                    await self.crawl_pages(context, page, query, budget, results)
+                failed = False
             except Exception as e:
-                print(f"牛客网爬取出错: {str(e)}")
+                ERRORS.labels(self.platform, "page").inc()
+                print(f"{self.source}爬取出错: {str(e)}")
             finally:
+                if results.details is not None:
+                    # 列表提取常常用完预算，详情页至少再等 DETAIL_DRAIN_SECONDS 秒，未完成的条目保留摘要
+                    with self.step_timer("detail_wait"):
+                        await results.details.drain(max(budget.remaining(), DETAIL_DRAIN_SECONDS))
+                    await results.details.close()
+                final_url = page.url if page is not None else ""
+                burned = results.blocked or is_interstitial(self.platform, final_url)
+                navigations = sorted(results.navigations)
+                # 打开了页面却一条结果都没有，多半是拿到了验证页或改版页面，按失败计入身份评分
+                self.identities.report(identity, navigations[len(navigations) // 2] if navigations else None,
+                                       ok=not failed and bool(navigations) and results.items_seen > 0,
+                                       burned=burned)
+                if profile is not None and context is not None:
+                    await self.profiles.release(profile, context, final_url)
                 await browser.close()
+                BROWSERS_OPEN.dec()
         
-        return experiences
+        return results.experiences
+    
+    async def navigate(self, page, url: str, results: CrawlResults):
+        """导航到搜索结果页，记录耗时和限流响应"""
+        with self.step_timer("navigate"):
+            start = time.perf_counter()
+            response = await page.goto(url, wait_until="domcontentloaded")
+        results.navigations.append(time.perf_counter() - start)
+        if response is not None and response.status in BLOCKED_STATUSES:
+            ERRORS.labels(self.platform, f"http_{response.status}").inc()
+            results.blocked = True
+    
+    async def open_results(self, page, url: str, budget: CrawlBudget, results: CrawlResults,
+                           delay: bool = False) -> int:
+        """打开搜索结果页并等待条目渲染完成，返回条目数
 
-class ZhihuCrawler(BaseCrawler):
-    """知乎爬虫"""
+        :param delay: 导航前先随机延迟（翻页时使用，首页不延迟）
+        """
+        if delay:
+            await self.random_delay(budget.remaining())
+        await self.navigate(page, url, results)
+        with self.step_timer("render_wait"):
+            return await wait_for_results(page, self.result_selector, self.platform, timeout=budget.remaining())
     
-    async def search_interviews(self, keywords: List[str]) -> List[InterviewExperience]:
-        """搜索知乎面经"""
-        experiences = []
-        search_query = " ".join(keywords[:3]) + " 面经"
-        
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            
+    async def extract_items(self, items, budget: CrawlBudget, results: CrawlResults):
+        """逐条提取，达到目标条数或时间预算时停止"""
+        for item in items:
+            if budget.done(len(results)):
+                break
+            results.items_seen += 1
+            item_start = time.perf_counter()
             try:
-                # 设置用户代理
-                await page.set_extra_http_headers({
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                })
-                
-                # 搜索URL
-                search_url = f"https://www.zhihu.com/search?type=content&q={quote(search_query)}"
-                await page.goto(search_url, wait_until="networkidle")
-                
-                # 等待页面加载
-                await page.wait_for_timeout(3000)
+                exp = self.to_experience(await self.extract_item(item))
+                if exp is not None:
+                    results.add(exp)
                 
-                # 查找搜索结果
-                items = await page.query_selector_all('.SearchResult-Card, .List-item')
+                CRAWL_STEP_SECONDS.labels(self.platform, "extract_item").observe(
+                    time.perf_counter() - item_start)
                 
-                for item in items[:10]:  # 获取前10个结果
-                    try:
-                        # 提取标题
-                        title_elem = await item.query_selector('.SearchResult-title, .ContentItem-title')
-                        title = await title_elem.inner_text() if title_elem else "无标题"
-                        
-                        # 提取链接
-                        link_elem = await item.query_selector('a')
-                        url = await link_elem.get_attribute('href') if link_elem else ""
-                        if url and not url.startswith('http'):
-                            url = f"https://www.zhihu.com{url}"
-                        
-                        # 提取内容摘要
-                        content_elem = await item.query_selector('.SearchResult-excerpt, .RichContent')
-                        content = await content_elem.inner_text() if content_elem else ""
-                        content = content[:300] + "..." if len(content) > 300 else content
-                        
-                        # 提取作者
-                        author_elem = await item.query_selector('.UserLink-link, .AuthorInfo-name')
-                        author = await author_elem.inner_text() if author_elem else ""
-                        
-                        # 过滤面经相关内容
-                        if any(keyword in title.lower() for keyword in ['面经', '面试', 'interview']) or \
-                           any(keyword in content.lower() for keyword in ['面经', '面试', 'interview']):
-                            experiences.append(InterviewExperience(
-                                source="知乎",
-                                title=title.strip(),
-                                content=content.strip(),
-                                url=url,
-                                author=author.strip()
-                            ))
-                        
-                        await self.random_delay()
-                        
-                    except Exception as e:
-                        print(f"提取知乎内容时出错: {str(e)}")
-                        continue
-                        
             except Exception as e:
-                print(f"知乎爬取出错: {str(e)}")
-            finally:
-                await browser.close()
+                ERRORS.labels(self.platform, "extract_item").inc()
+                print(f"提取{self.source}内容时出错: {str(e)}")
+                continue
+    
+    async def crawl_pages(self, context, page, query: str, budget: CrawlBudget, results: CrawlResults):
+        """按页码逐页爬取：提取第N页的同时，在同一上下文的另一个页面中打开并渲染第N+1页"""
+        page_no = 1
+        count = await self.open_results(page, self.search_url(query, page_no), budget, results)
+        while count:
+            next_page = prefetch = None
+            if page_no < budget.max_pages and not budget.done(len(results)):
+                next_page = await self.new_page(context)
+                prefetch = asyncio.create_task(
+                    self.open_results(next_page, self.search_url(query, page_no + 1), budget, results, delay=True))
+            
+            items = await page.query_selector_all(self.result_selector)
+            await self.extract_items(items, budget, results)
+            await page.close()
+            
+            if prefetch is None:
+                break
+            if budget.done(len(results)):
+                prefetch.cancel()
+                await asyncio.gather(prefetch, return_exceptions=True)
+                await next_page.close()
+                break
+            count = await prefetch
+            page, page_no = next_page, page_no + 1
+    
+    async def crawl_feed(self, page, query: str, budget: CrawlBudget, results: CrawlResults):
+        """在同一页面向下滚动加载：提取当前批次的同时触发并等待下一批加载"""
+        # 优先捕获搜索接口的JSON响应，拿到即返回，无需等待渲染
+        capture = start_capture(page, self.platform)
+        await self.navigate(page, self.search_url(query), results)
         
-        return experiences
+        if capture is not None:
+            with self.step_timer("api_wait"):
+                records = await capture.wait(page, timeout=min(API_CAPTURE_TIMEOUT, budget.remaining()))
+            if records is not None:
+                await self.crawl_api_feed(page, capture, records, budget, results)
+                return
+        
+        # 等待结果条目数稳定
+        with self.step_timer("render_wait"):
+            count = await wait_for_results(page, self.result_selector, self.platform, timeout=budget.remaining())
+        
+        extracted = 0
+        rounds = 1
+        while count > extracted:
+            items = await page.query_selector_all(self.result_selector)
+            batch, extracted = items[extracted:], len(items)
+            
+            more = None
+            if rounds < budget.max_pages and not budget.done(len(results)):
+                more = asyncio.create_task(self.scroll_for_more(page, extracted, budget))
+            
+            await self.extract_items(batch, budget, results)
+            
+            if more is None:
+                break
+            if budget.done(len(results)):
+                more.cancel()
+                await asyncio.gather(more, return_exceptions=True)
+                break
+            count = await more
+            rounds += 1
+    
+    async def scroll_for_more(self, page, previous: int, budget: CrawlBudget) -> int:
+        """随机延迟后滚动到底部并等待新条目渲染，返回新的条目数"""
+        await self.random_delay(budget.remaining())
+        with self.step_timer("scroll_wait"):
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            return await wait_for_more(page, self.result_selector, self.platform, previous,
+                                       timeout=budget.remaining())
+    
+    async def crawl_api_feed(self, page, capture, records: List[Dict], budget: CrawlBudget,
+                             results: CrawlResults):
+        """搜索接口模式：每次滚动触发下一页接口请求，直接解析其响应"""
+        rounds = 1
+        while records:
+            results.items_seen += len(records)
+            for exp in self.experiences_from_api(records):
+                if budget.done(len(results)):
+                    break
+                results.add(exp)
+            if rounds >= budget.max_pages or budget.done(len(results)):
+                break
+            await self.random_delay(budget.remaining())
+            with self.step_timer("api_wait"):
+                await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+                records = await capture.next(timeout=min(API_CAPTURE_TIMEOUT, budget.remaining()))
+            rounds += 1
+
+class NowcoderCrawler(BaseCrawler):
+    """牛客网爬虫"""
+    
+    base_url = "https://www.nowcoder.com"
+    platform = "nowcoder"
+    source = "牛客网"
+    result_selector = '.search-item, .feed-item, .discuss-item'
+    pagination = "pages"
+    
+    def search_url(self, query: str, page: int = 1) -> str:
+        url = f"{self.base_url}/search?query={quote(query)}&type=all"
+        return url if page == 1 else f"{url}&page={page}"
+    
+    async def extract_item(self, item) -> Dict[str, str]:
+        # 提取标题
+        title_elem = await item.query_selector('.title, .feed-title, h3, h4')
+        title = await title_elem.inner_text() if title_elem else "无标题"
+        
+        # 提取链接
+        link_elem = await item.query_selector('a')
+        url = await link_elem.get_attribute('href') if link_elem else ""
+        if url and not url.startswith('http'):
+            url = f"{self.base_url}{url}"
+        
+        # 提取内容摘要
+        content_elem = await item.query_selector('.content, .feed-content, .discuss-content')
+        content = await content_elem.inner_text() if content_elem else ""
+        
+        return {"title": title, "content": content, "url": url}
+
+class ZhihuCrawler(BaseCrawler):
+    """知乎爬虫"""
+    
+    base_url = "https://www.zhihu.com"
+    platform = "zhihu"
+    source = "知乎"
+    result_selector = '.SearchResult-Card, .List-item'
+    pagination = "scroll"
+    
+    def search_url(self, query: str, page: int = 1) -> str:
+        return f"{self.base_url}/search?type=content&q={quote(query)}"
+    
+    async def extract_item(self, item) -> Dict[str, str]:
+        # 提取标题
+        title_elem = await item.query_selector('.SearchResult-title, .ContentItem-title')
+        title = await title_elem.inner_text() if title_elem else "无标题"
+        
+        # 提取链接
+        link_elem = await item.query_selector('a')
+        url = await link_elem.get_attribute('href') if link_elem else ""
+        if url and not url.startswith('http'):
+            url = f"{self.base_url}{url}"
+        
+        # 提取内容摘要
+        content_elem = await item.query_selector('.SearchResult-excerpt, .RichContent')
+        content = await content_elem.inner_text() if content_elem else ""
+        
+        # 提取作者
+        author_elem = await item.query_selector('.UserLink-link, .AuthorInfo-name')
+        author = await author_elem.inner_text() if author_elem else ""
+        
+        return {"title": title, "content": content, "url": url, "author": author}
 
 class XiaohongshuCrawler(BaseCrawler):
     """小红书爬虫"""
     
-    async def search_interviews(self, keywords: List[str]) -> List[InterviewExperience]:
-        """搜索小红书面经"""
-        experiences = []
-        search_query = " ".join(keywords[:3]) + " 面经"
+    base_url = "https://www.xiaohongshu.com"
+    platform = "xiaohongshu"
+    source = "小红书"
+    result_selector = '.note-item, .feeds-page .note-item'
+    pagination = "scroll"
+    max_chars = 200
+    
+    def search_url(self, query: str, page: int = 1) -> str:
+        return f"{self.base_url}/search_result?keyword={quote(query)}"
+    
+    async def extract_item(self, item) -> Dict[str, str]:
+        # 提取标题
+        title_elem = await item.query_selector('.title, .note-title')
+        title = await title_elem.inner_text() if title_elem else "无标题"
         
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            
-            try:
-                # 设置用户代理
-                await page.set_extra_http_headers({
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                })
-                
-                # 搜索URL
-                search_url = f"https://www.xiaohongshu.com/search_result?keyword={quote(search_query)}"
-                await page.goto(search_url, wait_until="networkidle")
-                
-                # 等待页面加载
-                await page.wait_for_timeout(3000)
-                
-                # 查找笔记内容
-                items = await page.query_selector_all('.note-item, .feeds-page .note-item')
-                
-                for item in items[:8]:  # 获取前8个结果
-                    try:
-                        # 提取标题
-                        title_elem = await item.query_selector('.title, .note-title')
-                        title = await title_elem.inner_text() if title_elem else "无标题"
-                        
-                        # 提取链接
-                        link_elem = await item.query_selector('a')
-                        url = await link_elem.get_attribute('href') if link_elem else ""
-                        if url and not url.startswith('http'):
-                            url = f"https://www.xiaohongshu.com{url}"
-                        
-                        # 提取内容摘要
-                        content_elem = await item.query_selector('.content, .note-content')
-                        content = await content_elem.inner_text() if content_elem else ""
-                        content = content[:200] + "..." if len(content) > 200 else content
-                        
-                        # 提取作者
-                        author_elem = await item.query_selector('.author, .user-name')
-                        author = await author_elem.inner_text() if author_elem else ""
-                        
-                        # 过滤面经相关内容
-                        if any(keyword in title.lower() for keyword in ['面经', '面试', 'interview']) or \
-                           any(keyword in content.lower() for keyword in ['面经', '面试', 'interview']):
-                            experiences.append(InterviewExperience(
-                                source="小红书",
-                                title=title.strip(),
-                                content=content.strip(),
-                                url=url,
-                                author=author.strip()
-                            ))
-                        
-                        await self.random_delay()
-                        
-                    except Exception as e:
-                        print(f"提取小红书内容时出错: {str(e)}")
-                        continue
-                        
-            except Exception as e:
-                print(f"小红书爬取出错: {str(e)}")
-            finally:
-                await browser.close()
+        # 提取链接
+        link_elem = await item.query_selector('a')
+        url = await link_elem.get_attribute('href') if link_elem else ""
+        if url and not url.startswith('http'):
+            url = f"{self.base_url}{url}"
         
-        return experiences
+        # 提取内容摘要
+        content_elem = await item.query_selector('.content, .note-content')
+        content = await content_elem.inner_text() if content_elem else ""
+        
+        # 提取作者
+        author_elem = await item.query_selector('.author, .user-name')
+        author = await author_elem.inner_text() if author_elem else ""
+        
+        return {"title": title, "content": content, "url": url, "author": author}
+
+class SharedCrawlCancelled(Exception):
+    """共享的爬取在发起方被取消，等待同一结果的请求需要自行重新爬取"""
 
 class CrawlerManager:
     """爬虫管理器"""
     
-    def __init__(self):
+    def __init__(self, cache=_DEFAULT, router=_DEFAULT):
+        """
+        :param cache: 爬取结果缓存，默认由 create_crawl_cache() 创建，None表示不缓存
+        :param router: 平台路由，默认按 CRAWL_ROUTING 创建并把统计保存在 CACHE_DIR 下，None表示总是爬取全部平台
+        """
         self.crawlers = {
             "nowcoder": NowcoderCrawler(),
             "zhihu": ZhihuCrawler(),
             "xiaohongshu": XiaohongshuCrawler()
         }
+        self.cache = create_crawl_cache() if cache is _DEFAULT else cache
+        if self.cache is not None:
+            track_cache("crawl", self.cache)
+        if router is _DEFAULT:
+            router = PlatformRouter(list(self.crawlers), os.path.join(CACHE_DIR, "routing.json")) \
+                if routing_enabled() else None
+        self.router = router
+        # 相同平台和查询的并发爬取只执行一次
+        self._inflight: Dict[str, asyncio.Future] = {}
     
     async def crawl_all_platforms(self, keywords: List[str]) -> List[InterviewExperience]:
-        """并发爬取所有平台"""
+        """按关键词构造默认查询，并发爬取所有平台"""
+        return await self.crawl_query(build_query(keywords))
+    
+    async def crawl_query(self, query: str, seconds: Optional[float] = None,
+                          refresh: bool = False) -> List[InterviewExperience]:
+        """用同一个查询并发爬取各平台；路由判定产出过低的平台只查缓存，不启动浏览器
+
+        :param seconds: 每个平台的时间预算，None时使用 CRAWL_TIME_BUDGET
+        :param refresh: True时不读缓存，重新爬取并写回（预热使用）
+        """
         all_experiences = []
+        routes = self.router.route(query) if self.router is not None else {}
         
         # 创建爬取任务
         tasks = []
         for platform, crawler in self.crawlers.items():
-            task = asyncio.create_task(crawler.search_interviews(keywords))
+            task = asyncio.create_task(
+                self._search_platform(platform, crawler, query, seconds, crawl=routes.get(platform, True),
+                                      refresh=refresh))
             tasks.append(task)
         
         # 等待所有任务完成
@@ -277,7 +526,96 @@ class CrawlerManager:
         for result in results:
             if isinstance(result, list):
                 all_experiences.extend(result)
-            elif isinstance(result, Exception):
-                print(f"爬取任务出错: {str(result)}")
+            elif isinstance(result, BaseException):
+                print(f"爬取任务出错: {type(result).__name__} {str(result)}")
         
-        return all_experiences 
\ No newline at end of file
+        return all_experiences
+    
+    @staticmethod
+    def cache_key(platform: str, query: str) -> str:
+        """缓存键使用规范化后的查询（小写、合并空白）"""
+        return f"crawl:{platform}:{' '.join(query.lower().split())}"
+    
+    async def _search_platform(self, platform: str, crawler, query: str, seconds: Optional[float] = None,
+                               crawl: bool = True, refresh: bool = False) -> List[InterviewExperience]:
+        """先查缓存，未命中时爬取并写回；相同查询的并发请求共享同一次爬取
+
+        :param crawl: False时只查缓存，未命中返回空列表
+        :param refresh: True时跳过缓存读取，爬取后覆盖旧条目
+        """
+        if self.cache is None:
+            return await self._timed_search(platform, crawler, query, seconds) if crawl else []
+        
+        key = self.cache_key(platform, query)
+        cached = None if refresh and crawl else await self.cache.aget(key)
+        if cached is not None:
+            return [InterviewExperience(**item) for item in cached]
+        if not crawl:
+            return []
+        
+        pending = self._inflight.get(key)
+        if pending is not None:
+            try:
+                return list(await asyncio.shield(pending))
+            except SharedCrawlCancelled:
+                # 发起方被取消（如预热停止），由本请求重新发起爬取
+                return await self._search_platform(platform, crawler, query, seconds, crawl, refresh)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            experiences = await self._timed_search(platform, crawler, query, seconds)
+        except asyncio.CancelledError:
+            # 不取消共享的future，否则等待者收到 CancelledError 后结果被静默丢弃
+            future.set_exception(SharedCrawlCancelled(key))
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        else:
+            future.set_result(experiences)
+        finally:
+            self._inflight.pop(key, None)
+        
+        # 空结果多半是页面未加载或被拦截，不缓存
+        if experiences:
+            await self.cache.aset(key, [exp.to_dict() for exp in experiences])
+        return experiences
+    
+    async def _timed_search(self, platform: str, crawler, query: str,
+                            seconds: Optional[float] = None) -> List[InterviewExperience]:
+        """执行单个平台的搜索并记录耗时、条数和失败次数，产出计入平台路由统计"""
+        start = time.perf_counter()
+        with start_span(f"crawl.{platform}", query=query) as span, \
+                CRAWLS_IN_FLIGHT.track_inprogress():
+            try:
+                experiences = await crawler.search(query, CrawlBudget(seconds=seconds) if seconds else None)
+                span.set_attribute("items", len(experiences))
+            except Exception:
+                ERRORS.labels(platform, "task").inc()
+                # 失败的爬取同样消耗了浏览器时间，按零产出计入
+                if self.router is not None:
+                    self.router.record(platform, query, 0, time.perf_counter() - start)
+                raise
+            finally:
+                CRAWL_SECONDS.labels(platform).observe(time.perf_counter() - start)
+        if self.router is not None:
+            self.router.record(platform, query, len(experiences), time.perf_counter() - start)
+        CRAWL_ITEMS.labels(platform).inc(len(experiences))
+        return experiences
+    
+    @staticmethod
+    def merge_results(*result_lists: List[InterviewExperience]) -> List[InterviewExperience]:
+        """合并多次爬取的结果，按URL（无URL时按平台+标题）去重"""
+        merged = []
+        seen = set()
+        for results in result_lists:
+            for exp in results:
+                key = exp.url.split("?")[0] if exp.url else f"{exp.source}:{exp.title}"
+                if key in seen:
+                    continue
+                seen.add(key)
+                merged.append(exp)
+        return merged 
\ No newline at end of file
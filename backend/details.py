@@ -0,0 +1,196 @@
+"""
+面经详情页抓取
+
+搜索结果只有200~300字的摘要，大模型分析需要完整正文。DetailFetcher 在列表爬取的同时
+并发打开结果链接，提取正文后替换摘要：
+
+- 服务端渲染的页面（牛客网帖子）直接用HTTP请求，解析放到线程池，不占事件循环
+- 需要执行脚本的页面（知乎、小红书）复用爬虫已经启动的浏览器，
+  最多 concurrency 个浏览器上下文轮流使用
+- 正文按URL缓存（内存+磁盘），同一帖子在不同查询中只抓一次
+- 每个详情页到达后立即替换对应条目的摘要；列表爬取结束后至少再等待 DETAIL_DRAIN_SECONDS 秒，
+  仍未完成的条目保留摘要
+"""
+import asyncio
+import os
+from typing import Dict, List, Optional
+
+import httpx
+from bs4 import BeautifulSoup
+
+from .cache import DiskCache, TieredCache, TTLCache
+from .html_parsers import HTML_PARSER
+from .identities import USER_AGENTS, Identity
+from .interception import install_interception
+from .metrics import CRAWL_STEP_SECONDS, ERRORS, track_cache
+from .waits import wait_for_results
+
+# 同时抓取的详情页数（每个平台、每次搜索）
+DETAIL_CONCURRENCY = int(os.getenv("DETAIL_CONCURRENCY", "4"))
+# 正文最大长度，超出截断
+DETAIL_MAX_CHARS = int(os.getenv("DETAIL_MAX_CHARS", "4000"))
+# 帖子正文很少修改，缓存时间比搜索结果长
+DETAIL_CACHE_TTL = float(os.getenv("DETAIL_CACHE_TTL", str(7 * 24 * 3600)))
+# 列表爬取用完预算后，仍等待已提交详情页的最短时间(秒)
+DETAIL_DRAIN_SECONDS = float(os.getenv("DETAIL_DRAIN_SECONDS", "3"))
+
+# 各平台详情页的抓取方式与正文选择器（按顺序取第一个匹配）
+DETAIL_RULES: Dict[str, Dict] = {
+    "nowcoder": {"mode": "http", "selectors": [".nc-post-content", ".post-topic-des", ".feed-content-text",
+                                               ".discuss-content"]},
+    "zhihu": {"mode": "browser", "selectors": [".Post-RichText", ".RichContent-inner", ".RichText"]},
+    "xiaohongshu": {"mode": "browser", "selectors": ["#detail-desc", ".note-content .desc", ".note-content"]},
+}
+
+
+def details_enabled() -> bool:
+    return os.getenv("CRAWL_DETAILS", "True").lower() == "true"
+
+
+def extract_body(html: str, selectors: List[str]) -> Optional[str]:
+    """从详情页HTML中提取正文，纯函数，可在线程池中执行"""
+    soup = BeautifulSoup(html, HTML_PARSER)
+    for selector in selectors:
+        elem = soup.select_one(selector)
+        if elem is not None:
+            text = elem.get_text("\n", strip=True)
+            if text:
+                return text
+    return None
+
+
+_detail_cache: Optional[TieredCache] = None
+
+
+def detail_cache() -> TieredCache:
+    """进程内共享的正文缓存，磁盘层与爬取结果缓存放在同一目录，CRAWL_CACHE=False 时只用内存"""
+    global _detail_cache
+    if _detail_cache is None:
+        from .crawlers import CACHE_DIR
+        disk = None
+        if os.getenv("CRAWL_CACHE", "True").lower() == "true":
+            disk = DiskCache(os.path.join(CACHE_DIR, "details.sqlite3"), ttl=DETAIL_CACHE_TTL)
+        _detail_cache = TieredCache(TTLCache(max_size=2048, ttl=DETAIL_CACHE_TTL), disk)
+        track_cache("details", _detail_cache)
+    return _detail_cache
+
+
+class DetailFetcher:
+    """一次平台搜索中的详情页抓取，随列表提取逐条提交"""
+
+    def __init__(self, platform: str, browser=None, concurrency: int = DETAIL_CONCURRENCY,
+                 cache: Optional[TieredCache] = None, identity: Optional[Identity] = None,
+                 storage_state: Optional[str] = None):
+        """
+        :param browser: 爬虫已启动的浏览器，None时只能用HTTP抓取
+        :param identity: 列表爬取所用的身份，详情页沿用同一User-Agent和代理出口
+        :param storage_state: 新建浏览器上下文时载入的cookie/localStorage配置文件
+        :param concurrency: 同时进行的详情页请求数
+        :param cache: 正文缓存，默认使用进程内共享缓存
+        """
+        self.platform = platform
+        self.rules = DETAIL_RULES.get(platform, {"mode": "browser", "selectors": []})
+        self.browser = browser
+        self.concurrency = concurrency
+        self.cache = cache if cache is not None else detail_cache()
+        self.identity = identity
+        self.user_agent = identity.user_agent if identity else USER_AGENTS[0]
+        self.storage_state = storage_state
+        self.enriched = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._contexts: asyncio.Queue = asyncio.Queue()
+        self._context_count = 0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def submit(self, exp):
+        """提交一个条目，详情页到达后直接替换其 content"""
+        if exp.url and self.rules["selectors"]:
+            self._tasks.append(asyncio.create_task(self._enrich(exp)))
+
+    async def _enrich(self, exp):
+        body = await self.fetch(exp.url)
+        if body and len(body) > len(exp.content.rstrip(".")):
+            exp.content = body[:DETAIL_MAX_CHARS] + "..." if len(body) > DETAIL_MAX_CHARS else body
+            self.enriched += 1
+
+    async def fetch(self, url: str) -> Optional[str]:
+        """抓取单个详情页正文，先查缓存"""
+        key = f"detail:{url.split('#')[0]}"
+        cached = await self.cache.aget(key)
+        if cached is not None:
+            return cached
+        async with self._semaphore:
+            with CRAWL_STEP_SECONDS.labels(self.platform, "detail").time():
+                try:
+                    body = None
+                    if self.rules["mode"] == "http":
+                        body = await self._fetch_http(url)
+                    # HTTP拿不到正文（需要执行脚本或被拦截）时退回浏览器
+                    if body is None and self.browser is not None:
+                        body = await self._fetch_browser(url)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    ERRORS.labels(self.platform, "detail").inc()
+                    print(f"抓取{self.platform}详情页出错: {url} {str(e)}")
+                    return None
+        if body:
+            await self.cache.aset(key, body)
+        return body
+
+    async def _fetch_http(self, url: str) -> Optional[str]:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=10, follow_redirects=True,
+                                             headers={"User-Agent": self.user_agent},
+                                             proxy=self.identity.proxy if self.identity else None)
+        response = await self._client.get(url)
+        if response.status_code != 200:
+            return None
+        return await asyncio.get_running_loop().run_in_executor(
+            None, extract_body, response.text, self.rules["selectors"])
+
+    async def _acquire_context(self):
+        if self._contexts.empty() and self._context_count < self.concurrency:
+            self._context_count += 1
+            return await self.browser.new_context(
+                user_agent=self.user_agent, storage_state=self.storage_state,
+                proxy=self.identity.playwright_proxy() if self.identity else None)
+        return await self._contexts.get()
+
+    async def _fetch_browser(self, url: str) -> Optional[str]:
+        context = await self._acquire_context()
+        try:
+            page = await context.new_page()
+            try:
+                await install_interception(page, self.platform)
+                await page.goto(url, wait_until="domcontentloaded")
+                selector = ", ".join(self.rules["selectors"])
+                if not await wait_for_results(page, selector, f"{self.platform}_detail"):
+                    return None
+                for candidate in self.rules["selectors"]:
+                    elem = await page.query_selector(candidate)
+                    if elem is not None:
+                        text = (await elem.inner_text()).strip()
+                        if text:
+                            return text
+                return None
+            finally:
+                await page.close()
+        finally:
+            self._contexts.put_nowait(context)
+
+    async def drain(self, timeout: float) -> int:
+        """等待已提交的详情页，最多 timeout 秒；未完成的取消并保留摘要。返回替换了正文的条目数"""
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=max(0.0, timeout))
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        return self.enriched
+
+    async def close(self):
+        while not self._contexts.empty():
+            await self._contexts.get_nowait().close()
+        if self._client is not None:
+            await self._client.aclose()
@@ -0,0 +1,293 @@
+"""
+存活与就绪检查
+
+依赖检查（浏览器、讯飞星火、MCP服务器）由后台任务按各自的间隔执行并缓存结果，
+/health 与 /ready 只读取缓存，探针本身几乎没有开销。队列深度和事件循环延迟在探测时即时读取。
+
+就绪判定：
+- 正在排空（draining）时不就绪，但已接收的请求会继续处理完
+- 任一关键检查失败、排队请求数或事件循环延迟超过阈值时不就绪
+- 非关键检查（讯飞星火、MCP服务器）失败只降级，不影响就绪
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+
+from .circuit_breaker import OPEN, CircuitBreaker
+from .loop_monitor import LoopMonitor
+from .metrics import ANALYSES_IN_FLIGHT
+from .profiling import require_admin
+
+logger = logging.getLogger(__name__)
+
+CheckFunc = Callable[[], Awaitable[Tuple[bool, str]]]
+
+
+class _Check:
+    def __init__(self, name: str, func: CheckFunc, critical: bool, interval: float, timeout: float):
+        self.name = name
+        self.func = func
+        self.critical = critical
+        self.interval = interval
+        self.timeout = timeout
+        self.next_run = 0.0
+        self.result: Optional[Dict] = None
+
+
+class HealthMonitor:
+    """后台执行依赖检查并缓存结果"""
+
+    def __init__(self, loop_monitor: LoopMonitor, tick: float = 0.5, max_queue_depth: int = 32,
+                 max_loop_lag: float = 1.0):
+        """
+        :param loop_monitor: 事件循环延迟来源
+        :param tick: 后台循环间隔(秒)
+        :param max_queue_depth: 正在处理的分析请求数超过该值时不就绪
+        :param max_loop_lag: 最近的事件循环延迟超过该值(秒)时不就绪
+        """
+        self.loop_monitor = loop_monitor
+        self.tick = tick
+        self.max_queue_depth = max_queue_depth
+        self.max_loop_lag = max_loop_lag
+        self.checks: Dict[str, _Check] = {}
+        self.draining = False
+        self.started_at = time.time()
+        self._task: Optional[asyncio.Task] = None
+        self._running = set()
+
+    def add_check(self, name: str, func: CheckFunc, critical: bool = True,
+                  interval: float = 10.0, timeout: float = 5.0):
+        self.checks[name] = _Check(name, func, critical, interval, timeout)
+
+    async def _run_check(self, check: _Check):
+        start = time.perf_counter()
+        try:
+            ok, detail = await asyncio.wait_for(check.func(), timeout=check.timeout)
+        except asyncio.TimeoutError:
+            ok, detail = False, f"检查超时({check.timeout}s)"
+        except Exception as e:
+            message = str(e).strip().splitlines()
+            ok, detail = False, f"{type(e).__name__}: {message[0][:200] if message else ''}"
+        if check.result is not None and check.result["ok"] != ok:
+            logger.warning(f"健康检查 {check.name} 状态变化: {'正常' if ok else '异常'} - {detail}")
+        check.result = {
+            "ok": ok,
+            "critical": check.critical,
+            "detail": detail,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "checked_at": time.time(),
+        }
+
+    @property
+    def loop_lag(self) -> float:
+        return self.loop_monitor.recent_max_lag()
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            due = [c for c in self.checks.values() if c.next_run <= now]
+            for check in due:
+                check.next_run = now + check.interval
+                task = asyncio.create_task(self._run_check(check))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+            await asyncio.sleep(self.tick)
+
+    def start(self):
+        self.loop_monitor.start()
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        await self.loop_monitor.stop()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # 进行中的检查（如启动浏览器的 browser_check）也要取消，否则退出时会等它结束
+        running = list(self._running)
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+    def liveness(self) -> Dict:
+        return {
+            "status": "healthy",
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "loop_lag_ms": round(self.loop_lag * 1000, 1),
+        }
+
+    def readiness(self) -> Tuple[bool, Dict]:
+        queue_depth = int(ANALYSES_IN_FLIGHT.value)
+        reasons = []
+        if self.draining:
+            reasons.append("draining")
+        for check in self.checks.values():
+            if check.critical and check.result is None:
+                reasons.append(f"{check.name}: 尚未完成首次检查")
+            elif check.critical and not check.result["ok"]:
+                reasons.append(f"{check.name}: {check.result['detail']}")
+        if queue_depth > self.max_queue_depth:
+            reasons.append(f"排队请求数 {queue_depth} 超过 {self.max_queue_depth}")
+        if self.loop_lag > self.max_loop_lag:
+            reasons.append(f"事件循环延迟 {self.loop_lag:.2f}s 超过 {self.max_loop_lag}s")
+
+        degraded = [c.name for c in self.checks.values()
+                    if not c.critical and c.result is not None and not c.result["ok"]]
+        ready = not reasons
+        return ready, {
+            "status": "ready" if ready else "not_ready",
+            "reasons": reasons,
+            "degraded": degraded,
+            "draining": self.draining,
+            "queue_depth": queue_depth,
+            "loop_lag_ms": round(self.loop_lag * 1000, 1),
+            "checks": {name: c.result for name, c in self.checks.items()},
+        }
+
+
+# ---- 检查项 ----
+
+async def tcp_reachable(host: str, port: int, timeout: float = 2.0) -> Tuple[bool, str]:
+    """只建立TCP连接，不发送业务请求"""
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=timeout)
+    except Exception as e:
+        return False, f"{host}:{port} 不可达 ({type(e).__name__})"
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except Exception:
+        pass
+    return True, f"{host}:{port} 可达"
+
+
+def browser_check() -> CheckFunc:
+    """确认Chromium可以启动，爬虫依赖它"""
+    async def check():
+        from playwright.async_api import async_playwright
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            version = browser.version
+            await browser.close()
+        return True, f"chromium {version}"
+    return check
+
+
+def spark_check(context) -> CheckFunc:
+    """讯飞星火网络可达且熔断器未打开"""
+    async def check():
+        if context.spark_api is None:
+            return True, "未配置，使用本地关键词提取"
+        breaker: CircuitBreaker = context.spark_breaker
+        if breaker.state == OPEN:
+            return False, f"熔断中，最近错误: {breaker.last_error}"
+        host = getattr(context.spark_api, "host", None)
+        if not host:
+            return True, f"熔断器 {breaker.state}"
+        ok, detail = await tcp_reachable(host, 443)
+        return ok, f"{detail}，熔断器 {breaker.state}"
+    return check
+
+
+def mcp_check(config_path: str) -> CheckFunc:
+    """config.json 中配置的各MCP服务器端口可达，配置了多个实例时至少一个可达"""
+    async def check():
+        with open(config_path, "r", encoding="utf-8") as f:
+            servers = json.load(f).get("mcp_servers", {})
+        results = {}
+        for name, urls in servers.items():
+            for url in [urls] if isinstance(urls, str) else urls:
+                parsed = urlparse(url)
+                results[name] = await tcp_reachable(parsed.hostname, parsed.port or 80)
+                if results[name][0]:
+                    break
+        down = [name for name, (ok, _) in results.items() if not ok]
+        if down:
+            return False, f"不可达: {', '.join(down)}"
+        return True, f"{len(results)} 个服务器可达"
+    return check
+
+
+def orchestrator_check(registry_url: str) -> CheckFunc:
+    """MCP编排器汇总的健康状态，每个平台至少有一个健康实例即视为正常"""
+    health_url = registry_url.rsplit("/", 1)[0] + "/health"
+
+    async def check():
+        async with httpx.AsyncClient(timeout=2) as client:
+            response = await client.get(health_url)
+        body = response.json()
+        summary = ", ".join(f"{name} {p['healthy']}/{p['total']}" for name, p in body["platforms"].items())
+        return body["status"] != "unhealthy", f"{body['status']}: {summary}"
+    return check
+
+
+def create_health_monitor(context) -> HealthMonitor:
+    """按环境变量创建检查器"""
+    loop_monitor = LoopMonitor(
+        interval=float(os.getenv("LOOP_MONITOR_INTERVAL", "0.05")),
+        threshold=float(os.getenv("LOOP_STALL_THRESHOLD", "0.2")),
+    )
+    monitor = HealthMonitor(
+        loop_monitor,
+        max_queue_depth=int(os.getenv("READY_MAX_QUEUE_DEPTH", "32")),
+        max_loop_lag=float(os.getenv("READY_MAX_LOOP_LAG", "1.0")),
+    )
+    if os.getenv("HEALTH_CHECK_BROWSER", "True").lower() == "true":
+        # 启动浏览器较重，间隔放长
+        monitor.add_check("browser", browser_check(), critical=True, interval=60.0, timeout=30.0)
+    monitor.add_check("spark", spark_check(context), critical=False, interval=15.0)
+    config_path = os.path.join(os.path.dirname(__file__), "..", "config.json")
+    if os.getenv("MCP_REGISTRY_URL"):
+        monitor.add_check("mcp_servers", orchestrator_check(os.getenv("MCP_REGISTRY_URL")),
+                          critical=False, interval=15.0)
+    elif os.path.exists(config_path):
+        monitor.add_check("mcp_servers", mcp_check(config_path), critical=False, interval=15.0)
+    return monitor
+
+
+def create_router(monitor: HealthMonitor) -> APIRouter:
+    router = APIRouter()
+
+    @router.get("/health")
+    async def health_check():
+        """存活检查：进程和事件循环在运行即返回200"""
+        return monitor.liveness()
+
+    @router.get("/ready")
+    async def readiness_check():
+        """就绪检查：不就绪时返回503，负载均衡器应停止转发新请求"""
+        ready, body = monitor.readiness()
+        return JSONResponse(body, status_code=200 if ready else 503)
+
+    @router.get("/admin/loop", dependencies=[Depends(require_admin)])
+    async def loop_stalls():
+        """事件循环延迟与最近的卡顿记录（含阻塞时的调用栈）"""
+        return monitor.loop_monitor.snapshot()
+
+    @router.post("/admin/drain", dependencies=[Depends(require_admin)])
+    async def drain():
+        """开始排空：/ready 返回503，已接收的请求继续处理"""
+        monitor.draining = True
+        logger.info("实例进入排空状态")
+        return {"draining": True, "in_flight": int(ANALYSES_IN_FLIGHT.value)}
+
+    @router.post("/admin/undrain", dependencies=[Depends(require_admin)])
+    async def undrain():
+        monitor.draining = False
+        logger.info("实例恢复接收流量")
+        return {"draining": False}
+
+    return router
@@ -0,0 +1,241 @@
+"""
+搜索结果页解析函数
+
+全部为模块级纯函数，可以直接提交到进程池执行。返回紧凑的元组记录
+(title, content, url, author, platform)，减少跨进程序列化的开销。
+"""
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from threading import BoundedSemaphore
+from typing import Callable, Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+# lxml解析速度明显快于html.parser
+HTML_PARSER = "lxml"
+
+PostRecord = Tuple[str, str, str, str, str]
+
+RECORD_FIELDS = ("title", "content", "url", "author", "platform")
+
+
+def record_to_dict(record: PostRecord) -> Dict:
+    return dict(zip(RECORD_FIELDS, record))
+
+
+def parse_nowcoder_html(html: str) -> List[PostRecord]:
+    """解析牛客网搜索结果页"""
+    soup = BeautifulSoup(html, HTML_PARSER)
+    posts = []
+
+    try:
+        # 搜索结果页面
+        items = soup.select('.discuss-main') or soup.select('.post-item')
+
+        for item in items:
+            try:
+                title_elem = item.select_one('.post-title') or item.select_one('a')
+                if not title_elem:
+                    continue
+
+                title = title_elem.get_text(strip=True)
+
+                # 获取链接
+                link = title_elem.get('href', '')
+                if link and not link.startswith('http'):
+                    link = f"https://www.nowcoder.com{link}"
+
+                # 获取内容摘要
+                content_elem = item.select_one('.post-content') or item.select_one('.post-topic-des')
+                content = content_elem.get_text(strip=True) if content_elem else ""
+
+                # 获取作者信息
+                author_elem = item.select_one('.post-author') or item.select_one('.post-user')
+                author = author_elem.get_text(strip=True) if author_elem else "匿名用户"
+
+                # 过滤非面经内容
+                if not any(keyword in title.lower() for keyword in ['面经', '面试', 'interview']):
+                    continue
+
+                posts.append((title, content[:500], link, author, 'nowcoder'))
+
+            except Exception as e:
+                logger.warning(f"Error parsing nowcoder item: {str(e)}")
+                continue
+
+    except Exception as e:
+        logger.error(f"Error parsing nowcoder page: {str(e)}")
+
+    return posts
+
+
+def parse_xiaohongshu_html(html: str) -> List[PostRecord]:
+    """解析小红书搜索结果页"""
+    soup = BeautifulSoup(html, HTML_PARSER)
+    posts = []
+
+    try:
+        # 小红书页面可能是动态加载的，这里尝试提取可见内容
+        json_data = None
+
+        # 尝试从script标签中提取数据
+        for script in soup.select('script'):
+            script_text = script.string
+            if script_text and 'window.__INITIAL_STATE__' in script_text:
+                json_str = script_text.split('window.__INITIAL_STATE__=')[1].split(';')[0]
+                try:
+                    json_data = json.loads(json_str)
+                    break
+                except ValueError:
+                    pass
+
+        # 如果找到了JSON数据
+        if json_data and 'note' in json_data:
+            for note in json_data['note'].get('noteList', []):
+                note_id = note.get('id', '')
+                url = f"https://www.xiaohongshu.com/discovery/item/{note_id}" if note_id else ""
+                posts.append((
+                    note.get('title', '无标题'),
+                    note.get('desc', '')[:500],
+                    url,
+                    note.get('nickname', '匿名用户'),
+                    'xiaohongshu'
+                ))
+        else:
+            # 备用方案：直接从HTML中提取
+            items = soup.select('.note-item') or soup.select('.feed-item')
+
+            for item in items:
+                try:
+                    title_elem = item.select_one('.title') or item.select_one('.content-title')
+                    title = title_elem.get_text(strip=True) if title_elem else "无标题"
+
+                    content_elem = item.select_one('.desc') or item.select_one('.content')
+                    content = content_elem.get_text(strip=True) if content_elem else ""
+
+                    link_elem = item.select_one('a')
+                    link = link_elem.get('href', '') if link_elem else ""
+                    if link and not link.startswith('http'):
+                        link = f"https://www.xiaohongshu.com{link}"
+
+                    author_elem = item.select_one('.author') or item.select_one('.nickname')
+                    author = author_elem.get_text(strip=True) if author_elem else "匿名用户"
+
+                    posts.append((title, content[:500], link, author, 'xiaohongshu'))
+
+                except Exception as e:
+                    logger.warning(f"Error parsing xiaohongshu item: {str(e)}")
+                    continue
+
+    except Exception as e:
+        logger.error(f"Error parsing xiaohongshu page: {str(e)}")
+
+    return posts
+
+
+def parse_zhihu_html(html: str) -> List[PostRecord]:
+    """解析知乎搜索结果页"""
+    soup = BeautifulSoup(html, HTML_PARSER)
+    posts = []
+
+    try:
+        # 知乎搜索结果页
+        items = soup.select('.SearchResult-Card') or soup.select('.AnswerItem') or soup.select('.ContentItem')
+
+        for item in items:
+            try:
+                # 提取标题
+                title_elem = item.select_one('.ContentItem-title') or item.select_one('.QuestionItem-title')
+                title = title_elem.get_text(strip=True) if title_elem else "无标题"
+
+                # 提取内容
+                content_elem = item.select_one('.RichContent-inner') or item.select_one('.SearchResult-snippet')
+                content = content_elem.get_text(strip=True) if content_elem else ""
+
+                # 提取链接
+                link_elem = item.select_one('a')
+                link = link_elem.get('href', '') if link_elem else ""
+                if link and not link.startswith('http'):
+                    link = f"https://www.zhihu.com{link}"
+
+                # 提取作者
+                author_elem = item.select_one('.AuthorInfo-name') or item.select_one('.UserLink-link')
+                author = author_elem.get_text(strip=True) if author_elem else "匿名用户"
+
+                # 过滤非面经内容
+                if not any(keyword in title.lower() or keyword in content.lower() for keyword in ['面经', '面试', 'interview']):
+                    continue
+
+                posts.append((title, content[:500], link, author, 'zhihu'))
+
+            except Exception as e:
+                logger.warning(f"Error parsing zhihu item: {str(e)}")
+                continue
+
+    except Exception as e:
+        logger.error(f"Error parsing zhihu page: {str(e)}")
+
+    return posts
+
+
+PARSERS: Dict[str, Callable[[str], List[PostRecord]]] = {
+    'nowcoder': parse_nowcoder_html,
+    'xiaohongshu': parse_xiaohongshu_html,
+    'zhihu': parse_zhihu_html,
+}
+
+
+def parse_page(platform: str, html: str) -> List[PostRecord]:
+    """按平台分发解析（进程池任务入口）"""
+    parser = PARSERS.get(platform)
+    return parser(html) if parser else []
+
+
+class ParseStage:
+    """进程池解析阶段
+
+    HTML在工作进程中解析，绕开GIL。未完成的解析任务数不超过max_pending，
+    达到上限时提交方阻塞（同步）或挂起（异步），从而对抓取阶段形成背压。
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        """
+        :param workers: 工作进程数，默认CPU核数
+        :param max_pending: 最多允许排队中的页面数，默认工作进程数的2倍
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 2
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._slots = BoundedSemaphore(self.max_pending)
+        self._async_slots = None
+
+    def submit(self, platform: str, html: str):
+        """提交解析任务，排队已满时阻塞调用线程
+
+        :return: 结果为 List[PostRecord] 的 concurrent.futures.Future
+        """
+        self._slots.acquire()
+        try:
+            future = self.executor.submit(parse_page, platform, html)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    async def parse(self, platform: str, html: str) -> List[Dict]:
+        """在事件循环中提交解析任务，排队已满时挂起等待"""
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self.max_pending)
+        async with self._async_slots:
+            loop = asyncio.get_running_loop()
+            records = await loop.run_in_executor(self.executor, parse_page, platform, html)
+        return [record_to_dict(r) for r in records]
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
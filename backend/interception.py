@@ -0,0 +1,157 @@
+"""
+浏览器子请求拦截
+
+爬虫只需要搜索结果的DOM，图片、字体、音视频和统计埋点既占带宽，又会推迟 networkidle。
+RequestInterceptor 挂在 page.route 上，按平台规则放行或中止每个子请求：
+
+1. 命中 allow 规则的URL一律放行（如验证码图片）
+2. 命中 deny 规则的URL一律拦截（统计、广告、监控上报）
+3. 其余按资源类型拦截（image、media、font）
+
+被拦截的请求数和按资源类型估算的节省字节数记入指标；放行请求的实际字节数
+取自响应头 Content-Length。设置 CRAWL_BLOCK_RESOURCES=False 可整体关闭拦截。
+
+放行的脚本和样式表交给 browser_state.AssetCache，命中磁盘缓存时直接返回，不再走网络。
+"""
+import os
+import re
+from fnmatch import translate
+from typing import Dict, Iterable, Optional, Pattern
+
+from .browser_state import CACHEABLE_TYPES, AssetCache, asset_cache
+from .metrics import CRAWL_BYTES_LOADED, CRAWL_BYTES_SAVED, CRAWL_REQUESTS_BLOCKED
+
+# 被拦截请求的估算大小(字节)，用于统计节省的流量
+ESTIMATED_BYTES = {
+    "image": 30 * 1024,
+    "media": 500 * 1024,
+    "font": 80 * 1024,
+    "script": 40 * 1024,
+    "stylesheet": 20 * 1024,
+    "xhr": 1024,
+    "fetch": 1024,
+    "ping": 256,
+}
+
+# 各平台共用的第三方统计与广告域名
+TRACKERS = (
+    "*://hm.baidu.com/*",
+    "*://*.googletagmanager.com/*",
+    "*://*.google-analytics.com/*",
+    "*://*.doubleclick.net/*",
+    "*://*.cnzz.com/*",
+    "*://*.umeng.com/*",
+    "*://*.growingio.com/*",
+    "*://*.sentry.io/*",
+)
+
+
+def _compile(patterns: Iterable[str]) -> Optional[Pattern]:
+    """把URL通配符（同Playwright的glob写法）合并为一个正则"""
+    patterns = list(patterns)
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{translate(p)})" for p in patterns))
+
+
+class InterceptionRules:
+    """单个平台的拦截规则"""
+
+    def __init__(self, block_types: Iterable[str] = ("image", "media", "font"),
+                 deny: Iterable[str] = TRACKERS, allow: Iterable[str] = ()):
+        """
+        :param block_types: 按Playwright resource_type拦截的资源类型
+        :param deny: 总是拦截的URL通配符
+        :param allow: 总是放行的URL通配符，优先于 deny 和 block_types
+        """
+        self.block_types = frozenset(block_types)
+        self.deny = _compile(deny)
+        self.allow = _compile(allow)
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        if self.allow is not None and self.allow.match(url):
+            return False
+        if self.deny is not None and self.deny.match(url):
+            return True
+        return resource_type in self.block_types
+
+
+PLATFORM_RULES: Dict[str, InterceptionRules] = {
+    "nowcoder": InterceptionRules(),
+    "zhihu": InterceptionRules(
+        deny=TRACKERS + (
+            # 知乎前端埋点与性能上报
+            "*://datahub.zhihu.com/*",
+            "*://zhihu-web-analytics.zhihu.com/*",
+            "*://apm.zhihu.com/*",
+        ),
+        # 登录/验证码图片需要加载，否则页面会卡在验证步骤
+        allow=("*://*.zhihu.com/api/v3/oauth/captcha*",),
+    ),
+    "xiaohongshu": InterceptionRules(
+        deny=TRACKERS + (
+            # 小红书埋点与监控上报
+            "*://t2.xiaohongshu.com/*",
+            "*://apm-fe.xiaohongshu.com/*",
+            "*://spltest.xiaohongshu.com/*",
+        ),
+        allow=("*://*.xiaohongshu.com/api/redcaptcha/*",),
+    ),
+}
+
+
+def interception_enabled() -> bool:
+    return os.getenv("CRAWL_BLOCK_RESOURCES", "True").lower() == "true"
+
+
+class RequestInterceptor:
+    """把平台规则应用到一个Playwright页面上"""
+
+    def __init__(self, platform: str, rules: Optional[InterceptionRules] = None, block: bool = True,
+                 assets: Optional[AssetCache] = None):
+        """
+        :param block: 是否按规则拦截，False 时只做静态资源缓存
+        :param assets: 静态资源缓存，None 时放行的请求直接走网络
+        """
+        self.platform = platform
+        self.rules = rules or PLATFORM_RULES.get(platform) or InterceptionRules()
+        self.block = block
+        self.assets = assets
+        self.blocked = 0
+        self.bytes_saved = 0
+        self.bytes_loaded = 0
+
+    async def install(self, page):
+        """在导航之前调用"""
+        await page.route("**/*", self._handle)
+        page.on("response", self._on_response)
+
+    async def _handle(self, route, request):
+        resource_type = request.resource_type
+        if self.block and self.rules.should_block(request.url, resource_type):
+            saved = ESTIMATED_BYTES.get(resource_type, 0)
+            self.blocked += 1
+            self.bytes_saved += saved
+            CRAWL_REQUESTS_BLOCKED.labels(self.platform, resource_type).inc()
+            CRAWL_BYTES_SAVED.labels(self.platform).inc(saved)
+            await route.abort("blockedbyclient")
+        elif self.assets is not None and resource_type in CACHEABLE_TYPES and request.method == "GET":
+            await self.assets.handle(route, request)
+        else:
+            await route.continue_()
+
+    def _on_response(self, response):
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            self.bytes_loaded += int(length)
+            CRAWL_BYTES_LOADED.labels(self.platform).inc(int(length))
+
+
+async def install_interception(page, platform: str) -> Optional[RequestInterceptor]:
+    """按环境变量为页面安装拦截和静态资源缓存，两者都关闭时返回None"""
+    block, assets = interception_enabled(), asset_cache()
+    if not block and assets is None:
+        return None
+    interceptor = RequestInterceptor(platform, block=block, assets=assets)
+    await interceptor.install(page)
+    return interceptor
@@ -0,0 +1,192 @@
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DEFAULT_DICTIONARY = os.path.join(DATA_DIR, "skills.json")
+DEFAULT_CORPUS = os.path.join(DATA_DIR, "jd_corpus.txt")
+
+_ASCII_WORD = re.compile(r"[0-9a-z]")
+
+
+class AhoCorasick:
+    """Aho–Corasick多模式匹配自动机
+
+    一次线性扫描即可找出文本中所有词典词条的出现位置，与词典规模无关。
+    """
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[Tuple[int, int]]] = [[]]  # (词条ID, 词条长度)
+
+    def add(self, pattern: str, value: int):
+        """添加模式串，value为匹配时返回的词条ID"""
+        node = 0
+        for ch in pattern:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = nxt
+        self.output[node].append((value, len(pattern)))
+
+    def build(self):
+        """按BFS顺序计算失配指针，并合并后缀节点的输出"""
+        queue = list(self.goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[child] = target if target != child else 0
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def iter_matches(self, text: str) -> Iterable[Tuple[int, int, int]]:
+        """扫描文本，产出 (起始位置, 结束位置, 词条ID)"""
+        goto, fail, output = self.goto, self.fail, self.output
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for value, length in output[node]:
+                yield i - length + 1, i + 1, value
+
+
+class KeywordExtractor:
+    """基于技能词典和TF-IDF的本地关键词提取器
+
+    词典中的同义词统一归一为标准词条；在背景JD语料上统计文档频率，
+    出现越普遍的词条（如"沟通能力"）权重越低。
+    """
+
+    def __init__(self, terms: List[Dict], corpus: Optional[List[str]] = None):
+        """
+        :param terms: 词条列表，每项包含term、category和可选的synonyms
+        :param corpus: 背景语料，每项为一段JD文本
+        """
+        self.terms: List[str] = []
+        self.categories: List[str] = []
+        self.automaton = AhoCorasick()
+        seen = set()
+
+        for entry in terms:
+            term_id = len(self.terms)
+            self.terms.append(entry["term"])
+            self.categories.append(entry.get("category", ""))
+            for surface in [entry["term"]] + list(entry.get("synonyms", [])):
+                surface = surface.lower().strip()
+                if not surface or surface in seen:
+                    continue
+                seen.add(surface)
+                self.automaton.add(surface, term_id)
+        self.automaton.build()
+
+        self.term_index = {term: i for i, term in enumerate(self.terms)}
+        self.doc_count = 0
+        self.doc_freq: Counter = Counter()
+        if corpus:
+            self.fit(corpus)
+
+    @classmethod
+    def load(cls, dictionary_path: str = DEFAULT_DICTIONARY,
+             corpus_path: Optional[str] = DEFAULT_CORPUS) -> "KeywordExtractor":
+        """从词典JSON和背景语料文件加载提取器"""
+        with open(dictionary_path, "r", encoding="utf-8") as f:
+            terms = json.load(f)["terms"]
+
+        corpus = None
+        if corpus_path and os.path.exists(corpus_path):
+            with open(corpus_path, "r", encoding="utf-8") as f:
+                corpus = [line.strip() for line in f if line.strip()]
+
+        extractor = cls(terms, corpus)
+        logger.info(f"本地关键词词典加载完成: {len(extractor.terms)} 个词条, 背景语料 {extractor.doc_count} 篇")
+        return extractor
+
+    def fit(self, corpus: List[str]):
+        """在背景语料上统计每个词条的文档频率"""
+        for doc in corpus:
+            self.doc_count += 1
+            self.doc_freq.update(set(self.match_terms(doc)))
+
+    def idf(self, term_id: int) -> float:
+        return math.log((1 + self.doc_count) / (1 + self.doc_freq[term_id])) + 1
+
+    def match_terms(self, text: str) -> List[int]:
+        """返回文本中命中的词条ID（最左最长匹配，不重叠）"""
+        text = text.lower()
+        matches = sorted(self.automaton.iter_matches(text), key=lambda m: (m[0], m[0] - m[1]))
+
+        result = []
+        last_end = 0
+        for start, end, term_id in matches:
+            if start < last_end:
+                continue
+            # 英文词条必须是完整单词，避免"go"命中"google"
+            if _ASCII_WORD.match(text[start]) and start > 0 and _ASCII_WORD.match(text[start - 1]):
+                continue
+            if _ASCII_WORD.match(text[end - 1]) and end < len(text) and _ASCII_WORD.match(text[end]):
+                continue
+            result.append(term_id)
+            last_end = end
+        return result
+
+    def score(self, position: str, requirements: str) -> List[Tuple[str, str, float]]:
+        """计算词条得分，职位名称中的命中权重加倍
+
+        :return: 按得分降序排列的 (词条, 类别, 得分)
+        """
+        tf: Counter = Counter()
+        for term_id in self.match_terms(position):
+            tf[term_id] += 2
+        for term_id in self.match_terms(requirements):
+            tf[term_id] += 1
+
+        scored = [
+            (self.terms[term_id], self.categories[term_id], (1 + math.log(count)) * self.idf(term_id))
+            for term_id, count in tf.items()
+        ]
+        scored.sort(key=lambda item: item[2], reverse=True)
+        return scored
+
+    def extract(self, position: str, requirements: str, top_k: int = 8) -> List[str]:
+        """提取前top_k个关键词"""
+        return [term for term, _, _ in self.score(position, requirements)[:top_k]]
+
+    def category_of(self, keyword: str) -> str:
+        """返回关键词所属类别，不在词典中时返回空字符串"""
+        term_id = self.term_index.get(keyword)
+        if term_id is None:
+            ids = self.match_terms(keyword)
+            term_id = ids[0] if ids else None
+        return self.categories[term_id] if term_id is not None else ""
+
+
+_default_extractor: Optional[KeywordExtractor] = None
+
+
+def get_keyword_extractor() -> KeywordExtractor:
+    """获取默认提取器（首次调用时加载词典和语料）"""
+    global _default_extractor
+    if _default_extractor is None:
+        _default_extractor = KeywordExtractor.load(
+            os.getenv("SKILL_DICTIONARY", DEFAULT_DICTIONARY),
+            os.getenv("SKILL_CORPUS", DEFAULT_CORPUS)
+        )
+    return _default_extractor
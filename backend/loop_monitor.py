@@ -0,0 +1,124 @@
+"""
+事件循环延迟监控与阻塞调用检测
+
+- 心跳协程每隔 interval 秒醒来一次，实际唤醒时间与预期之差即为调度延迟
+- 看门狗线程独立于事件循环运行：心跳超过 threshold 秒未更新时，
+  直接读取事件循环线程当前的调用栈，定位正在阻塞循环的代码
+- 循环恢复后记录一次卡顿：写入指标，并输出一条JSON格式的结构化日志
+"""
+import asyncio
+import json
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from .metrics import LOOP_LAG, LOOP_LAG_SECONDS, LOOP_STALLS
+
+logger = logging.getLogger(__name__)
+
+# 调用栈中只保留最内层的若干帧
+STACK_DEPTH = 25
+
+
+class LoopMonitor:
+    """事件循环调度延迟与卡顿检测"""
+
+    def __init__(self, interval: float = 0.05, threshold: float = 0.2, history: int = 50):
+        """
+        :param interval: 心跳间隔(秒)
+        :param threshold: 心跳超时多久视为卡顿(秒)
+        :param history: 内存中保留的卡顿记录条数
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = 0.0
+        self.stalls: Deque[Dict] = deque(maxlen=history)
+        self._lags: Deque[float] = deque(maxlen=max(1, int(5 / interval)))
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._pending_stack: Optional[List[str]] = None
+        self._stop = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+
+    def recent_max_lag(self) -> float:
+        """最近约5秒内的最大调度延迟(秒)"""
+        return max(self._lags, default=0.0)
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_beat = now
+            lag = max(0.0, now - expected)
+            self.lag = lag
+            self._lags.append(lag)
+            LOOP_LAG.set(lag)
+            LOOP_LAG_SECONDS.observe(lag)
+            if lag >= self.threshold:
+                self._record_stall(lag)
+
+    def _record_stall(self, lag: float):
+        stack = self._pending_stack
+        self._pending_stack = None
+        record = {
+            "event": "event_loop_stall",
+            "duration_ms": round(lag * 1000, 1),
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "timestamp": time.time(),
+            # 没有栈说明卡顿在看门狗下一次检查之前就结束了
+            "stack": stack or [],
+        }
+        self.stalls.append(record)
+        LOOP_STALLS.inc()
+        logger.warning(json.dumps(record, ensure_ascii=False))
+
+    def _capture_stack(self) -> List[str]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return []
+        entries = traceback.extract_stack(frame, limit=STACK_DEPTH)
+        return [f"{e.filename}:{e.lineno} {e.name}" + (f" | {e.line}" if e.line else "") for e in entries]
+
+    def _watch(self):
+        captured_for = None
+        while not self._stop.wait(self.interval):
+            beat = self._last_beat
+            # 心跳预期在 beat+interval 到来，超过 threshold 仍未到来才算卡顿
+            if time.monotonic() - beat > self.interval + self.threshold and captured_for != beat:
+                # 每次卡顿只取一次栈，取栈时事件循环线程仍停在阻塞代码中
+                self._pending_stack = self._capture_stack()
+                captured_for = beat
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> Dict:
+        return {
+            "lag_ms": round(self.lag * 1000, 2),
+            "recent_max_lag_ms": round(self.recent_max_lag() * 1000, 2),
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "stalls": list(self.stalls),
+        }
@@ -0,0 +1,413 @@
+"""
+Prometheus风格的指标采集
+
+不依赖prometheus_client，提供Counter、Gauge、Histogram三种指标和文本格式导出。
+热路径上只有一次字典查找、一次加锁和几次算术运算；带标签的子指标在首次使用后缓存，
+调用方可以把 metric.labels(...) 的结果保存下来重复使用。
+
+用法:
+    from backend.metrics import STAGE_SECONDS
+
+    with STAGE_SECONDS.labels("keyword_extraction").time():
+        keywords = extract(...)
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 默认直方图桶(秒)，覆盖从本地提取的毫秒级到浏览器爬取的数十秒
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Timer:
+    """计时上下文管理器，退出时把耗时记录到目标指标"""
+
+    __slots__ = ("_observe", "_start")
+
+    def __init__(self, observe: Callable[[float], None]):
+        self._observe = observe
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._observe(time.perf_counter() - self._start)
+
+
+class _Metric:
+    """指标基类：管理标签与子指标"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values, **kwargs) -> "_Metric":
+        """返回对应标签值的子指标"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} 需要标签 {self.labelnames}，实际为 {key}")
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def _new_child(self) -> "_Metric":
+        raise NotImplementedError
+
+    def _own_samples(self, labels: Dict[str, str]) -> List[Sample]:
+        raise NotImplementedError
+
+    def samples(self) -> List[Sample]:
+        if not self.labelnames:
+            return self._own_samples({})
+        result = []
+        for key, child in list(self._children.items()):
+            result.extend(child._own_samples(dict(zip(self.labelnames, key))))
+        return result
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._value = 0.0
+
+    def _new_child(self) -> "Counter":
+        return Counter(self.name, self.documentation)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def _own_samples(self, labels):
+        return [(self.name, labels, self._value)]
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值，也可以绑定一个在导出时求值的函数"""
+
+    type_name = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def _new_child(self) -> "Gauge":
+        return Gauge(self.name, self.documentation)
+
+    def set(self, value: float):
+        self._value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self._value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        self._function = function
+
+    def track_inprogress(self) -> "_InProgress":
+        """进入时加一、退出时减一的上下文管理器"""
+        return _InProgress(self)
+
+    @property
+    def value(self) -> float:
+        return float(self._function()) if self._function else self._value
+
+    def _own_samples(self, labels):
+        return [(self.name, labels, self.value)]
+
+
+class _InProgress:
+    __slots__ = ("_gauge",)
+
+    def __init__(self, gauge: Gauge):
+        self._gauge = gauge
+
+    def __enter__(self):
+        self._gauge.inc()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._gauge.dec()
+
+
+class Histogram(_Metric):
+    """累积直方图"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional["Registry"] = None, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+
+    def _new_child(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def time(self) -> _Timer:
+        return _Timer(self.observe)
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def _own_samples(self, labels):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+        samples.append((f"{self.name}_sum", labels, total))
+        samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class Registry:
+    """指标注册表，负责导出Prometheus文本格式"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标 {metric.name} 已注册")
+            self._metrics[metric.name] = metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]):
+        """注册导出时调用的采集函数，返回 (名称, 类型, 说明, 样本列表) 序列"""
+        self._collectors.append(collector)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def collect(self) -> List[Tuple[str, str, str, List[Sample]]]:
+        families = [(m.name, m.type_name, m.documentation, m.samples()) for m in list(self._metrics.values())]
+        for collector in list(self._collectors):
+            families.extend(collector())
+        return families
+
+    def render(self) -> str:
+        lines = []
+        for name, type_name, documentation, samples in self.collect():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {type_name}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# ---- 缓存统计 ----
+
+_tracked_caches: Dict[str, object] = {}
+
+
+def track_cache(name: str, cache) -> None:
+    """导出缓存的命中、未命中、淘汰与大小，cache需提供 stats() 方法（如 backend.cache.TTLCache）"""
+    _tracked_caches[name] = cache
+
+
+def _collect_caches():
+    stats = {name: cache.stats() for name, cache in list(_tracked_caches.items())}
+    families = [
+        ("cache_hits_total", "counter", "缓存命中次数", "hits"),
+        ("cache_misses_total", "counter", "缓存未命中次数", "misses"),
+        ("cache_evictions_total", "counter", "缓存容量淘汰次数", "evictions"),
+        ("cache_entries", "gauge", "缓存当前条目数", "size"),
+    ]
+    return [
+        (metric, type_name, documentation,
+         [(metric, {"cache": name}, s.get(field, 0)) for name, s in stats.items()])
+        for metric, type_name, documentation, field in families
+    ]
+
+
+REGISTRY.add_collector(_collect_caches)
+
+
+# ---- 爬虫身份统计 ----
+
+_tracked_identities: Dict[str, object] = {}
+
+
+def track_identities(platform: str, pool) -> None:
+    """导出身份池中每个身份的请求数、延迟、错误率与得分，pool需提供 stats() 方法（backend.identities.IdentityPool）"""
+    _tracked_identities[platform] = pool
+
+
+def _collect_identities():
+    stats = {platform: pool.stats() for platform, pool in list(_tracked_identities.items())}
+    families = [
+        ("crawl_identity_requests_total", "counter", "各爬虫身份的请求次数", "requests"),
+        ("crawl_identity_errors_total", "counter", "各爬虫身份的失败次数", "errors"),
+        ("crawl_identity_latency_seconds", "gauge", "各爬虫身份的滑动平均延迟", "latency_ms"),
+        ("crawl_identity_error_rate", "gauge", "各爬虫身份的滑动平均错误率", "error_rate"),
+        ("crawl_identity_score", "gauge", "各爬虫身份的选择得分", "score"),
+        ("crawl_identity_quarantined_seconds", "gauge", "各爬虫身份剩余的隔离时间", "quarantined_for_s"),
+    ]
+    return [
+        (metric, type_name, documentation,
+         [(metric, {"platform": platform, "identity": s["identity"]},
+           (s[field] or 0) / 1000 if field == "latency_ms" else s[field])
+          for platform, entries in stats.items() for s in entries])
+        for metric, type_name, documentation, field in families
+    ]
+
+
+REGISTRY.add_collector(_collect_identities)
+
+
+# ---- 应用指标 ----
+
+STAGE_SECONDS = Histogram(
+    "analysis_stage_duration_seconds", "职位分析各阶段耗时", ["stage"], REGISTRY)
+
+CRAWL_SECONDS = Histogram(
+    "crawl_platform_duration_seconds", "单个平台一次搜索的总耗时", ["platform"], REGISTRY)
+
+CRAWL_STEP_SECONDS = Histogram(
+    "crawl_step_duration_seconds", "爬虫内部步骤耗时（启动浏览器、导航、等待渲染、单条提取）",
+    ["platform", "step"], REGISTRY,
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+
+CRAWL_ITEMS = Counter(
+    "crawl_items_total", "爬取到的面经条数", ["platform"], REGISTRY)
+
+CRAWL_YIELD = Gauge(
+    "crawl_platform_yield", "各平台在各查询类别上的产出（每秒爬取的相关面经数，滑动平均）",
+    ["platform", "category"], REGISTRY)
+
+ROUTING_DECISIONS = Counter(
+    "crawl_routing_decisions_total", "平台路由决策（crawl 爬取、learn 样本不足、skip 跳过、explore 探索）",
+    ["platform", "decision"], REGISTRY)
+
+QUERY_PLAN_QUERIES = Counter(
+    "crawl_plan_queries_total", "查询规划中各查询的结果（useful 有新帖子、exhausted 没有收获、skipped 早停跳过）",
+    ["outcome"], REGISTRY)
+
+PREWARM_QUERIES = Counter(
+    "crawl_prewarm_queries_total", "预热查询的结果（crawled 已爬取、deferred 因线上流量推迟、failed 失败）",
+    ["outcome"], REGISTRY)
+
+RENDER_TIMEOUT = Gauge(
+    "crawl_render_timeout_seconds", "按近期渲染耗时p99推算的渲染等待超时", ["platform"], REGISTRY)
+
+CRAWL_REQUESTS_BLOCKED = Counter(
+    "crawl_requests_blocked_total", "爬虫页面中被拦截的子请求数", ["platform", "resource_type"], REGISTRY)
+
+CRAWL_BYTES_SAVED = Counter(
+    "crawl_bytes_saved_total", "拦截子请求节省的流量（按资源类型估算，字节）", ["platform"], REGISTRY)
+
+CRAWL_BYTES_LOADED = Counter(
+    "crawl_bytes_loaded_total", "爬虫页面实际加载的流量（响应头Content-Length，字节）", ["platform"], REGISTRY)
+
+ERRORS = Counter(
+    "errors_total", "各组件的错误次数", ["component", "kind"], REGISTRY)
+
+RETRIES = Counter(
+    "retries_total", "各组件的重试次数", ["component"], REGISTRY)
+
+SPARK_REQUESTS = Counter(
+    "spark_keyword_requests_total", "讯飞星火关键词提取请求结果", ["outcome"], REGISTRY)
+
+BROWSERS_OPEN = Gauge(
+    "browsers_open", "当前打开的浏览器实例数", registry=REGISTRY)
+
+CRAWLS_IN_FLIGHT = Gauge(
+    "crawls_in_flight", "正在进行的平台爬取任务数", registry=REGISTRY)
+
+ANALYSES_IN_FLIGHT = Gauge(
+    "analyses_in_flight", "正在处理的职位分析请求数（排队深度）", registry=REGISTRY)
+
+LOOP_LAG = Gauge(
+    "event_loop_lag_seconds", "事件循环调度延迟（最近一次采样）", registry=REGISTRY)
+
+LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_distribution_seconds", "事件循环调度延迟分布", registry=REGISTRY,
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+
+LOOP_STALLS = Counter(
+    "event_loop_stalls_total", "事件循环卡顿次数（调度延迟超过阈值）", registry=REGISTRY)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP请求数", ["method", "route", "status"], REGISTRY)
+
+HTTP_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP请求处理耗时", ["method", "route"], REGISTRY)
+
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "正在处理的HTTP请求数", registry=REGISTRY)
+
+
+def render_latest() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,375 @@
+"""
+热门岗位预热
+
+爬取结果缓存只在有人查过之后才生效，热门岗位每过 CRAWL_CACHE_TTL 就有一个请求要付出完整的爬取时间。
+PrewarmScheduler 记录各 (职位, 公司) 的请求频率，在低峰期提前重新爬取最热门的岗位，写回爬取缓存：
+
+- 职位和公司规范化后（全角转半角、小写、去掉括号内容和空白）作为键，请求次数按 PREWARM_HALF_LIFE 指数衰减
+- 每 PREWARM_CHECK_INTERVAL 秒把本进程新增的计数合并进 CACHE_DIR/prewarm.json，多个工作进程共享同一份统计；
+  只有拿到 CACHE_DIR/prewarm.lock 文件锁的进程执行预热，避免重复爬取
+- 距上次预热超过 PREWARM_INTERVAL，且最近 PREWARM_IDLE_WINDOW 秒内所有进程的请求数不超过 PREWARM_IDLE_REQUESTS
+  （设置 PREWARM_HOURS=2-6 时还须处于该时段）才开始一轮预热
+- 一轮预热取得分最高的 PREWARM_TOP_N 个岗位，跳过 PREWARM_REFRESH 秒内预热过的；查询逐个执行，
+  每个查询前确认本进程没有进行中的分析和爬取、全局请求数仍在低峰线以下，否则推迟到下一轮
+
+预热只能用本地提取器生成查询，讯飞星火关键词生成的变体无法提前覆盖；
+但“公司 职位 面经”“职位 面经”两个查询与关键词无关，总能命中。设置 PREWARM=False 可关闭。
+"""
+import asyncio
+import json
+import os
+import re
+import time
+import unicodedata
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .crawlers import CACHE_DIR, CRAWL_CACHE_TTL, CRAWL_TIME_BUDGET
+from .metrics import ANALYSES_IN_FLIGHT, CRAWLS_IN_FLIGHT, PREWARM_QUERIES
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，每个进程各自预热
+    fcntl = None
+
+# 请求计数的半衰期(秒)
+PREWARM_HALF_LIFE = float(os.getenv("PREWARM_HALF_LIFE", str(3 * 24 * 3600)))
+# 每轮预热的岗位数
+PREWARM_TOP_N = int(os.getenv("PREWARM_TOP_N", "10"))
+# 衰减后得分低于该值的岗位不预热
+PREWARM_MIN_SCORE = float(os.getenv("PREWARM_MIN_SCORE", "2"))
+# 两轮预热的最小间隔(秒)
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", "1800"))
+# 同一岗位的最小预热间隔(秒)，默认为缓存有效期的一半
+PREWARM_REFRESH = float(os.getenv("PREWARM_REFRESH", str(CRAWL_CACHE_TTL / 2)))
+# 合并计数与检查是否需要预热的间隔(秒)
+PREWARM_CHECK_INTERVAL = float(os.getenv("PREWARM_CHECK_INTERVAL", "60"))
+# 低峰判断：最近 PREWARM_IDLE_WINDOW 秒内的请求数不超过 PREWARM_IDLE_REQUESTS
+PREWARM_IDLE_WINDOW = float(os.getenv("PREWARM_IDLE_WINDOW", "600"))
+PREWARM_IDLE_REQUESTS = int(os.getenv("PREWARM_IDLE_REQUESTS", "2"))
+# 允许预热的时段（本地时间，如 "2-6"，可跨零点如 "23-5"），为空时不限时段
+PREWARM_HOURS = os.getenv("PREWARM_HOURS", "")
+# 每个预热查询的各平台时间预算(秒)
+PREWARM_CRAWL_SECONDS = float(os.getenv("PREWARM_CRAWL_SECONDS", str(CRAWL_TIME_BUDGET)))
+# 统计文件中最多保留的岗位数
+PREWARM_MAX_ENTRIES = 500
+
+# 职位名称中不影响搜索的括号内容，如“（2025届）”“【急招】”
+_BRACKETS = re.compile(r"[(\[【（][^)\]】）]*[)\]】）]")
+_NON_WORD = re.compile(r"[\s\W_]+")
+
+
+def normalize(text: str) -> str:
+    """规范化职位或公司名称：全角转半角、小写、去掉括号内容、空白与标点"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return _NON_WORD.sub("", _BRACKETS.sub("", text))
+
+
+def demand_key(position: str, company: str = "") -> str:
+    return f"{normalize(position)}|{normalize(company)}"
+
+
+def parse_hours(spec: str):
+    """解析 "2-6" 形式的时段，返回 (开始小时, 结束小时)，为空时返回None"""
+    if not spec.strip():
+        return None
+    start, _, end = spec.partition("-")
+    return int(start) % 24, int(end or start) % 24
+
+
+def in_hours(hours, now: Optional[datetime] = None) -> bool:
+    if hours is None:
+        return True
+    hour = (now or datetime.now()).hour
+    start, end = hours
+    return start <= hour < end if start < end else hour >= start or hour < end
+
+
+class DemandTracker:
+    """按 (职位, 公司) 统计请求频率，进程内先累计，flush() 时合并进共享的统计文件"""
+
+    def __init__(self, state_path: Optional[str] = None, half_life: float = PREWARM_HALF_LIFE,
+                 idle_window: float = PREWARM_IDLE_WINDOW):
+        """
+        :param state_path: 共享统计文件路径，None时只保存在内存中
+        :param half_life: 请求计数的半衰期(秒)
+        :param idle_window: 保留多长时间内的每分钟请求数(秒)，用于低峰判断
+        """
+        self.state_path = state_path
+        self.half_life = half_life
+        self.idle_window = idle_window
+        self.state: Dict = {"entries": {}, "traffic": {}}
+        # 尚未合并的本进程计数：键 -> {position, company, requirements, count, prewarmed}
+        self._pending: Dict[str, Dict] = {}
+        # 尚未合并的每分钟请求数
+        self._traffic: Dict[str, int] = {}
+
+    def record(self, position: str, company: str = "", requirements: str = ""):
+        """记录一次分析请求，只更新内存，不做I/O"""
+        key = demand_key(position, company)
+        if key.startswith("|"):
+            return
+        pending = self._pending.setdefault(key, {"count": 0})
+        pending.update(position=position, company=company, requirements=(requirements or "")[:2000])
+        pending["count"] += 1
+        minute = str(int(time.time() // 60))
+        self._traffic[minute] = self._traffic.get(minute, 0) + 1
+
+    def mark_prewarmed(self, key: str):
+        self._pending.setdefault(key, {"count": 0})["prewarmed"] = time.time()
+
+    def _decayed(self, entry: Dict, now: float) -> float:
+        return entry["score"] * 0.5 ** (max(0.0, now - entry["updated"]) / self.half_life)
+
+    @contextmanager
+    def _file_lock(self):
+        """合并统计时的跨进程互斥，只持有读改写一个文件的时间"""
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.state_path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self) -> Dict:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            return {"entries": dict(state.get("entries", {})), "traffic": dict(state.get("traffic", {}))}
+        except FileNotFoundError:
+            return {"entries": {}, "traffic": {}}
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"载入预热统计失败: {str(e)}")
+            return {"entries": {}, "traffic": {}}
+
+    def _write(self, state: Dict):
+        tmp = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp, self.state_path)
+
+    def _merge(self, state: Dict, pending: Dict[str, Dict], traffic: Dict[str, int], now: float) -> Dict:
+        entries = state["entries"]
+        for key, update in pending.items():
+            entry = entries.get(key)
+            if entry is None:
+                if "position" not in update:
+                    continue
+                entry = entries[key] = {"score": 0.0, "updated": now, "requests": 0, "prewarmed": 0.0}
+            entry["score"] = self._decayed(entry, now) + update["count"]
+            entry["updated"] = now
+            entry["requests"] += update["count"]
+            for field in ("position", "company", "requirements", "prewarmed"):
+                if field in update:
+                    entry[field] = update[field]
+
+        # 得分衰减到可以忽略的岗位丢弃，并限制条目数
+        live = sorted(((self._decayed(entry, now), key) for key, entry in entries.items()), reverse=True)
+        state["entries"] = {key: entries[key] for score, key in live[:PREWARM_MAX_ENTRIES] if score >= 0.05}
+
+        oldest = int((now - self.idle_window) // 60)
+        merged_traffic = {minute: count for minute, count in state["traffic"].items() if int(minute) >= oldest}
+        for minute, count in traffic.items():
+            if int(minute) >= oldest:
+                merged_traffic[minute] = merged_traffic.get(minute, 0) + count
+        state["traffic"] = merged_traffic
+        return state
+
+    def flush(self) -> Dict:
+        """把本进程新增的计数合并进共享统计并返回合并后的状态；有文件I/O，应在线程池中调用"""
+        pending, self._pending = self._pending, {}
+        traffic, self._traffic = self._traffic, {}
+        now = time.time()
+        if self.state_path is None:
+            self.state = self._merge(self.state, pending, traffic, now)
+            return self.state
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            with self._file_lock():
+                self.state = self._merge(self._read(), pending, traffic, now)
+                self._write(self.state)
+        except OSError as e:
+            print(f"保存预热统计失败: {str(e)}")
+            self.state = self._merge(self.state, pending, traffic, now)
+        return self.state
+
+    def recent_requests(self, now: Optional[float] = None) -> int:
+        """最近 idle_window 秒内所有进程的请求数（截至上次flush）加上本进程尚未合并的请求数"""
+        now = time.time() if now is None else now
+        oldest = int((now - self.idle_window) // 60)
+        return sum(count for traffic in (self.state["traffic"], self._traffic)
+                   for minute, count in traffic.items() if int(minute) >= oldest)
+
+    def top(self, n: int, min_score: float = 0.0) -> List[Dict]:
+        """按衰减后得分排序的热门岗位"""
+        now = time.time()
+        ranked = []
+        for key, entry in self.state["entries"].items():
+            score = self._decayed(entry, now)
+            if score >= min_score:
+                ranked.append(dict(entry, key=key, score=score))
+        ranked.sort(key=lambda entry: entry["score"], reverse=True)
+        return ranked[:n]
+
+
+class PrewarmScheduler:
+    """后台预热任务
+
+    controller 需提供 crawler_manager 属性和 prewarm_queries(position, company, requirements) 方法，
+    每次使用时读取，压测替换 crawler_manager 后同样生效。
+    """
+
+    def __init__(self, controller, tracker: Optional[DemandTracker] = None, top_n: int = PREWARM_TOP_N,
+                 min_score: float = PREWARM_MIN_SCORE, interval: float = PREWARM_INTERVAL,
+                 refresh: float = PREWARM_REFRESH, check_interval: float = PREWARM_CHECK_INTERVAL,
+                 idle_requests: int = PREWARM_IDLE_REQUESTS, hours: str = PREWARM_HOURS,
+                 crawl_seconds: float = PREWARM_CRAWL_SECONDS):
+        """
+        :param tracker: 请求频率统计，默认共享 CACHE_DIR/prewarm.json
+        :param top_n: 每轮预热的岗位数
+        :param min_score: 衰减后得分低于该值的岗位不预热
+        :param interval: 两轮预热的最小间隔(秒)
+        :param refresh: 同一岗位的最小预热间隔(秒)
+        :param check_interval: 合并计数与检查是否需要预热的间隔(秒)
+        :param idle_requests: 最近一段时间内的请求数不超过该值视为低峰
+        :param hours: 允许预热的时段，如 "2-6"，为空时不限
+        :param crawl_seconds: 每个预热查询的各平台时间预算(秒)
+        """
+        self.controller = controller
+        self.tracker = tracker or DemandTracker(os.path.join(CACHE_DIR, "prewarm.json"))
+        self.top_n = top_n
+        self.min_score = min_score
+        self.interval = interval
+        self.refresh = refresh
+        self.check_interval = check_interval
+        self.idle_requests = idle_requests
+        self.hours = parse_hours(hours)
+        self.crawl_seconds = crawl_seconds
+        self.last_cycle = 0.0
+        self.last_result: Dict = {}
+        self._lock_file = None
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, position: str, company: str = "", requirements: str = ""):
+        self.tracker.record(position, company, requirements)
+
+    def _is_leader(self) -> bool:
+        """持有 prewarm.lock 的进程负责预热，进程退出时锁自动释放，其他进程在下次检查时接手"""
+        if fcntl is None or self.tracker.state_path is None:
+            return True
+        if self._lock_file is not None:
+            return True
+        lock_file = open(os.path.join(os.path.dirname(self.tracker.state_path), "prewarm.lock"), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def busy(self) -> Optional[str]:
+        """存在线上流量时返回原因，否则返回None"""
+        if ANALYSES_IN_FLIGHT.value > 0 or CRAWLS_IN_FLIGHT.value > 0:
+            return "in_flight"
+        if self.tracker.recent_requests() > self.idle_requests:
+            return "traffic"
+        if not in_hours(self.hours):
+            return "hours"
+        return None
+
+    async def _flush(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.tracker.flush)
+
+    async def run_cycle(self) -> Dict:
+        """预热一轮：逐个重新爬取热门岗位的查询，出现线上流量时停止"""
+        now = time.time()
+        result = {"started": now, "positions": 0, "queries": 0, "items": 0, "stopped": None}
+        for entry in self.tracker.top(self.top_n, self.min_score):
+            if now - entry.get("prewarmed", 0.0) < self.refresh:
+                continue
+            queries = self.controller.prewarm_queries(entry["position"], entry.get("company", ""),
+                                                      entry.get("requirements", ""))
+            for query in queries:
+                reason = self.busy()
+                if reason:
+                    PREWARM_QUERIES.labels("deferred").inc()
+                    result["stopped"] = reason
+                    break
+                try:
+                    experiences = await self.controller.crawler_manager.crawl_query(
+                        query, seconds=self.crawl_seconds, refresh=True)
+                except Exception as e:
+                    PREWARM_QUERIES.labels("failed").inc()
+                    print(f"预热查询 {query} 失败: {str(e)}")
+                    continue
+                PREWARM_QUERIES.labels("crawled").inc()
+                result["queries"] += 1
+                result["items"] += len(experiences)
+                # 合并计数，让其他进程刚到达的请求及时计入低峰判断
+                await self._flush()
+            if result["stopped"]:
+                break
+            self.tracker.mark_prewarmed(entry["key"])
+            result["positions"] += 1
+        await self._flush()
+        result["seconds"] = round(time.time() - now, 2)
+        self.last_result = result
+        return result
+
+    async def _tick(self):
+        await self._flush()
+        if time.time() - self.last_cycle < self.interval or self.busy() or not self._is_leader():
+            return
+        result = await self.run_cycle()
+        # 因线上流量中断且一个岗位都没完成时，不计入间隔，下次检查再试
+        if result["positions"] or not result["stopped"]:
+            self.last_cycle = time.time()
+        print(f"预热完成: {result}")
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self._tick()
+            except Exception as e:
+                print(f"预热任务出错: {str(e)}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+        # 退出前保存本进程尚未合并的计数
+        await self._flush()
+
+    def snapshot(self) -> Dict:
+        return {
+            "leader": self._lock_file is not None or fcntl is None,
+            "busy": self.busy(),
+            "recent_requests": self.tracker.recent_requests(),
+            "last_cycle": self.last_cycle,
+            "last_result": self.last_result,
+            "top": [{"position": entry["position"], "company": entry.get("company", ""),
+                     "score": round(entry["score"], 2), "requests": entry["requests"],
+                     "prewarmed": entry.get("prewarmed", 0.0)}
+                    for entry in self.tracker.top(self.top_n)],
+        }
+
+
+def prewarm_enabled() -> bool:
+    return os.getenv("PREWARM", "True").lower() == "true"
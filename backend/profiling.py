@@ -0,0 +1,275 @@
+"""
+线上剖析接口（仅管理员）
+
+设置环境变量 ADMIN_TOKEN 后挂载到 /admin，请求需携带 X-Admin-Token 请求头：
+- GET  /admin/profile/cpu           采样CPU剖析N秒，输出火焰图工具可直接使用的折叠栈
+- GET  /admin/tasks                 当前所有asyncio任务及其挂起位置的完整await链
+- POST /admin/tracemalloc/start     开始跟踪内存分配
+- GET  /admin/tracemalloc/snapshot  与上一次快照对比，列出增长最多的分配位置
+- POST /admin/tracemalloc/stop      停止跟踪
+
+事件循环线程用 SIGPROF 定时器按CPU时间采样：信号处理函数在主线程的字节码边界执行，
+拿到的就是正在运行的帧。采样线程的方式只有在主线程释放GIL时才能取样，
+结果会严重偏向 select 等阻塞调用，因此仅用于 all_threads=true 时采样线程池。
+两种方式都不修改、不插桩被采样代码；同一时间只允许一个剖析任务，避免多个请求叠加开销。
+"""
+import asyncio
+import os
+import secrets
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+
+# 单次CPU剖析时长上限(秒)
+MAX_PROFILE_SECONDS = 60
+
+# 事件循环空闲时停留的函数，默认不计入剖析结果
+IDLE_FRAMES = {("selectors.py", "select"), ("selectors.py", "poll"), ("threading.py", "wait")}
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def signal_sampling_available() -> bool:
+    return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+
+class SamplingProfiler:
+    """定时采样调用栈，按折叠栈格式聚合"""
+
+    def __init__(self, interval: float = 0.01, all_threads: bool = False, include_idle: bool = False):
+        """
+        :param interval: 采样间隔(秒)
+        :param all_threads: 采样全部线程（线程方式），否则只采样调用线程（信号方式，需在主线程调用）
+        :param include_idle: 是否保留事件循环空闲等待的样本
+        """
+        self.interval = interval
+        self.all_threads = all_threads
+        self.include_idle = include_idle
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._previous_handler = None
+
+    def _record(self, frame, thread_name: str):
+        leaf = frame.f_code
+        if not self.include_idle and (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_FRAMES:
+            return
+        stack = []
+        while frame is not None:
+            stack.append(_frame_label(frame))
+            frame = frame.f_back
+        stack.append(thread_name)
+        self.stacks[";".join(reversed(stack))] += 1
+
+    def _on_signal(self, signum, frame):
+        self.samples += 1
+        if frame is not None:
+            self._record(frame, threading.current_thread().name)
+
+    def _sample(self):
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id != own:
+                self._record(frame, names.get(thread_id, str(thread_id)))
+        self.samples += 1
+
+    def _run(self):
+        next_tick = time.perf_counter()
+        while not self._stop.is_set():
+            self._sample()
+            next_tick += self.interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                # 采样落后时不追赶，避免连续采样占满GIL
+                next_tick = time.perf_counter()
+
+    def start(self) -> "SamplingProfiler":
+        if self.all_threads:
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        else:
+            if not signal_sampling_available():
+                raise RuntimeError("信号采样只能在支持setitimer的平台的主线程中启动")
+            self._previous_handler = signal.signal(signal.SIGPROF, self._on_signal)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return self
+
+    def stop(self):
+        if self.all_threads:
+            self._stop.set()
+            if self._thread is not None:
+                self._thread.join()
+        else:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+
+    def folded(self) -> str:
+        """折叠栈格式：每行 "帧1;帧2;...;帧N 次数"，可直接交给 flamegraph.pl 或 speedscope"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+
+def _await_chain(task: asyncio.Task) -> List[str]:
+    """沿 cr_await 链展开任务当前挂起的位置，从外层协程到最内层的等待对象"""
+    chain = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None) \
+            or getattr(awaitable, "ag_frame", None)
+        if frame is None:
+            if not asyncio.iscoroutine(awaitable):
+                chain.append(f"<{type(awaitable).__name__}> {repr(awaitable)[:160]}")
+            break
+        chain.append(f"{frame.f_code.co_filename}:{frame.f_lineno} {frame.f_code.co_name}")
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None) \
+            or getattr(awaitable, "ag_await", None)
+    return chain
+
+
+def dump_tasks() -> List[Dict]:
+    tasks = []
+    for task in asyncio.all_tasks():
+        coro = task.get_coro()
+        tasks.append({
+            "name": task.get_name(),
+            "coroutine": getattr(coro, "__qualname__", repr(coro)),
+            "done": task.done(),
+            "cancelling": task.cancelling() if hasattr(task, "cancelling") else None,
+            "awaiting": _await_chain(task),
+        })
+    tasks.sort(key=lambda t: (t["coroutine"], t["name"]))
+    return tasks
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None, alias=ADMIN_TOKEN_HEADER)):
+    """校验管理员令牌；未配置 ADMIN_TOKEN 时接口视为不存在"""
+    expected = os.getenv("ADMIN_TOKEN", "")
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=403, detail="无效的管理员令牌")
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+_profile_lock = asyncio.Lock()
+_tracemalloc_baseline: Optional[tracemalloc.Snapshot] = None
+
+
+@router.get("/profile/cpu", response_class=PlainTextResponse)
+async def profile_cpu(seconds: float = Query(10.0, gt=0, le=MAX_PROFILE_SECONDS),
+                      interval: float = Query(0.01, ge=0.001, le=1.0),
+                      all_threads: bool = False, include_idle: bool = False):
+    """
+    采样CPU剖析，返回折叠栈文本
+
+    默认按CPU时间采样事件循环所在线程；all_threads=true 时按墙钟时间采样包括线程池在内的全部线程。
+    """
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="已有剖析任务在运行")
+    if not all_threads and not signal_sampling_available():
+        raise HTTPException(status_code=400, detail="当前平台或线程不支持信号采样，请使用 all_threads=true")
+    async with _profile_lock:
+        profiler = SamplingProfiler(interval, all_threads, include_idle).start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            if all_threads:
+                await asyncio.get_running_loop().run_in_executor(None, profiler.stop)
+            else:
+                profiler.stop()
+    header = f"# samples={profiler.samples} interval={interval}s seconds={seconds}\n"
+    return PlainTextResponse(header + profiler.folded())
+
+
+@router.get("/tasks")
+async def asyncio_tasks():
+    """列出所有asyncio任务及其await链，定位卡在哪个await上的协程"""
+    tasks = dump_tasks()
+    summary = Counter(t["awaiting"][-1] if t["awaiting"] else "<running>" for t in tasks)
+    return {
+        "count": len(tasks),
+        "top_waits": [{"awaiting": k, "tasks": v} for k, v in summary.most_common(10)],
+        "tasks": tasks,
+    }
+
+
+@router.post("/tracemalloc/start")
+async def tracemalloc_start(frames: int = Query(10, ge=1, le=50)):
+    """开始跟踪内存分配，并记录基准快照"""
+    global _tracemalloc_baseline
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    loop = asyncio.get_running_loop()
+    _tracemalloc_baseline = await loop.run_in_executor(None, tracemalloc.take_snapshot)
+    return {"tracing": True, "frames": tracemalloc.get_traceback_limit()}
+
+
+@router.get("/tracemalloc/snapshot")
+async def tracemalloc_snapshot(limit: int = Query(20, ge=1, le=200), group_by: str = "lineno",
+                               reset: bool = True):
+    """
+    与基准快照对比，返回增长最多的分配位置
+
+    :param group_by: lineno / filename / traceback
+    :param reset: 对比后把当前快照作为新的基准
+    """
+    global _tracemalloc_baseline
+    if not tracemalloc.is_tracing():
+        raise HTTPException(status_code=409, detail="tracemalloc未开启，请先调用 /admin/tracemalloc/start")
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by 只能是 lineno、filename 或 traceback")
+
+    loop = asyncio.get_running_loop()
+
+    def compare():
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        stats = snapshot.compare_to(_tracemalloc_baseline, group_by) if _tracemalloc_baseline \
+            else snapshot.statistics(group_by)
+        return snapshot, stats
+
+    snapshot, stats = await loop.run_in_executor(None, compare)
+    if reset:
+        _tracemalloc_baseline = snapshot
+
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "traced_current_bytes": current,
+        "traced_peak_bytes": peak,
+        "top": [
+            {
+                "location": [f"{f.filename}:{f.lineno}" for f in stat.traceback],
+                "size_bytes": stat.size,
+                "size_diff_bytes": getattr(stat, "size_diff", stat.size),
+                "count": stat.count,
+                "count_diff": getattr(stat, "count_diff", stat.count),
+            }
+            for stat in stats[:limit]
+        ],
+    }
+
+
+@router.post("/tracemalloc/stop")
+async def tracemalloc_stop():
+    global _tracemalloc_baseline
+    tracemalloc.stop()
+    _tracemalloc_baseline = None
+    return {"tracing": False}
@@ -0,0 +1,173 @@
+"""
+查询规划
+
+原先每次分析只用前3个关键词拼一个查询，其余关键词（最多8个）都被丢弃。
+QueryPlanner 从关键词集合生成若干查询变体，在一个全局时间预算内并行爬取：
+
+- 公司+职位、职位、默认查询（前3个关键词）、技能两两组合，按从具体到宽泛排序
+- 同时进行的查询数受 QUERY_PLAN_PARALLEL 限制，每个查询的各平台预算取全局预算的剩余时间
+- 合并结果按URL去重；连续 QUERY_PLAN_PATIENCE 个查询带来的新帖子都少于 QUERY_PLAN_MIN_NEW 条，
+  或去重后达到 QUERY_PLAN_TARGET 条时，不再发起新查询（已开始的查询继续完成）
+
+对冲模式下，讯飞星火返回后可以向同一个 CrawlPlan 追加查询，已执行过的变体不会重复爬取。
+"""
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional
+
+from .crawlers import CRAWL_TIME_BUDGET, CrawlerManager, InterviewExperience, build_query
+from .metrics import QUERY_PLAN_QUERIES
+from .tracing import start_span
+
+# 每组关键词最多生成的查询数
+QUERY_PLAN_MAX = int(os.getenv("QUERY_PLAN_MAX", "5"))
+# 同时进行的查询数（每个查询会在所有平台上各启动一个浏览器）
+QUERY_PLAN_PARALLEL = int(os.getenv("QUERY_PLAN_PARALLEL", "2"))
+# 一个查询带来的新帖子少于该值视为没有收获
+QUERY_PLAN_MIN_NEW = int(os.getenv("QUERY_PLAN_MIN_NEW", "3"))
+# 连续多少个查询没有收获后停止
+QUERY_PLAN_PATIENCE = int(os.getenv("QUERY_PLAN_PATIENCE", "2"))
+# 去重后达到该条数即停止
+QUERY_PLAN_TARGET = int(os.getenv("QUERY_PLAN_TARGET", "60"))
+
+# 这些关键词只是补充词，不参与组合
+FILLER_KEYWORDS = {"面试", "面经"}
+
+
+def plan_queries(keywords: List[str], position: str = "", company: str = "",
+                 max_queries: int = QUERY_PLAN_MAX) -> List[str]:
+    """从关键词集合生成查询变体，按从具体到宽泛排序并去重
+
+    :param keywords: 关键词列表，通常第一个是职位名称
+    :param position: 职位名称，为空时取第一个关键词
+    :param company: 公司名称，为空时不生成公司相关的查询
+    """
+    keywords = [kw.strip() for kw in keywords if kw and kw.strip()]
+    position = (position or (keywords[0] if keywords else "")).strip()
+    company = (company or "").strip()
+    skills = [kw for kw in keywords if kw != position and kw not in FILLER_KEYWORDS]
+
+    candidates = []
+    if company and position:
+        candidates.append(f"{company} {position} 面经")
+    if position:
+        candidates.append(f"{position} 面经")
+    core = [kw for kw in keywords if kw not in FILLER_KEYWORDS]
+    if core:
+        candidates.append(build_query(core))
+    # 技能两两组合；落单的技能与职位组合
+    for i in range(0, len(skills) - 1, 2):
+        candidates.append(f"{skills[i]} {skills[i + 1]} 面经")
+    if len(skills) % 2 and position:
+        candidates.append(f"{position} {skills[-1]} 面经")
+
+    queries = []
+    seen = set()
+    for query in candidates:
+        normalized = " ".join(query.lower().split())
+        if normalized not in seen:
+            seen.add(normalized)
+            queries.append(query)
+    return queries[:max_queries]
+
+
+def _result_key(exp: InterviewExperience) -> str:
+    """与 CrawlerManager.merge_results 相同的去重键"""
+    return exp.url.split("?")[0] if exp.url else f"{exp.source}:{exp.title}"
+
+
+class CrawlPlan:
+    """一次分析请求的查询执行状态：全局预算、已执行的查询、去重后的结果与早停判断"""
+
+    def __init__(self, manager: CrawlerManager, seconds: float = CRAWL_TIME_BUDGET,
+                 parallel: int = QUERY_PLAN_PARALLEL, min_new: int = QUERY_PLAN_MIN_NEW,
+                 patience: int = QUERY_PLAN_PATIENCE, target: int = QUERY_PLAN_TARGET):
+        """
+        :param seconds: 全局时间预算(秒)，所有查询共享
+        :param parallel: 同时进行的查询数
+        :param min_new: 一个查询至少带来多少新帖子才算有收获
+        :param patience: 连续多少个查询没有收获后停止
+        :param target: 去重后达到该条数即停止
+        """
+        self.manager = manager
+        self.deadline = time.monotonic() + seconds
+        self.min_new = min_new
+        self.patience = patience
+        self.target = target
+        self.experiences: List[InterviewExperience] = []
+        # 每个查询带来的新帖子数，按完成顺序
+        self.yields: Dict[str, int] = {}
+        self.stop_reason: Optional[str] = None
+        self._planned = set()
+        self._seen = set()
+        self._stale = 0
+        self._semaphore = asyncio.Semaphore(parallel)
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+    def _check_stop(self) -> Optional[str]:
+        if self.stop_reason is None:
+            if len(self.experiences) >= self.target:
+                self.stop_reason = "target"
+            elif self._stale >= self.patience:
+                self.stop_reason = "exhausted"
+            elif self.remaining() <= 0:
+                self.stop_reason = "budget"
+        return self.stop_reason
+
+    def _merge(self, query: str, experiences: List[InterviewExperience]) -> int:
+        new = 0
+        for exp in experiences:
+            key = _result_key(exp)
+            if key not in self._seen:
+                self._seen.add(key)
+                self.experiences.append(exp)
+                new += 1
+        self.yields[query] = new
+        self._stale = self._stale + 1 if new < self.min_new else 0
+        return new
+
+    async def _run_query(self, query: str):
+        async with self._semaphore:
+            # 排队期间可能已经满足停止条件
+            if self._check_stop():
+                QUERY_PLAN_QUERIES.labels("skipped").inc()
+                return
+            with start_span("crawl.query", query=query) as span:
+                experiences = await self.manager.crawl_query(query, seconds=self.remaining())
+                new = self._merge(query, experiences)
+                span.set_attribute("new_items", new)
+            QUERY_PLAN_QUERIES.labels("useful" if new >= self.min_new else "exhausted").inc()
+
+    async def run(self, queries: List[str]) -> List[InterviewExperience]:
+        """执行尚未执行过的查询，返回目前为止去重后的全部结果"""
+        pending = []
+        for query in queries:
+            normalized = " ".join(query.lower().split())
+            if normalized in self._planned:
+                continue
+            self._planned.add(normalized)
+            pending.append(query)
+        # 按顺序启动，信号量保证先排队的查询先执行
+        await asyncio.gather(*(self._run_query(query) for query in pending))
+        return self.experiences
+
+
+class QueryPlanner:
+    """为每次分析请求生成查询变体并创建执行计划"""
+
+    def __init__(self, manager: CrawlerManager, max_queries: int = QUERY_PLAN_MAX):
+        self.manager = manager
+        self.max_queries = max_queries
+
+    def plan(self, keywords: List[str], position: str = "", company: str = "") -> List[str]:
+        return plan_queries(keywords, position, company, self.max_queries)
+
+    def new_plan(self, seconds: float = CRAWL_TIME_BUDGET) -> CrawlPlan:
+        return CrawlPlan(self.manager, seconds)
+
+    async def crawl(self, keywords: List[str], position: str = "", company: str = "") -> List[InterviewExperience]:
+        """生成查询并在全局预算内爬取，返回去重后的结果"""
+        return await self.new_plan().run(self.plan(keywords, position, company))
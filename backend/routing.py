@@ -0,0 +1,188 @@
+"""
+按产出路由爬取平台
+
+crawl_query 原本对每个查询都爬全部三个平台，但有些类别的岗位在某些平台上几乎搜不到面经
+（如金融岗位在牛客网）。PlatformRouter 按 (平台, 查询类别) 记录产出——每秒爬取得到的相关面经数，
+按指数滑动平均估计：
+
+- 样本数不足 ROUTING_MIN_SAMPLES 的组合总是爬取，先把数据攒起来
+- 产出低于 ROUTING_MIN_YIELD 的平台直接跳过
+- 正在进行的平台爬取数达到 ROUTING_LOAD_THRESHOLD 时，产出不到最佳平台 ROUTING_SKIP_RATIO 倍的平台也跳过
+- 被跳过的平台仍以 ROUTING_EPSILON 的概率爬取一次，避免早期的坏运气被永久固化
+
+查询类别取查询中命中词典词条的主要类别（keyword_extractor 的 category），只命中岗位词条时按具体岗位区分。
+统计定期写入 CACHE_DIR/routing.json，重启和其他工作进程启动时载入。设置 CRAWL_ROUTING=False 可关闭。
+"""
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from .keyword_extractor import get_keyword_extractor
+from .metrics import CRAWL_YIELD, CRAWLS_IN_FLIGHT, ROUTING_DECISIONS
+
+# 被跳过的平台仍然爬取的概率
+ROUTING_EPSILON = float(os.getenv("ROUTING_EPSILON", "0.1"))
+# 每个 (平台, 类别) 至少积累多少次样本后才参与跳过判断
+ROUTING_MIN_SAMPLES = int(os.getenv("ROUTING_MIN_SAMPLES", "5"))
+# 低于该产出(条/秒)的平台不论负载都跳过
+ROUTING_MIN_YIELD = float(os.getenv("ROUTING_MIN_YIELD", "0.02"))
+# 负载高时跳过产出不到最佳平台该倍数的平台
+ROUTING_SKIP_RATIO = float(os.getenv("ROUTING_SKIP_RATIO", "0.25"))
+# 正在进行的平台爬取数达到该值视为高负载
+ROUTING_LOAD_THRESHOLD = int(os.getenv("ROUTING_LOAD_THRESHOLD", "6"))
+# 产出的滑动平均系数
+YIELD_ALPHA = 0.2
+# 每记录多少次写一次磁盘
+SAVE_EVERY = 20
+
+# 不代表岗位方向的类别，不参与查询类别判断
+GENERIC_CATEGORIES = {"", "软技能"}
+DEFAULT_CATEGORY = "其他"
+
+
+def query_category(query: str) -> str:
+    """查询的主要类别：命中词条中出现最多的类别
+
+    只命中岗位词条时（如“量化研究员 面经”），“岗位”类过于宽泛，按具体岗位区分，如 "岗位:量化研究员"。
+    """
+    extractor = get_keyword_extractor()
+    term_ids = extractor.match_terms(query)
+    counts = Counter(extractor.categories[term_id] for term_id in term_ids)
+    for category in GENERIC_CATEGORIES:
+        counts.pop(category, None)
+    specific = [(count, category) for category, count in counts.items() if category != "岗位"]
+    if specific:
+        return max(specific)[1]
+    positions = [extractor.terms[term_id] for term_id in term_ids if extractor.categories[term_id] == "岗位"]
+    return f"岗位:{positions[0]}" if positions else DEFAULT_CATEGORY
+
+
+class YieldStats:
+    """单个 (平台, 类别) 的产出统计"""
+
+    def __init__(self, yield_rate: float = 0.0, samples: int = 0, items: int = 0, seconds: float = 0.0):
+        self.yield_rate = yield_rate
+        self.samples = samples
+        self.items = items
+        self.seconds = seconds
+
+    def observe(self, items: int, seconds: float):
+        rate = items / max(seconds, 0.1)
+        self.yield_rate = rate if self.samples == 0 else YIELD_ALPHA * rate + (1 - YIELD_ALPHA) * self.yield_rate
+        self.samples += 1
+        self.items += items
+        self.seconds += seconds
+
+    def to_dict(self) -> Dict:
+        return {"yield_rate": round(self.yield_rate, 4), "samples": self.samples,
+                "items": self.items, "seconds": round(self.seconds, 2)}
+
+
+class PlatformRouter:
+    """为每个查询选择值得爬取的平台"""
+
+    def __init__(self, platforms: List[str], state_path: Optional[str] = None, epsilon: float = ROUTING_EPSILON,
+                 min_samples: int = ROUTING_MIN_SAMPLES, min_yield: float = ROUTING_MIN_YIELD,
+                 skip_ratio: float = ROUTING_SKIP_RATIO, load_threshold: int = ROUTING_LOAD_THRESHOLD):
+        """
+        :param platforms: 全部平台
+        :param state_path: 统计文件路径，None时只保存在内存中
+        :param epsilon: 被跳过的平台仍然爬取的概率
+        :param min_samples: 参与跳过判断所需的最少样本数
+        :param min_yield: 低于该产出(条/秒)的平台不论负载都跳过
+        :param skip_ratio: 高负载时跳过产出不到最佳平台该倍数的平台
+        :param load_threshold: 正在进行的平台爬取数达到该值视为高负载
+        """
+        self.platforms = list(platforms)
+        self.state_path = state_path
+        self.epsilon = epsilon
+        self.min_samples = min_samples
+        self.min_yield = min_yield
+        self.skip_ratio = skip_ratio
+        self.load_threshold = load_threshold
+        self.stats: Dict[str, Dict[str, YieldStats]] = {platform: {} for platform in self.platforms}
+        self._records = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _stats(self, platform: str, category: str) -> YieldStats:
+        return self.stats.setdefault(platform, {}).setdefault(category, YieldStats())
+
+    def route(self, query: str, load: Optional[int] = None) -> Dict[str, bool]:
+        """返回 平台 -> 是否爬取
+
+        :param load: 当前正在进行的平台爬取数，默认取 crawls_in_flight 指标
+        """
+        category = query_category(query)
+        load = int(CRAWLS_IN_FLIGHT.value) if load is None else load
+        busy = load >= self.load_threshold
+        with self._lock:
+            known = {platform: self._stats(platform, category) for platform in self.platforms}
+        best = max((s.yield_rate for s in known.values() if s.samples >= self.min_samples), default=0.0)
+
+        decisions = {}
+        for platform, stats in known.items():
+            if stats.samples < self.min_samples:
+                decision = "learn"
+            elif stats.yield_rate < self.min_yield or (busy and stats.yield_rate < best * self.skip_ratio):
+                decision = "explore" if random.random() < self.epsilon else "skip"
+            else:
+                decision = "crawl"
+            ROUTING_DECISIONS.labels(platform, decision).inc()
+            decisions[platform] = decision != "skip"
+
+        # 至少爬取产出最高的平台
+        if not any(decisions.values()):
+            decisions[max(known, key=lambda p: known[p].yield_rate)] = True
+        return decisions
+
+    def record(self, platform: str, query: str, items: int, seconds: float):
+        """记录一次实际爬取（不含缓存命中）的条数与耗时"""
+        category = query_category(query)
+        with self._lock:
+            stats = self._stats(platform, category)
+            stats.observe(items, seconds)
+            self._records += 1
+            save = self.state_path is not None and self._records % SAVE_EVERY == 0
+        CRAWL_YIELD.labels(platform, category).set(stats.yield_rate)
+        if save:
+            self.save()
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict]]:
+        with self._lock:
+            return {platform: {category: stats.to_dict() for category, stats in categories.items()}
+                    for platform, categories in self.stats.items()}
+
+    def save(self):
+        """原子写入统计文件，多个工作进程同时写入时以最后一次为准"""
+        snapshot = self.snapshot()
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            tmp = f"{self.state_path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"updated": time.time(), "stats": snapshot}, f, ensure_ascii=False)
+            os.replace(tmp, self.state_path)
+        except OSError as e:
+            print(f"保存平台路由统计失败: {str(e)}")
+
+    def _load(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)["stats"]
+            for platform, categories in saved.items():
+                if platform not in self.stats:
+                    continue
+                for category, values in categories.items():
+                    self.stats[platform][category] = YieldStats(**values)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"载入平台路由统计失败: {str(e)}")
+
+
+def routing_enabled() -> bool:
+    return os.getenv("CRAWL_ROUTING", "True").lower() == "true"
@@ -9,6 +9,8 @@ import ssl
 from typing import Dict, Optional, List
 from urllib.parse import urlencode, quote
 
+from .tracing import start_span
+
 class SparkAPI:
     """讯飞星火认知大模型API封装类"""
     
@@ -90,40 +92,44 @@ class SparkAPI:
             }
         }
 
-        try:
-            # 创建SSL上下文
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
-            
-            async with websockets.connect(url, ssl=ssl_context, ping_interval=None) as ws:
-                await ws.send(json.dumps(data))
+        with start_span("spark.chat", host=self.host, max_tokens=max_tokens) as span:
+            try:
+                # 创建SSL上下文
+                ssl_context = ssl.create_default_context()
+                ssl_context.check_hostname = False
+                ssl_context.verify_mode = ssl.CERT_NONE
                 
-                # 接收完整响应
-                full_response = ""
-                async for message in ws:
-                    response_dict = json.loads(message)
+                async with websockets.connect(url, ssl=ssl_context, ping_interval=None) as ws:
+                    await ws.send(json.dumps(data))
                     
-                    # 检查错误
-                    if response_dict["header"]["code"] != 0:
-                        print(f"API Error: {response_dict['header']['message']}")
-                        return None
+                    # 接收完整响应
+                    full_response = ""
+                    async for message in ws:
+                        response_dict = json.loads(message)
+                        
+                        # 检查错误
+                        if response_dict["header"]["code"] != 0:
+                            print(f"API Error: {response_dict['header']['message']}")
+                            span.status = "error"
+                            span.set_attribute("spark.code", response_dict["header"]["code"])
+                            return None
+                        
+                        # 提取内容
+                        choices = response_dict.get("payload", {}).get("choices", {})
+                        if "text" in choices:
+                            for text_item in choices["text"]:
+                                full_response += text_item.get("content", "")
+                        
+                        # 检查是否结束
+                        if response_dict["header"]["status"] == 2:
+                            break
                     
-                    # 提取内容
-                    choices = response_dict.get("payload", {}).get("choices", {})
-                    if "text" in choices:
-                        for text_item in choices["text"]:
-                            full_response += text_item.get("content", "")
+                    return full_response.strip() if full_response else None
                     
-                    # 检查是否结束
-                    if response_dict["header"]["status"] == 2:
-                        break
-                
-                return full_response.strip() if full_response else None
-                
-        except Exception as e:
-            print(f"Error in chat: {str(e)}")
-            return None
+            except Exception as e:
+                span.record_exception(e)
+                print(f"Error in chat: {str(e)}")
+                return None
 
     async def analyze_job_keywords(self, position: str, company: str, requirements: str) -> List[str]:
         """
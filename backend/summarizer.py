@@ -0,0 +1,259 @@
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, MutableMapping, Optional
+
+from .cache import TTLCache
+from .metrics import track_cache
+
+logger = logging.getLogger(__name__)
+
+# 提示词版本号，修改map/reduce提示词后递增，使旧的分块摘要缓存自动失效
+PROMPT_VERSION = "v1"
+
+# 最终报告的四个部分，与 AnalysisEngine.analyze_posts 的要求保持一致
+REPORT_SECTIONS = ["技术考点", "典型面试问题", "面试趋势", "准备建议"]
+
+ChatFunc = Callable[[str], Awaitable[Optional[str]]]
+
+
+def _field(exp: Any, *names: str) -> str:
+    """兼容dict、dataclass以及带to_dict()的面经对象"""
+    if not isinstance(exp, dict):
+        exp = exp.to_dict() if hasattr(exp, "to_dict") else vars(exp)
+    for name in names:
+        value = exp.get(name)
+        if value:
+            return str(value)
+    return ""
+
+
+def experience_fingerprint(exp: Any) -> str:
+    """面经内容指纹，用于稳定排序、分块和缓存"""
+    raw = "\x1f".join([
+        _field(exp, "source", "platform"),
+        _field(exp, "title"),
+        _field(exp, "content"),
+    ])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def format_experience(exp: Any, max_content: int = 800) -> str:
+    """把单条面经格式化为提示词片段"""
+    source = _field(exp, "source", "platform")
+    title = _field(exp, "title")
+    content = _field(exp, "content")[:max_content]
+    return f"【{source}】{title}\n{content}"
+
+
+class MapReduceSummarizer:
+    """层次化面经分析：分块并行摘要(map)，再归并成最终报告(reduce)
+
+    分块采用内容定义的边界：按指纹排序后，指纹满足条件的面经结束当前分块。
+    新增面经只会落入（或拆分）其所在的分块，其余分块的缓存摘要可以直接复用。
+    """
+
+    def __init__(self, chat: ChatFunc, chunk_chars: int = 6000, boundary_every: int = 8,
+                 max_concurrency: int = 4, cache: Optional[MutableMapping[str, str]] = None):
+        """
+        :param chat: 异步对话函数，输入提示词返回模型回答
+        :param chunk_chars: 单个分块提示词的最大字符数
+        :param boundary_every: 平均每个分块包含的面经数
+        :param max_concurrency: 同时进行的map请求数上限
+        :param cache: 分块摘要缓存，默认使用进程内LRU缓存（保留7天）
+        """
+        self.chat = chat
+        self.chunk_chars = chunk_chars
+        self.boundary_every = max(1, boundary_every)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.cache = cache if cache is not None else TTLCache(max_size=4096, ttl=7 * 86400)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        if hasattr(self.cache, "stats"):
+            track_cache("summary_chunks", self.cache)
+
+    def chunk(self, experiences: List[Any]) -> List[List[Any]]:
+        """按内容定义的边界把面经切分为若干分块"""
+        keyed = sorted(
+            ((experience_fingerprint(exp), exp) for exp in experiences),
+            key=lambda pair: pair[0]
+        )
+        chunks: List[List[Any]] = []
+        current: List[Any] = []
+        current_chars = 0
+        seen = set()
+
+        for fingerprint, exp in keyed:
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+
+            size = len(format_experience(exp))
+            if current and current_chars + size > self.chunk_chars:
+                chunks.append(current)
+                current, current_chars = [], 0
+
+            current.append(exp)
+            current_chars += size
+
+            if int(fingerprint[:8], 16) % self.boundary_every == 0:
+                chunks.append(current)
+                current, current_chars = [], 0
+
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _chunk_key(self, chunk: List[Any], jd: str) -> str:
+        digest = hashlib.sha1(PROMPT_VERSION.encode("utf-8"))
+        digest.update(jd.encode("utf-8"))
+        for exp in chunk:
+            digest.update(experience_fingerprint(exp).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _map_prompt(self, chunk: List[Any], jd: str) -> str:
+        body = "\n\n".join(format_experience(exp) for exp in chunk)
+        return f"""
+你是一位资深技术面试专家。下面是与岗位相关的一批面经(共{len(chunk)}篇)，请压缩为要点摘要，
+只保留对后续汇总有用的信息，分别列出：
+- 技术考点（附出现次数）
+- 典型面试问题（原文问法）
+- 面试流程与趋势
+- 面试者给出的建议
+
+岗位JD:
+{jd}
+
+面经:
+{body}
+
+请用简洁的Markdown列表输出，不要寒暄。
+"""
+
+    def _combine_prompt(self, summaries: List[str], jd: str) -> str:
+        body = "\n\n---\n\n".join(summaries)
+        return f"""
+以下是同一岗位多批面经的要点摘要，请合并为一份摘要，合并重复考点并累加出现次数，保留全部典型问题。
+
+岗位JD:
+{jd}
+
+摘要:
+{body}
+
+请用简洁的Markdown列表输出。
+"""
+
+    def _reduce_prompt(self, summaries: List[str], jd: str, total: int) -> str:
+        body = "\n\n---\n\n".join(summaries)
+        return f"""
+作为一位资深技术面试专家，请根据以下岗位JD和面经要点摘要进行分析：
+
+岗位JD:
+{jd}
+
+面经要点摘要(来自{total}篇面经):
+{body}
+
+请提供以下分析:
+1. {REPORT_SECTIONS[0]}: 列出5-10个高频技术考察点，按重要性排序
+2. {REPORT_SECTIONS[1]}: 列出8-12个典型面试问题，每个问题附带简要分析
+3. {REPORT_SECTIONS[2]}: 总结该岗位近期面试趋势和变化
+4. {REPORT_SECTIONS[3]}: 给出针对性的准备建议
+
+请以结构化方式呈现，使用Markdown格式。
+"""
+
+    async def _summarize_chunk(self, chunk: List[Any], jd: str) -> Optional[str]:
+        """map阶段：摘要单个分块，命中缓存时不请求模型"""
+        key = self._chunk_key(chunk, jd)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+
+        self.cache_misses += 1
+        async with self.semaphore:
+            summary = await self.chat(self._map_prompt(chunk, jd))
+        if summary:
+            self.cache[key] = summary
+        return summary
+
+    def _group(self, summaries: List[str]) -> List[List[str]]:
+        """把摘要按字符预算分组，供逐层归并"""
+        groups: List[List[str]] = []
+        current: List[str] = []
+        current_chars = 0
+        for summary in summaries:
+            if current and current_chars + len(summary) > self.chunk_chars:
+                groups.append(current)
+                current, current_chars = [], 0
+            current.append(summary)
+            current_chars += len(summary)
+        if current:
+            groups.append(current)
+        return groups
+
+    async def _combine(self, group: List[str], jd: str) -> Optional[str]:
+        if len(group) == 1:
+            return group[0]
+        async with self.semaphore:
+            return await self.chat(self._combine_prompt(group, jd))
+
+    async def summarize(self, experiences: List[Any], jd: str) -> Dict:
+        """对大量面经执行map-reduce分析
+
+        :param experiences: 面经列表
+        :param jd: 岗位描述文本
+        :return: 包含analysis、post_count、chunk_count等字段的结果
+        """
+        if not experiences:
+            return {"error": "No posts to analyze"}
+
+        chunks = self.chunk(experiences)
+        hits_before = self.cache_hits
+        logger.info(f"层次化分析: {len(experiences)} 篇面经切分为 {len(chunks)} 个分块")
+
+        results = await asyncio.gather(
+            *(self._summarize_chunk(chunk, jd) for chunk in chunks),
+            return_exceptions=True
+        )
+        summaries = [r for r in results if isinstance(r, str) and r]
+        for r in results:
+            if isinstance(r, Exception):
+                logger.warning(f"分块摘要失败: {str(r)}")
+        if not summaries:
+            return {"error": "All chunk summaries failed"}
+
+        # 摘要总长度超出预算时逐层归并，直到可以放进一次reduce请求
+        while sum(len(s) for s in summaries) > self.chunk_chars and len(summaries) > 1:
+            groups = self._group(summaries)
+            if len(groups) == len(summaries):
+                break
+            combined = await asyncio.gather(*(self._combine(g, jd) for g in groups), return_exceptions=True)
+            merged = []
+            for group, result in zip(groups, combined):
+                if isinstance(result, str) and result:
+                    merged.append(result)
+                    continue
+                # 归并失败时保留该组原有的摘要，不丢弃内容
+                if isinstance(result, Exception):
+                    logger.warning(f"摘要归并失败: {str(result)}")
+                merged.extend(group)
+            if len(merged) >= len(summaries):
+                break
+            summaries = merged
+
+        if not summaries:
+            return {"error": "All combine passes failed"}
+
+        analysis = await self.chat(self._reduce_prompt(summaries, jd, len(experiences)))
+        if not analysis:
+            return {"error": "Reduce pass failed"}
+
+        return {
+            "analysis": analysis,
+            "post_count": len(experiences),
+            "chunk_count": len(chunks),
+            "cached_chunks": self.cache_hits - hits_before,
+        }
@@ -0,0 +1,265 @@
+"""
+轻量级分布式追踪
+
+- 基于contextvars维护当前span，asyncio任务创建时自动继承父span
+- 通过W3C traceparent请求头跨进程传递追踪上下文，X-Request-ID贯穿前端、后端和MCP服务器
+- span结束后交给后台线程写入JSONL文件，不在事件循环中做文件IO
+
+设置环境变量 TRACE_FILE 即开启导出，每行一个span。查看最慢的请求：
+    python -m backend.tracing traces.jsonl --top 5
+"""
+import argparse
+import contextvars
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+TRACEPARENT_HEADER = "traceparent"
+REQUEST_ID_HEADER = "X-Request-ID"
+TRACE_ID_HEADER = "X-Trace-ID"
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+
+class Span:
+    """一次计时操作；同一trace_id的span组成一棵调用树"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "service", "attributes",
+                 "status", "start_time", "_start", "duration", "_token")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.service = _tracer.service
+        self.attributes = attributes or {}
+        self.status = "ok"
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException):
+        self.status = "error"
+        self.attributes["error.type"] = type(exc).__name__
+        self.attributes["error.message"] = str(exc)[:200]
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def end(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._start
+            _tracer.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.service,
+            "start": round(self.start_time, 6),
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.record_exception(exc)
+        _current_span.reset(self._token)
+        self.end()
+
+
+class JsonlFileExporter:
+    """在后台线程中把span追加写入JSONL文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._queue: "queue.SimpleQueue[Optional[Dict]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span):
+        self._queue.put(span.to_dict())
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    break
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                # 队列空闲时才刷盘，突发时批量写入
+                if self._queue.empty():
+                    f.flush()
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+class _Tracer:
+    def __init__(self):
+        self.service = "backend"
+        self.exporter: Optional[JsonlFileExporter] = None
+
+    def export(self, span: Span):
+        if self.exporter is not None:
+            self.exporter.export(span)
+
+
+_tracer = _Tracer()
+
+
+def configure(service: str, path: Optional[str] = None):
+    """设置服务名与导出文件，path默认取环境变量 TRACE_FILE，为空时不导出"""
+    _tracer.service = service
+    path = path if path is not None else os.getenv("TRACE_FILE", "")
+    if _tracer.exporter is not None and _tracer.exporter.path != path:
+        _tracer.exporter.shutdown()
+        _tracer.exporter = None
+    if path and _tracer.exporter is None:
+        _tracer.exporter = JsonlFileExporter(path)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def start_span(name: str, **attributes) -> Span:
+    """创建当前span的子span，配合with使用；没有父span时开启新的trace"""
+    parent = _current_span.get()
+    if parent is None:
+        return Span(name, secrets.token_hex(16), None, attributes)
+    return Span(name, parent.trace_id, parent.span_id, attributes)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """解析traceparent请求头，返回 (trace_id, parent_span_id)"""
+    if not header:
+        return None
+    match = _TRACEPARENT_RE.match(header.strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2)
+
+
+def inject(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """把当前追踪上下文和请求ID写入发往下游的请求头"""
+    headers = dict(headers or {})
+    span = _current_span.get()
+    if span is not None:
+        headers[TRACEPARENT_HEADER] = span.traceparent
+    request_id = _request_id.get()
+    if request_id:
+        headers[REQUEST_ID_HEADER] = request_id
+    return headers
+
+
+def trace_middleware(service: str) -> Callable:
+    """生成FastAPI HTTP中间件：延续上游trace，为每个请求创建服务端span并回写请求ID
+
+    用法: app.middleware("http")(trace_middleware("mcp-niuke"))
+    """
+    configure(service)
+
+    async def middleware(request, call_next):
+        upstream = parse_traceparent(request.headers.get(TRACEPARENT_HEADER))
+        trace_id, parent_id = upstream if upstream else (secrets.token_hex(16), None)
+        request_id = request.headers.get(REQUEST_ID_HEADER) or trace_id[:16]
+        token = _request_id.set(request_id)
+        span = Span(f"{request.method} {request.url.path}", trace_id, parent_id,
+                    {"http.method": request.method, "http.path": request.url.path, "request_id": request_id})
+        try:
+            with span:
+                response = await call_next(request)
+                span.set_attribute("http.status", response.status_code)
+                if response.status_code >= 500:
+                    span.status = "error"
+        finally:
+            _request_id.reset(token)
+        response.headers[REQUEST_ID_HEADER] = request_id
+        response.headers[TRACE_ID_HEADER] = trace_id
+        return response
+
+    return middleware
+
+
+# ---- 离线分析 ----
+
+def load_traces(path: str) -> Dict[str, List[Dict]]:
+    traces: Dict[str, List[Dict]] = defaultdict(list)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                traces[record["trace_id"]].append(record)
+    return traces
+
+
+def format_trace(spans: List[Dict]) -> List[str]:
+    """按调用树缩进输出一个trace的所有span"""
+    children: Dict[Optional[str], List[Dict]] = defaultdict(list)
+    ids = {s["span_id"] for s in spans}
+    for s in spans:
+        parent = s["parent_id"] if s["parent_id"] in ids else None
+        children[parent].append(s)
+    origin = min(s["start"] for s in spans)
+    lines = []
+
+    def walk(parent: Optional[str], depth: int):
+        for s in sorted(children.get(parent, []), key=lambda x: x["start"]):
+            offset = (s["start"] - origin) * 1000
+            flag = " !" if s["status"] != "ok" else ""
+            lines.append(f"{'  ' * depth}{s['name']} [{s['service']}] "
+                         f"+{offset:.1f}ms {s['duration_ms']:.1f}ms{flag}")
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查看追踪文件中最慢的请求")
+    parser.add_argument("path", help="TRACE_FILE导出的JSONL文件")
+    parser.add_argument("--top", type=int, default=5, help="输出最慢的N个trace")
+    args = parser.parse_args()
+
+    traces = load_traces(args.path)
+    ranked = sorted(traces.values(), key=lambda spans: max(s["duration_ms"] for s in spans), reverse=True)
+    for spans in ranked[:args.top]:
+        print(f"trace {spans[0]['trace_id']} ({len(spans)} spans)")
+        for line in format_trace(spans):
+            print(f"  {line}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
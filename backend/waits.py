@@ -0,0 +1,169 @@
+"""
+基于条件的渲染等待
+
+取代导航后固定的 wait_for_timeout(2000/3000)：
+1. 先等结果选择器至少出现一个元素（浏览器内部监听DOM变化，不轮询）
+2. 再轮询匹配元素数，数量在 stable_for 秒内不再变化即视为渲染完成
+
+滚动加载更多时同理：先等元素数超过原有数量，再等其稳定。
+
+每个平台记录最近的渲染耗时（从开始等待到元素数最后一次变化），
+超时时间取 p99 的若干倍并限制在上下限之间；样本不足时使用默认超时。
+超时的等待没有渲染耗时样本，平台整体变慢时 p99 不会自己长大：连续 BACKOFF_AFTER 次超时后
+超时时间翻倍，让变慢后的渲染耗时能被记录下来，之后每次成功减半直到恢复按分位数计算。
+滚动加载的耗时单独统计（平台名加 "_scroll"），不拉低首屏渲染的分位数。
+"""
+import asyncio
+import math
+import os
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from .metrics import ERRORS, RENDER_TIMEOUT
+
+# 元素数保持不变多久视为渲染完成(秒)
+STABLE_FOR = float(os.getenv("RENDER_STABLE_FOR", "0.3"))
+# 元素数轮询间隔(秒)
+POLL_INTERVAL = float(os.getenv("RENDER_POLL_INTERVAL", "0.1"))
+# 连续超时多少次后超时时间翻倍
+BACKOFF_AFTER = int(os.getenv("RENDER_BACKOFF_AFTER", "3"))
+
+
+class RenderTimeTracker:
+    """单个平台最近的渲染耗时与据此推算的超时时间"""
+
+    def __init__(self, default_timeout: float = 10.0, min_timeout: float = 2.0, max_timeout: float = 30.0,
+                 factor: float = 2.0, window: int = 200, min_samples: int = 20):
+        """
+        :param default_timeout: 样本不足时的超时(秒)
+        :param min_timeout: 超时下限(秒)
+        :param max_timeout: 超时上限(秒)
+        :param factor: 超时取 p99 的倍数
+        :param window: 保留的最近样本数
+        :param min_samples: 样本数达到该值后才按分位数计算超时
+        """
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.factor = factor
+        self.min_samples = min_samples
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.timeouts = 0
+        self.consecutive_timeouts = 0
+        # 连续超时后的超时倍数
+        self.backoff = 1.0
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+        self.consecutive_timeouts = 0
+        self.backoff = max(1.0, self.backoff / 2)
+
+    def timed_out(self):
+        """记录一次超时，连续 BACKOFF_AFTER 次后超时时间翻倍（不超过上限）"""
+        self.timeouts += 1
+        self.consecutive_timeouts += 1
+        if self.consecutive_timeouts >= BACKOFF_AFTER:
+            self.consecutive_timeouts = 0
+            self.backoff = min(self.backoff * 2, self.max_timeout / self.min_timeout)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def timeout(self) -> float:
+        if len(self.samples) < self.min_samples:
+            budget = self.default_timeout
+        else:
+            budget = self.percentile(99) * self.factor + STABLE_FOR
+        return min(self.max_timeout, max(self.min_timeout, budget * self.backoff))
+
+    def snapshot(self) -> Dict:
+        return {
+            "samples": len(self.samples),
+            "p50_ms": round((self.percentile(50) or 0) * 1000, 1),
+            "p95_ms": round((self.percentile(95) or 0) * 1000, 1),
+            "p99_ms": round((self.percentile(99) or 0) * 1000, 1),
+            "timeout_s": round(self.timeout(), 2),
+            "timeouts": self.timeouts,
+            "backoff": self.backoff,
+        }
+
+
+RENDER_TIMES: Dict[str, RenderTimeTracker] = {}
+
+
+def render_tracker(platform: str) -> RenderTimeTracker:
+    tracker = RENDER_TIMES.get(platform)
+    if tracker is None:
+        tracker = RENDER_TIMES[platform] = RenderTimeTracker()
+        RENDER_TIMEOUT.labels(platform).set_function(tracker.timeout)
+    return tracker
+
+
+async def _wait_stable(page, selector: str, platform: str, tracker: RenderTimeTracker, start: float,
+                       deadline: float, stable_for: float, poll: float) -> int:
+    """轮询匹配元素数，直到 stable_for 秒内不再变化或到达 deadline"""
+    loop = asyncio.get_running_loop()
+    locator = page.locator(selector)
+    last_count = -1
+    changed_at = loop.time()
+    while True:
+        count = await locator.count()
+        now = loop.time()
+        if count != last_count:
+            last_count, changed_at = count, now
+        elif now - changed_at >= stable_for:
+            tracker.observe(changed_at - start)
+            return count
+        if now >= deadline:
+            tracker.timed_out()
+            ERRORS.labels(platform, "render_timeout").inc()
+            return count
+        await asyncio.sleep(poll)
+
+
+def _timeout_ms(deadline: float) -> float:
+    # Playwright中timeout=0表示不限时，至少留1毫秒
+    return max(1.0, (deadline - asyncio.get_running_loop().time()) * 1000)
+
+
+async def wait_for_results(page, selector: str, platform: str, timeout: Optional[float] = None,
+                           stable_for: float = STABLE_FOR, poll: float = POLL_INTERVAL) -> int:
+    """等待结果列表渲染完成，返回最终的匹配元素数；超时返回当时的元素数
+
+    :param timeout: 调用方的剩余时间预算(秒)，与按渲染耗时推算的超时取较小值
+    """
+    tracker = render_tracker(platform)
+    start = asyncio.get_running_loop().time()
+    deadline = start + min(tracker.timeout(), timeout if timeout is not None else float("inf"))
+
+    try:
+        await page.wait_for_selector(selector, state="attached", timeout=_timeout_ms(deadline))
+    except PlaywrightTimeoutError:
+        tracker.timed_out()
+        ERRORS.labels(platform, "render_timeout").inc()
+        return 0
+    return await _wait_stable(page, selector, platform, tracker, start, deadline, stable_for, poll)
+
+
+async def wait_for_more(page, selector: str, platform: str, previous: int, timeout: Optional[float] = None,
+                        stable_for: float = STABLE_FOR, poll: float = POLL_INTERVAL) -> int:
+    """滚动加载后等待条目数超过 previous 并稳定；超时未增加说明没有更多结果，返回 previous
+
+    滚动加载的耗时记在 "<platform>_scroll" 下，与首屏渲染分开统计
+    """
+    tracker = render_tracker(f"{platform}_scroll")
+    start = asyncio.get_running_loop().time()
+    deadline = start + min(tracker.timeout(), timeout if timeout is not None else float("inf"))
+
+    try:
+        await page.wait_for_function("([selector, previous]) => document.querySelectorAll(selector).length > previous",
+                                     arg=[selector, previous], timeout=_timeout_ms(deadline))
+    except PlaywrightTimeoutError:
+        return previous
+    return await _wait_stable(page, selector, platform, tracker, start, deadline, stable_for, poll)
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+爬虫吞吐基准
+
+针对离线夹具服务器运行各爬虫实现，报告页面/s、条目/s、单次查询延迟
+p50/p95/p99、每次查询从夹具服务器下载的流量以及峰值RSS。每个实现在独立子进程中运行，峰值内存互不干扰。
+Playwright实现默认拦截图片、字体和统计埋点，设置 CRAWL_BLOCK_RESOURCES=False 可对比不拦截时的表现。
+--proxies N 时启动N个替身代理（proxy_server.py）并通过 CRAWL_PROXIES 交给各实现，
+可配合 --proxy-rate 模拟按IP限流，观察身份池把请求分散到各出口的效果。
+
+用法:
+    python benchmarks/bench_crawlers.py                       # 全部实现
+    python benchmarks/bench_crawlers.py --impl spider-async --queries 60 --concurrency 8
+    python benchmarks/bench_crawlers.py --latency 0.05 --output results.json
+    python benchmarks/bench_crawlers.py --proxies 3 --proxy-rate 5 --proxy-spread 0.05
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.fixture_server import PLATFORMS, FixtureServer  # noqa: E402
+from benchmarks.proxy_server import start_proxies  # noqa: E402
+
+# (单次查询耗时, 抓取页面数, 解析条目数)
+Sample = Tuple[float, int, int]
+
+
+def make_queries(count: int) -> List[List[str]]:
+    """生成互不相同的查询，避免命中爬虫内部缓存"""
+    seeds = ["Python", "后端", "NLP", "推荐", "前端", "Java", "Go", "测试", "大模型", "数据"]
+    return [[seeds[i % len(seeds)], f"q{i}", "面试"] for i in range(count)]
+
+
+def bench_spider_sync(base_urls: Dict[str, str], queries: List[List[str]], concurrency: int) -> List[Sample]:
+    from test_system import SpiderEngine
+
+    engine = SpiderEngine()
+    engine.base_urls.update(base_urls)
+    engine.delay_range = (0, 0)
+
+    def run(keywords):
+        start = time.perf_counter()
+        posts = engine.search_posts(keywords)
+        return time.perf_counter() - start, len(PLATFORMS), len(posts)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(run, queries))
+
+
+def _bench_spider_async(parse_workers) -> Callable:
+    def bench(base_urls: Dict[str, str], queries: List[List[str]], concurrency: int) -> List[Sample]:
+        from test_system import AsyncSpiderEngine
+
+        async def main():
+            engine = AsyncSpiderEngine(max_per_host=concurrency, parse_workers=parse_workers)
+            engine.base_urls.update(base_urls)
+            engine.delay_range = (0, 0)
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def run(keywords):
+                async with semaphore:
+                    start = time.perf_counter()
+                    posts = await engine.search_posts(keywords)
+                    return time.perf_counter() - start, len(PLATFORMS), len(posts)
+
+            try:
+                return await asyncio.gather(*(run(q) for q in queries))
+            finally:
+                await engine.close()
+
+        return asyncio.run(main())
+    return bench
+
+
+def bench_playwright(base_urls: Dict[str, str], queries: List[List[str]], concurrency: int) -> List[Sample]:
+    from playwright.async_api import async_playwright
+    from backend.crawlers import CrawlerManager
+
+    async def preflight():
+        # CrawlerManager会吞掉异常，先确认浏览器可以启动，避免输出一组全零的结果
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            await browser.close()
+
+    asyncio.run(preflight())
+
+    # 不启用平台路由，各实现每次都爬取全部平台，结果才可比
+    manager = CrawlerManager(cache=None, router=None)
+    for platform, crawler in manager.crawlers.items():
+        crawler.base_url = base_urls[platform]
+        crawler.delay_range = (0, 0)
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(keywords):
+            async with semaphore:
+                start = time.perf_counter()
+                experiences = await manager.crawl_all_platforms(keywords)
+                return time.perf_counter() - start, len(PLATFORMS), len(experiences)
+
+        return await asyncio.gather(*(run(q) for q in queries))
+
+    return asyncio.run(main())
+
+
+IMPLEMENTATIONS: Dict[str, Callable] = {
+    "spider-sync": bench_spider_sync,
+    "spider-async": _bench_spider_async(None),
+    "spider-async-procpool": _bench_spider_async(os.cpu_count() or 1),
+    "playwright": bench_playwright,
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb() -> float:
+    """本进程与已回收子进程（浏览器、解析进程）的峰值RSS之和，单位MB"""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return (own + children) / scale
+
+
+def summarize(name: str, samples: List[Sample], wall: float) -> Dict:
+    latencies = [s[0] for s in samples]
+    pages = sum(s[1] for s in samples)
+    items = sum(s[2] for s in samples)
+    return {
+        "impl": name,
+        "queries": len(samples),
+        "wall_s": round(wall, 3),
+        "pages_per_s": round(pages / wall, 2) if wall else 0.0,
+        "items_per_s": round(items / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def run_child(args) -> Dict:
+    """子进程入口：运行单个实现并输出JSON结果"""
+    base_urls = json.loads(args.base_urls)
+    queries = make_queries(args.queries)
+    bench = IMPLEMENTATIONS[args.impl]
+    # 预热一次，排除导入和连接建立的开销
+    bench(base_urls, queries[:1], 1)
+    start = time.perf_counter()
+    samples = bench(base_urls, queries, args.concurrency)
+    return summarize(args.impl, samples, time.perf_counter() - start)
+
+
+def run_all(args) -> List[Dict]:
+    results = []
+    proxies = start_proxies(args.proxies, rate=args.proxy_rate, spread=args.proxy_spread) if args.proxies else []
+    env = dict(os.environ)
+    if proxies:
+        env["CRAWL_PROXIES"] = ",".join(proxy.url for proxy in proxies)
+    with FixtureServer(latency=args.latency, jitter=args.jitter) as server:
+        base_urls = {platform: server.base_url(platform) for platform in PLATFORMS}
+        for impl in args.impl or list(IMPLEMENTATIONS):
+            cmd = [
+                sys.executable, __file__, "--child",
+                "--impl", impl,
+                "--queries", str(args.queries),
+                "--concurrency", str(args.concurrency),
+                "--base-urls", json.dumps(base_urls),
+            ]
+            bytes_before = server.bytes_sent
+            throttled_before = sum(proxy.throttled for proxy in proxies)
+            proc = subprocess.run(cmd, capture_output=True, text=True, cwd=str(ROOT), env=env)
+            lines = proc.stdout.strip().splitlines()
+            if proc.returncode != 0 or not lines:
+                print(f"[{impl}] 运行失败: {proc.stderr.strip().splitlines()[-1:] or proc.returncode}")
+                continue
+            result = json.loads(lines[-1])
+            # 子进程另有一次预热查询
+            result["kb_per_query"] = round((server.bytes_sent - bytes_before) / 1024 / (args.queries + 1), 1)
+            if proxies:
+                result["proxy_throttled"] = sum(proxy.throttled for proxy in proxies) - throttled_before
+            results.append(result)
+    for proxy in proxies:
+        print(f"替身代理 {proxy.url}: 请求 {proxy.requests}，限流 {proxy.throttled}")
+        proxy.stop()
+    return results
+
+
+def print_table(results: List[Dict]):
+    header = (f"{'实现':<24}{'页面/s':>10}{'条目/s':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}"
+              f"{'KB/查询':>10}{'峰值RSS(MB)':>14}")
+    print(header)
+    for r in results:
+        print(f"{r['impl']:<24}{r['pages_per_s']:>10}{r['items_per_s']:>10}{r['p50_ms']:>10}"
+              f"{r['p95_ms']:>10}{r['p99_ms']:>10}{r['kb_per_query']:>10}{r['peak_rss_mb']:>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="爬虫吞吐基准")
+    parser.add_argument("--impl", action="append", choices=list(IMPLEMENTATIONS), help="只运行指定实现，可重复")
+    parser.add_argument("--queries", type=int, default=30, help="查询次数")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时进行的查询数")
+    parser.add_argument("--latency", type=float, default=0.0, help="夹具服务器每个请求的延迟(秒)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="夹具服务器延迟抖动上限(秒)")
+    parser.add_argument("--proxies", type=int, default=0, help="启动的替身代理数，0表示直连")
+    parser.add_argument("--proxy-rate", type=float, help="每个替身代理每秒允许的请求数，超出返回429")
+    parser.add_argument("--proxy-spread", type=float, default=0.0, help="相邻替身代理的延迟差(秒)")
+    parser.add_argument("--output", help="把结果写入JSON文件")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--base-urls", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.impl = args.impl[0]
+        print(json.dumps(run_child(args), ensure_ascii=False))
+        return
+
+    results = run_all(args)
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"timestamp": time.time(), "args": vars(args), "results": results}, f,
+                      ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
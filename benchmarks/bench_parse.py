@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+解析阶段吞吐基准
+
+对比单线程内联解析与不同进程数的 ParseStage，验证解析吞吐随CPU核数扩展。
+
+用法:
+    python benchmarks/bench_parse.py --pages <保存的搜索结果页目录> --repeat 20
+页面按所在目录名或文件名前缀识别平台，如 fixtures/zhihu/search_1.html、nowcoder_python.html。
+未指定 --pages 时使用 benchmarks/fixtures 下的离线页面。
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.html_parsers import PARSERS, ParseStage, parse_page  # noqa: E402
+
+
+def synthetic_pages(items: int = 40) -> List[Tuple[str, str]]:
+    """生成与真实搜索结果页结构一致的合成页面"""
+    filler = "一面问了项目和八股，Redis持久化、MySQL索引、TCP三次握手，手撕LRU。" * 6
+    nowcoder = "".join(
+        f'<div class="discuss-main"><a class="post-title" href="/discuss/{i}">后端开发面经 第{i}篇</a>'
+        f'<div class="post-content">{filler}</div><span class="post-author">user{i}</span></div>'
+        for i in range(items)
+    )
+    zhihu = "".join(
+        f'<div class="SearchResult-Card"><h2 class="ContentItem-title"><a href="/question/{i}">NLP面试经验 {i}</a></h2>'
+        f'<div class="RichContent-inner">{filler}</div><a class="UserLink-link">author{i}</a></div>'
+        for i in range(items)
+    )
+    xiaohongshu = "".join(
+        f'<section class="note-item"><a href="/explore/{i}"><div class="title">算法岗面经 {i}</div></a>'
+        f'<div class="desc">{filler}</div><span class="author">xhs{i}</span></section>'
+        for i in range(items)
+    )
+    wrap = "<html><head><title>search</title></head><body>{}</body></html>"
+    return [
+        ("nowcoder", wrap.format(nowcoder)),
+        ("zhihu", wrap.format(zhihu)),
+        ("xiaohongshu", wrap.format(xiaohongshu)),
+    ]
+
+
+def load_pages(directory: str) -> List[Tuple[str, str]]:
+    pages = []
+    for path in sorted(Path(directory).rglob("*.html")):
+        platform = next((p for p in PARSERS if path.parent.name == p or path.name.startswith(p)), None)
+        if platform:
+            pages.append((platform, path.read_text(encoding="utf-8")))
+    return pages
+
+
+def run_inline(pages: List[Tuple[str, str]]) -> int:
+    return sum(len(parse_page(platform, html)) for platform, html in pages)
+
+
+def run_stage(stage: ParseStage, pages: List[Tuple[str, str]]) -> int:
+    futures = [stage.submit(platform, html) for platform, html in pages]
+    return sum(len(f.result()) for f in futures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="解析阶段吞吐基准")
+    parser.add_argument("--pages", default=str(Path(__file__).resolve().parent / "fixtures"),
+                        help="保存的搜索结果页目录")
+    parser.add_argument("--synthetic", action="store_true", help="使用合成页面")
+    parser.add_argument("--repeat", type=int, default=20, help="页面集合重复次数")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    pages = synthetic_pages() if args.synthetic else load_pages(args.pages)
+    if not pages:
+        sys.exit(f"目录 {args.pages} 中没有可识别的页面")
+    workload = pages * args.repeat
+    print(f"页面数: {len(workload)} (去重 {len(pages)})，CPU核数: {os.cpu_count()}")
+    print(f"{'模式':<16}{'耗时(s)':>10}{'页面/s':>12}{'条目/s':>12}{'加速比':>8}")
+
+    start = time.perf_counter()
+    items = run_inline(workload)
+    baseline = time.perf_counter() - start
+    print(f"{'inline':<16}{baseline:>10.2f}{len(workload) / baseline:>12.1f}{items / baseline:>12.1f}{1.0:>8.2f}")
+
+    workers = 1
+    while workers <= args.max_workers:
+        stage = ParseStage(workers)
+        # 预热工作进程，避免把进程启动时间计入吞吐
+        run_stage(stage, pages[:1] * workers)
+        start = time.perf_counter()
+        items = run_stage(stage, workload)
+        elapsed = time.perf_counter() - start
+        stage.shutdown()
+        print(f"{f'process x{workers}':<16}{elapsed:>10.2f}{len(workload) / elapsed:>12.1f}"
+              f"{items / elapsed:>12.1f}{baseline / elapsed:>8.2f}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
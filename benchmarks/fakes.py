@@ -0,0 +1,80 @@
+"""
+压测用的本地替身：讯飞星火与爬虫管理器
+
+替身只模拟延迟、失败率和返回数据的形状，让压测结果反映服务自身的调度与开销，
+而不受外部站点和大模型配额的影响。
+"""
+import asyncio
+import random
+from typing import List
+
+from backend.crawlers import CrawlerManager, InterviewExperience, build_query
+from backend.routing import PlatformRouter
+
+
+class LatencyModel:
+    """延迟与失败率模型：mean ± jitter 的均匀分布"""
+
+    def __init__(self, mean: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0):
+        self.mean = mean
+        self.jitter = jitter
+        self.error_rate = error_rate
+
+    async def wait(self, name: str):
+        delay = max(0.0, self.mean + random.uniform(-self.jitter, self.jitter))
+        await asyncio.sleep(delay)
+        if self.error_rate and random.random() < self.error_rate:
+            raise RuntimeError(f"{name} 模拟失败")
+
+
+class FakeSparkAPI:
+    """讯飞星火替身，接口与 backend.spark_api.SparkAPI 一致"""
+
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+
+    async def chat(self, prompt: str, max_tokens: int = 2048, temperature: float = 0.5):
+        await self.latency.wait("spark")
+        return "模拟回答"
+
+    async def analyze_job_keywords(self, position: str, company: str, requirements: str) -> List[str]:
+        await self.latency.wait("spark")
+        return [position, "Redis", "MySQL", "分布式系统", "算法", "项目经验"]
+
+
+class FakeCrawler:
+    """单平台爬虫替身"""
+
+    def __init__(self, source: str, latency: LatencyModel, items: int):
+        self.source = source
+        self.latency = latency
+        self.items = items
+
+    async def search_interviews(self, keywords: List[str], budget=None) -> List[InterviewExperience]:
+        return await self.search(build_query(keywords), budget)
+
+    async def search(self, query: str, budget=None) -> List[InterviewExperience]:
+        await self.latency.wait(self.source)
+        return [
+            InterviewExperience(
+                source=self.source,
+                title=f"{query} #{i}",
+                content="1. 自我介绍 2. 项目深挖 3. Redis持久化 4. 手撕LRU" * 4,
+                url=f"https://example.com/{self.source}/{abs(hash((query, i)))}",
+                author=f"user{i}",
+            )
+            for i in range(self.items)
+        ]
+
+
+class FakeCrawlerManager(CrawlerManager):
+    """爬虫管理器替身，沿用真实的并发与合并逻辑，只替换各平台爬虫"""
+
+    def __init__(self, latency: LatencyModel, items_per_platform: int = 8, cache=None):
+        """默认不缓存，否则重复查询全部命中缓存，压测不到爬取路径；路由统计只保存在内存中"""
+        super().__init__(cache=cache, router=PlatformRouter(["nowcoder", "zhihu", "xiaohongshu"]))
+        self.crawlers = {
+            "nowcoder": FakeCrawler("牛客网", latency, items_per_platform),
+            "zhihu": FakeCrawler("知乎", latency, items_per_platform),
+            "xiaohongshu": FakeCrawler("小红书", latency, items_per_platform),
+        }
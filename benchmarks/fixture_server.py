@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+离线夹具服务器：用本地HTTP服务替身牛客网、知乎、小红书
+
+搜索请求按平台前缀路由到 benchmarks/fixtures/<平台>/search_<n>.html：
+    /nowcoder/search?query=...        -> nowcoder/search_*.html
+    /zhihu/search?q=...               -> zhihu/search_*.html
+    /xiaohongshu/search_result?...    -> xiaohongshu/search_*.html
+带 page 参数时返回对应页码，否则按查询词哈希选择页面，保证同一查询结果稳定。
+结果链接（/nowcoder/discuss/...、/zhihu/question/...、/xiaohongshu/explore/... 等）
+返回按路径生成的详情页，正文位于各平台真实详情页的选择器下。
+静态资源请求返回指定大小的占位内容，便于衡量资源拦截节省的流量。
+
+用法:
+    python benchmarks/fixture_server.py --port 8900 --latency 0.05
+"""
+import argparse
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures"
+
+PLATFORMS = ("nowcoder", "zhihu", "xiaohongshu")
+
+# 静态资源占位大小(字节)，按扩展名区分
+ASSET_SIZES = {
+    ".png": 24 * 1024,
+    ".jpg": 48 * 1024,
+    ".gif": 64,
+    ".webp": 32 * 1024,
+    ".css": 40 * 1024,
+    ".js": 160 * 1024,
+    ".woff2": 90 * 1024,
+}
+ASSET_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".css": "text/css",
+    ".js": "application/javascript",
+    ".woff2": "font/woff2",
+}
+
+# 详情页路径前缀与正文容器，与 backend/details.py 的选择器对应
+DETAIL_PREFIXES = ("discuss", "question", "p", "explore")
+DETAIL_CONTAINERS = {
+    "nowcoder": '<div class="nc-post-content">{body}</div>',
+    "zhihu": '<div class="RichContent"><div class="RichContent-inner"><span class="RichText">{body}</span></div></div>',
+    "xiaohongshu": '<div class="note-content"><div id="detail-desc" class="desc">{body}</div></div>',
+}
+DETAIL_QUESTIONS = [
+    "自我介绍，然后深挖项目，问了项目里最难的点", "讲一下Transformer的结构，为什么要除以根号d",
+    "MySQL索引为什么用B+树，联合索引最左匹配", "Redis为什么快，持久化RDB和AOF的区别",
+    "算法题：合并K个有序链表", "场景题：设计一个短链系统", "TCP三次握手和四次挥手，TIME_WAIT的作用",
+    "讲一下RAG的流程，怎么评估检索效果", "GIL是什么，Python多线程适合什么场景", "反问环节：团队业务和技术栈",
+]
+
+
+def detail_html(platform: str, path: str) -> bytes:
+    """按路径生成稳定的详情页，正文约1~2KB"""
+    seed = int(hashlib.md5(path.encode("utf-8")).hexdigest(), 16)
+    rounds = ["一面", "二面", "三面"][: 2 + seed % 2]
+    lines = []
+    for i, name in enumerate(rounds):
+        questions = [DETAIL_QUESTIONS[(seed >> (4 * (i * 5 + j))) % len(DETAIL_QUESTIONS)] for j in range(5)]
+        lines.append(f"<p>{name}（{40 + seed % 30}分钟）：" + "；".join(
+            f"{j + 1}. {q}" for j, q in enumerate(questions)) + "。</p>")
+    body = "".join(lines) + "<p>整体感觉面试官人很好，难度中等，建议提前准备项目和八股。</p>"
+    container = DETAIL_CONTAINERS[platform].format(body=body)
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>详情</title>'
+            f'<link rel="stylesheet" href="/static/css/detail.css"></head>'
+            f'<body><img src="/static/img/banner.jpg">{container}</body></html>').encode("utf-8")
+
+
+class FixtureServer:
+    """在后台线程中运行的夹具服务器"""
+
+    def __init__(self, root: Path = FIXTURE_DIR, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, jitter: float = 0.0):
+        """
+        :param root: 夹具目录
+        :param latency: 每个请求的基础延迟(秒)
+        :param jitter: 延迟抖动上限(秒)
+        """
+        self.root = Path(root)
+        self.latency = latency
+        self.jitter = jitter
+        self.pages: Dict[str, List[Path]] = {
+            platform: sorted((self.root / platform).glob("search_*.html"),
+                             key=lambda p: int(p.stem.split("_")[-1]))
+            for platform in PLATFORMS
+        }
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def base_url(self, platform: str) -> str:
+        """平台站点根地址，用于替换爬虫中的 https://www.<平台>.com"""
+        return f"{self.url}/{platform}"
+
+    def select_page(self, platform: str, query: Dict[str, List[str]]) -> Optional[Path]:
+        pages = self.pages.get(platform) or []
+        if not pages:
+            return None
+        if "page" in query:
+            index = int(query["page"][0]) - 1
+            return pages[index] if 0 <= index < len(pages) else None
+        terms = query.get("query") or query.get("q") or query.get("keyword") or [""]
+        digest = hashlib.md5(terms[0].encode("utf-8")).hexdigest()
+        return pages[int(digest, 16) % len(pages)]
+
+    def _record(self, size: int):
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += size
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                server._record(len(body))
+
+            def do_GET(self):
+                if server.latency or server.jitter:
+                    time.sleep(server.latency + random.uniform(0, server.jitter))
+
+                parsed = urlparse(self.path)
+                suffix = Path(parsed.path).suffix.lower()
+                if suffix in ASSET_SIZES:
+                    self._send(200, b"\0" * ASSET_SIZES[suffix], ASSET_TYPES[suffix])
+                    return
+
+                parts = parsed.path.strip("/").split("/")
+                platform = parts[0] if parts else ""
+                if platform in PLATFORMS and len(parts) > 1 and parts[1] in ("search", "search_result"):
+                    page = server.select_page(platform, parse_qs(parsed.query))
+                    if page is not None:
+                        self._send(200, page.read_bytes(), "text/html; charset=utf-8")
+                        return
+                    self._send(200, b"<html><body></body></html>", "text/html; charset=utf-8")
+                    return
+                if platform in PLATFORMS and len(parts) > 2 and parts[1] in DETAIL_PREFIXES:
+                    self._send(200, detail_html(platform, parsed.path), "text/html; charset=utf-8")
+                    return
+
+                self._send(404, b"not found", "text/plain")
+
+        return Handler
+
+    def start(self) -> "FixtureServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线夹具服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的基础延迟(秒)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="延迟抖动上限(秒)")
+    args = parser.parse_args()
+
+    server = FixtureServer(host=args.host, port=args.port, latency=args.latency, jitter=args.jitter)
+    print(f"夹具服务器已启动: {server.url}")
+    for platform in PLATFORMS:
+        print(f"  {platform}: {server.base_url(platform)} ({len(server.pages[platform])} 个页面)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
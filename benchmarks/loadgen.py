@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+后端与MCP服务器压测工具
+
+两种负载模型：
+- closed：固定数量的虚拟用户，每个用户收到响应后立即发下一个请求，衡量系统最大吞吐
+- open：按泊松过程以固定速率发起请求，不等待响应，衡量给定到达率下的排队延迟
+
+默认在进程内通过ASGI直接驱动应用，讯飞星火与爬虫替换为带可配置延迟的本地替身；
+指定 --url 时改为压测已运行的服务。
+
+用法:
+    python benchmarks/loadgen.py --scenario analyze --mode closed --users 32 --duration 20
+    python benchmarks/loadgen.py --scenario keywords --mode open --rate 200 --duration 20
+    python benchmarks/loadgen.py --scenario mcp-fanout --mode closed --users 16 --output runs/mcp.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "mcp_servers"))
+
+SAMPLE_JOB = {
+    "position": "Python后端开发工程师",
+    "company": "字节跳动",
+    "requirements": "1. 熟练掌握Python编程语言，有Django/Flask框架经验\n2. 熟悉MySQL、Redis等数据库\n"
+                    "3. 了解微服务架构和容器化技术\n4. 有分布式系统开发经验优先",
+}
+
+# MCPClient发往各平台服务器的请求，与 mcp_client.MCPClient 保持一致
+MCP_REQUESTS = {
+    "niuke": ("fetch_interviews", {"position": "NLP算法工程师", "skills": ["Transformer", "Python"],
+                                   "experience": "1-3年", "company": "字节跳动"}),
+    "xiaohongshu": ("search_notes", {"position": "NLP算法工程师", "keywords": ["Transformer", "面试", "面经"],
+                                     "company": ""}),
+    "zhihu": ("search_answers", {"query": "NLP算法工程师 面试 字节跳动", "skills": ["Transformer"]}),
+}
+
+# 延迟直方图桶边界(毫秒)
+HISTOGRAM_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, math.inf]
+
+RequestFunc = Callable[[], Awaitable[int]]
+
+
+class Recorder:
+    """记录每个请求的延迟与结果"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.dropped = 0
+
+    def record(self, latency: float, status: str):
+        self.latencies.append(latency)
+        self.statuses[status] += 1
+
+    def report(self, wall: float) -> Dict:
+        ordered = sorted(self.latencies)
+        total = len(ordered)
+        errors = sum(count for status, count in self.statuses.items() if not status.startswith("2"))
+
+        def pct(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return round(ordered[min(total - 1, int(p / 100 * total))] * 1000, 2)
+
+        histogram = []
+        remaining = iter(ordered)
+        current = next(remaining, None)
+        for bound in HISTOGRAM_BUCKETS:
+            count = 0
+            while current is not None and current * 1000 <= bound:
+                count += 1
+                current = next(remaining, None)
+            histogram.append({"le_ms": "+Inf" if bound == math.inf else bound, "count": count})
+
+        return {
+            "requests": total,
+            "dropped": self.dropped,
+            "wall_s": round(wall, 3),
+            "throughput_rps": round(total / wall, 2) if wall else 0.0,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "statuses": dict(self.statuses),
+            "latency_ms": {
+                "mean": round(sum(ordered) / total * 1000, 2) if total else 0.0,
+                "p50": pct(50), "p90": pct(90), "p95": pct(95), "p99": pct(99),
+                "max": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+            },
+            "histogram": histogram,
+        }
+
+
+async def timed(recorder: Recorder, request: RequestFunc):
+    start = time.perf_counter()
+    try:
+        status = str(await request())
+    except Exception as e:
+        status = type(e).__name__
+    recorder.record(time.perf_counter() - start, status)
+
+
+async def run_closed(request: RequestFunc, users: int, duration: float) -> Tuple[Recorder, float]:
+    """闭环：users个虚拟用户循环请求，直到duration结束"""
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+
+    async def user():
+        while time.perf_counter() < deadline:
+            await timed(recorder, request)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(users)))
+    return recorder, time.perf_counter() - start
+
+
+async def run_open(request: RequestFunc, rate: float, duration: float,
+                   max_inflight: int) -> Tuple[Recorder, float]:
+    """开环：按泊松到达率发起请求；在途请求超过max_inflight时丢弃并计数"""
+    recorder = Recorder()
+    inflight = set()
+    start = time.perf_counter()
+    next_arrival = start
+
+    while next_arrival - start < duration:
+        now = time.perf_counter()
+        if next_arrival > now:
+            await asyncio.sleep(next_arrival - now)
+        if len(inflight) >= max_inflight:
+            recorder.dropped += 1
+        else:
+            task = asyncio.create_task(timed(recorder, request))
+            inflight.add(task)
+            task.add_done_callback(inflight.discard)
+        next_arrival += random.expovariate(rate)
+
+    if inflight:
+        await asyncio.gather(*inflight)
+    return recorder, time.perf_counter() - start
+
+
+def install_fakes(args):
+    """把后端控制器中的讯飞星火和爬虫替换为本地替身"""
+    from benchmarks.fakes import FakeCrawlerManager, FakeSparkAPI, LatencyModel
+    from backend.MCP_for_website import controller
+
+    controller.context.spark_api = FakeSparkAPI(
+        LatencyModel(args.spark_latency, args.spark_latency * 0.3, args.spark_error_rate))
+    controller.crawler_manager = FakeCrawlerManager(
+        LatencyModel(args.crawl_latency, args.crawl_latency * 0.3, args.crawl_error_rate))
+    if controller.query_planner is not None:
+        controller.query_planner.manager = controller.crawler_manager
+
+
+def build_clients(args) -> Dict[str, httpx.AsyncClient]:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    timeout = httpx.Timeout(args.timeout)
+
+    if args.scenario in ("analyze", "keywords"):
+        if args.url:
+            return {"backend": httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout)}
+        install_fakes(args)
+        from backend.MCP_for_website import app
+        transport = httpx.ASGITransport(app=app)
+        return {"backend": httpx.AsyncClient(transport=transport, base_url="http://backend", timeout=timeout)}
+
+    # mcp-fanout
+    if args.url:
+        with open(ROOT / "config.json", "r", encoding="utf-8") as f:
+            servers = json.load(f)["mcp_servers"]
+        # 配置了多个实例时压测第一个
+        return {name: httpx.AsyncClient(base_url=url if isinstance(url, str) else url[0], limits=limits, timeout=timeout)
+                for name, url in servers.items()}
+
+    import importlib
+    clients = {}
+    for name in MCP_REQUESTS:
+        app = importlib.import_module(f"{name}_server").app
+        clients[name] = httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                          base_url=f"http://{name}", timeout=timeout)
+    return clients
+
+
+def build_request(args, clients: Dict[str, httpx.AsyncClient]) -> RequestFunc:
+    if args.scenario in ("analyze", "keywords"):
+        client = clients["backend"]
+        path = "/" + args.scenario
+
+        async def request() -> int:
+            response = await client.post(path, json=SAMPLE_JOB)
+            return response.status_code
+        return request
+
+    async def fanout() -> int:
+        """与MCPClient一样同时请求三个平台，任一失败即记为失败"""
+        responses = await asyncio.gather(*(
+            clients[name].post(f"/{endpoint}", json=payload)
+            for name, (endpoint, payload) in MCP_REQUESTS.items()
+        ))
+        return max(r.status_code for r in responses)
+    return fanout
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=str(ROOT),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+async def main_async(args) -> Dict:
+    clients = build_clients(args)
+    request = build_request(args, clients)
+    try:
+        # 预热：触发应用的延迟初始化，不计入结果
+        for _ in range(3):
+            await timed(Recorder(), request)
+
+        if args.mode == "closed":
+            recorder, wall = await run_closed(request, args.users, args.duration)
+        else:
+            recorder, wall = await run_open(request, args.rate, args.duration, args.max_inflight)
+    finally:
+        await asyncio.gather(*(client.aclose() for client in clients.values()))
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "result": recorder.report(wall),
+    }
+
+
+def print_summary(run: Dict):
+    r = run["result"]
+    lat = r["latency_ms"]
+    print(f"请求数: {r['requests']}  丢弃: {r['dropped']}  吞吐: {r['throughput_rps']} req/s  错误率: {r['error_rate']:.2%}")
+    print(f"延迟(ms): mean={lat['mean']} p50={lat['p50']} p90={lat['p90']} p95={lat['p95']} "
+          f"p99={lat['p99']} max={lat['max']}")
+    print(f"状态: {r['statuses']}")
+    peak = max((b["count"] for b in r["histogram"]), default=0) or 1
+    for bucket in r["histogram"]:
+        bar = "#" * int(40 * bucket["count"] / peak)
+        print(f"  <= {str(bucket['le_ms']):>6} ms {bucket['count']:>8} {bar}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="后端与MCP服务器压测工具")
+    parser.add_argument("--scenario", choices=["analyze", "keywords", "mcp-fanout"], default="analyze")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument("--users", type=int, default=16, help="闭环模式的虚拟用户数")
+    parser.add_argument("--rate", type=float, default=50.0, help="开环模式的到达率(req/s)")
+    parser.add_argument("--max-inflight", type=int, default=10000, help="开环模式的在途请求上限")
+    parser.add_argument("--duration", type=float, default=10.0, help="压测时长(秒)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="单个请求超时(秒)")
+    parser.add_argument("--url", help="压测已运行的服务而不是进程内应用")
+    parser.add_argument("--spark-latency", type=float, default=1.5, help="讯飞星火替身平均延迟(秒)")
+    parser.add_argument("--spark-error-rate", type=float, default=0.0)
+    parser.add_argument("--crawl-latency", type=float, default=3.0, help="单平台爬虫替身平均延迟(秒)")
+    parser.add_argument("--crawl-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="把结果写入JSON文件，便于不同版本对比")
+    args = parser.parse_args()
+
+    # 进程内压测时应用的逐请求日志会成为瓶颈
+    logging.disable(logging.INFO)
+    run = asyncio.run(main_async(args))
+    print_summary(run)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(run, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+本地替身代理：模拟按IP限流、延迟各异的代理出口
+
+只支持明文HTTP的正向代理（请求行为绝对URL），足以把爬虫对夹具服务器的请求转发过去。
+每个代理可以单独设置：
+- latency / jitter：转发前附加的延迟(秒)
+- rate：每秒允许的请求数，超出返回429，模拟目标站点对单个IP的限流
+- error_rate：随机返回502的比例，模拟不稳定的出口
+
+用法:
+    python benchmarks/proxy_server.py --count 3 --latency 0.05 --rate 5
+    CRAWL_PROXIES=http://127.0.0.1:8911,http://127.0.0.1:8912 python benchmarks/bench_crawlers.py --impl playwright
+"""
+import argparse
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+# 转发时不再经过环境变量里的代理
+_OPENER = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+# 转发响应时不复制的逐跳头
+HOP_HEADERS = {"connection", "keep-alive", "proxy-connection", "transfer-encoding", "content-length"}
+
+
+class ProxyServer:
+    """在后台线程中运行的替身代理"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 rate: Optional[float] = None, error_rate: float = 0.0):
+        """
+        :param latency: 每个请求的基础延迟(秒)
+        :param jitter: 延迟抖动上限(秒)
+        :param rate: 每秒允许的请求数，None表示不限流
+        :param error_rate: 返回502的比例
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.rate = rate
+        self.error_rate = error_rate
+        self.requests = 0
+        self.throttled = 0
+        self.failed = 0
+        self._tokens = rate or 0.0
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _admit(self) -> bool:
+        """令牌桶限流，桶容量为一秒的请求数"""
+        with self._lock:
+            self.requests += 1
+            if self.rate is None:
+                return True
+            now = time.monotonic()
+            self._tokens = min(self.rate, self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self.throttled += 1
+            return False
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, headers=()):
+                self.send_response(status)
+                for name, value in headers:
+                    if name.lower() not in HOP_HEADERS:
+                        self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if not self.path.startswith("http://"):
+                    self._send(400, b"absolute URL required")
+                    return
+                if server.latency or server.jitter:
+                    time.sleep(server.latency + random.uniform(0, server.jitter))
+                if not server._admit():
+                    self._send(429, b"too many requests", [("Retry-After", "1")])
+                    return
+                if server.error_rate and random.random() < server.error_rate:
+                    with server._lock:
+                        server.failed += 1
+                    self._send(502, b"bad gateway")
+                    return
+
+                headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_HEADERS}
+                request = urllib.request.Request(self.path, headers=headers)
+                try:
+                    with _OPENER.open(request, timeout=30) as response:
+                        self._send(response.status, response.read(), response.getheaders())
+                except urllib.error.HTTPError as e:
+                    self._send(e.code, e.read(), e.headers.items())
+                except OSError:
+                    self._send(502, b"upstream unreachable")
+
+        return Handler
+
+    def start(self) -> "ProxyServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "ProxyServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def start_proxies(count: int, latency: float = 0.0, jitter: float = 0.0, rate: Optional[float] = None,
+                  error_rate: float = 0.0, spread: float = 0.0) -> List[ProxyServer]:
+    """启动一组替身代理，第i个代理的延迟为 latency + i * spread，便于观察按延迟加权的效果"""
+    return [ProxyServer(latency=latency + i * spread, jitter=jitter, rate=rate, error_rate=error_rate).start()
+            for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地替身代理")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8911, help="第一个代理的端口，其余依次递增")
+    parser.add_argument("--count", type=int, default=1, help="代理数量")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的基础延迟(秒)")
+    parser.add_argument("--spread", type=float, default=0.0, help="相邻代理的延迟差(秒)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="延迟抖动上限(秒)")
+    parser.add_argument("--rate", type=float, help="每个代理每秒允许的请求数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回502的比例")
+    args = parser.parse_args()
+
+    proxies = [
+        ProxyServer(host=args.host, port=args.port + i, latency=args.latency + i * args.spread, jitter=args.jitter,
+                    rate=args.rate, error_rate=args.error_rate).start()
+        for i in range(args.count)
+    ]
+    print("替身代理已启动: CRAWL_PROXIES=" + ",".join(proxy.url for proxy in proxies))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for proxy in proxies:
+            proxy.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+录制搜索结果页夹具
+
+用Playwright打开真实搜索页，等待渲染完成后把DOM快照保存到
+benchmarks/fixtures/<平台>/search_<n>.html，供离线基准和夹具服务器使用。
+仓库中自带的夹具与真实页面的DOM结构一致，可以用本脚本替换为最新录制的页面。
+
+用法:
+    python benchmarks/record_fixtures.py --query "Python 后端 面经" --query "NLP 算法 面经"
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from urllib.parse import quote
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from playwright.async_api import async_playwright  # noqa: E402
+
+from benchmarks.fixture_server import FIXTURE_DIR  # noqa: E402
+
+SEARCH_URLS = {
+    "nowcoder": "https://www.nowcoder.com/search?query={q}&type=all",
+    "zhihu": "https://www.zhihu.com/search?type=content&q={q}",
+    "xiaohongshu": "https://www.xiaohongshu.com/search_result?keyword={q}",
+}
+
+RESULT_SELECTORS = {
+    "nowcoder": ".search-item, .feed-item, .discuss-item",
+    "zhihu": ".SearchResult-Card",
+    "xiaohongshu": ".note-item",
+}
+
+
+async def record(queries, platforms, wait_ms: int):
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            for platform in platforms:
+                target = FIXTURE_DIR / platform
+                target.mkdir(parents=True, exist_ok=True)
+                for index, query in enumerate(queries, start=1):
+                    page = await browser.new_page()
+                    try:
+                        await page.goto(SEARCH_URLS[platform].format(q=quote(query)), wait_until="networkidle")
+                        try:
+                            await page.wait_for_selector(RESULT_SELECTORS[platform], timeout=wait_ms)
+                        except Exception:
+                            print(f"[{platform}] {query}: 未等到搜索结果，仍保存当前页面")
+                        html = await page.content()
+                        path = target / f"search_{index}.html"
+                        path.write_text(html, encoding="utf-8")
+                        print(f"[{platform}] {query} -> {path} ({len(html)} 字节)")
+                    finally:
+                        await page.close()
+        finally:
+            await browser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="录制搜索结果页夹具")
+    parser.add_argument("--query", action="append", required=True, help="搜索词，可重复")
+    parser.add_argument("--platform", action="append", choices=list(SEARCH_URLS), help="只录制指定平台")
+    parser.add_argument("--wait-ms", type=int, default=10000, help="等待搜索结果出现的超时时间")
+    args = parser.parse_args()
+    asyncio.run(record(args.query, args.platform or list(SEARCH_URLS), args.wait_ms))
+
+
+if __name__ == "__main__":
+    main()
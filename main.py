@@ -1,10 +1,12 @@
 import asyncio
 import json
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import httpx
 from dataclasses import dataclass
 from mcp_client import MCPClient
+from backend.summarizer import MapReduceSummarizer
+from backend.tracing import configure as configure_tracing, start_span
 
 # 加载配置文件
 with open('config.json', 'r', encoding='utf-8') as f:
@@ -25,8 +27,50 @@ class InterviewExperience:
     date: str
     upvotes: int = 0
 
-async def analyze_with_spark(experiences: List[InterviewExperience], jd: JobDescription) -> str:
-    """使用讯飞星火大模型分析面经"""
+# 单次提示词中面经数据的字符上限，超出时切换为层次化分析
+MAX_PROMPT_CHARS = 12000
+
+# 分块摘要缓存在多次分析之间复用，新增面经只需重新计算受影响的分块
+summarizer = None
+
+async def spark_chat(prompt: str) -> str:
+    """向讯飞星火发送单轮对话请求"""
+    with start_span("spark.chat", prompt_chars=len(prompt)) as span:
+        async with httpx.AsyncClient() as client:
+            response = await client.post(
+                CONFIG["spark_api"]["api_url"],
+                headers={"Authorization": f"Bearer {CONFIG['spark_api']['api_key']}"},
+                json={
+                    "header": {"app_id": CONFIG["spark_api"]["app_id"]},
+                    "parameter": {"chat": {"domain": "4.0Ultra"}},
+                    "payload": {"message": {"text": [{"role": "user", "content": prompt}]}}
+                }
+            )
+            span.set_attribute("http.status", response.status_code)
+            text = response.json().get("payload", {}).get("choices", {}).get("text", [""])[0]
+            return text.get("content", "") if isinstance(text, dict) else text
+
+def _job_summary(jd: JobDescription) -> str:
+    return (f"职位名称: {jd.title}\n技能要求: {', '.join(jd.skills)}\n"
+            f"经验要求: {jd.experience}\n公司: {jd.company or '未指定'}")
+
+async def analyze_with_spark(experiences: List[InterviewExperience], jd: JobDescription,
+                             hierarchical: Optional[bool] = None) -> str:
+    """使用讯飞星火大模型分析面经
+
+    面经数据超出单次提示词容量时（或 hierarchical=True）使用map-reduce层次化分析。
+    """
+    experiences_json = json.dumps([exp.__dict__ for exp in experiences], indent=2, ensure_ascii=False)
+    if hierarchical is None:
+        hierarchical = len(experiences_json) > MAX_PROMPT_CHARS
+
+    if hierarchical:
+        global summarizer
+        if summarizer is None:
+            summarizer = MapReduceSummarizer(spark_chat)
+        result = await summarizer.summarize(experiences, _job_summary(jd))
+        return result.get("analysis") or result.get("error", "")
+
     prompt = f"""
     你是一个资深面试分析师，请根据以下岗位描述和面经数据，生成详细的面试准备报告。
 
@@ -37,20 +81,10 @@ async def analyze_with_spark(experiences: List[InterviewExperience], jd: JobDesc
     - 公司: {jd.company or '未指定'}
 
     面经数据:
-    {json.dumps([exp.__dict__ for exp in experiences], indent=2, ensure_ascii=False)}
+    {experiences_json}
     """
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            CONFIG["spark_api"]["api_url"],
-            headers={"Authorization": f"Bearer {CONFIG['spark_api']['api_key']}"},
-            json={
-                "header": {"app_id": CONFIG["spark_api"]["app_id"]},
-                "parameter": {"chat": {"domain": "4.0Ultra"}},
-                "payload": {"message": {"text": [{"role": "user", "content": prompt}]}}
-            }
-        )
-        return response.json().get("payload", {}).get("choices", {}).get("text", [""])[0]
+    return await spark_chat(prompt)
 
 async def main():
     # 示例岗位描述
@@ -61,30 +95,33 @@ async def main():
         company="字节跳动"
     )
     
-    # 初始化MCP客户端
-    mcp_client = MCPClient(CONFIG["mcp_servers"])
-    
-    print("开始爬取面经数据...")
-    
-    # 并行爬取各平台数据
-    tasks = [
-        mcp_client.fetch_niuke_experiences(jd),
-        mcp_client.fetch_xiaohongshu_experiences(jd),
-        mcp_client.fetch_zhihu_experiences(jd)
-    ]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    
-    # 合并结果
-    all_experiences = []
-    for exp_list in results:
-        if isinstance(exp_list, list):
-            all_experiences.extend(exp_list)
-    
-    print(f"共爬取到{len(all_experiences)}条面经数据")
+    # 初始化MCP客户端，由编排器启动服务器时通过注册表发现各实例
+    mcp_client = MCPClient(CONFIG["mcp_servers"], registry_url=os.getenv("MCP_REGISTRY_URL"))
+    configure_tracing("main")
     
-    # 使用讯飞星火分析
-    print("正在使用讯飞星火大模型分析数据...")
-    analysis_result = await analyze_with_spark(all_experiences, jd)
+    # 一次运行对应一个trace，MCP请求与大模型调用都挂在根span下
+    with start_span("main.analyze", position=jd.title, company=jd.company):
+        print("开始爬取面经数据...")
+        
+        # 并行爬取各平台数据
+        tasks = [
+            mcp_client.fetch_niuke_experiences(jd),
+            mcp_client.fetch_xiaohongshu_experiences(jd),
+            mcp_client.fetch_zhihu_experiences(jd)
+        ]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        # 合并结果
+        all_experiences = []
+        for exp_list in results:
+            if isinstance(exp_list, list):
+                all_experiences.extend(exp_list)
+        
+        print(f"共爬取到{len(all_experiences)}条面经数据")
+        
+        # 使用讯飞星火分析
+        print("正在使用讯飞星火大模型分析数据...")
+        analysis_result = await analyze_with_spark(all_experiences, jd)
     
     # 输出分析报告
     print("\n=== 面试准备报告 ===")
@@ -1,23 +1,76 @@
 import httpx
 import asyncio
-from typing import List
+import itertools
+import time
+from typing import Dict, List, Optional, Union
 from dataclasses import asdict
 
+from backend.metrics import ERRORS, RETRIES
+from backend.tracing import inject, start_span
+
+# 从编排器刷新实例列表的间隔(秒)
+REGISTRY_TTL = 5.0
+
 class MCPClient:
-    def __init__(self, server_config: dict):
-        self.servers = server_config
-    
+    def __init__(self, server_config: Dict[str, Union[str, List[str]]], registry_url: Optional[str] = None):
+        """
+        :param server_config: 平台名到服务器地址的映射，地址可以是单个URL或多个实例的URL列表
+        :param registry_url: 编排器的 /registry 地址，设置后按其返回的健康实例分发请求，
+                             注册表不可用时退回 server_config
+        """
+        self.servers = {name: [urls] if isinstance(urls, str) else list(urls)
+                        for name, urls in server_config.items()}
+        self.registry_url = registry_url
+        self._registry_fetched_at = 0.0
+        self._cursors: Dict[str, itertools.count] = {}
+
+    async def _refresh_registry(self):
+        if not self.registry_url or time.monotonic() - self._registry_fetched_at < REGISTRY_TTL:
+            return
+        self._registry_fetched_at = time.monotonic()
+        try:
+            async with httpx.AsyncClient(timeout=2) as client:
+                response = await client.get(self.registry_url)
+                response.raise_for_status()
+            for name, urls in response.json().items():
+                if urls:
+                    self.servers[name] = urls
+        except (httpx.HTTPError, ValueError) as e:
+            ERRORS.labels("mcp_client", "registry").inc()
+            print(f"获取MCP注册表失败，沿用已知实例: {e}")
+
+    def _endpoints(self, server_name: str) -> List[str]:
+        """按轮询顺序排列的实例地址，第一个为本次首选"""
+        urls = self.servers[server_name]
+        start = next(self._cursors.setdefault(server_name, itertools.count())) % len(urls)
+        return urls[start:] + urls[:start]
+
     async def _fetch_from_server(self, server_name: str, endpoint: str, params: dict) -> List:
-        """通用MCP请求方法"""
-        url = f"{self.servers[server_name]}/{endpoint}"
-        async with httpx.AsyncClient(timeout=10) as client:
-            response = await client.post(
-                url,
-                json=params,
-                headers={"User-Agent": "MCP Interview Crawler"}
-            )
-            response.raise_for_status()
-            return [self._create_interview_experience(exp) for exp in response.json()]
+        """通用MCP请求方法，连接失败或5xx时换下一个实例重试"""
+        await self._refresh_registry()
+        endpoints = self._endpoints(server_name)
+        for attempt, base_url in enumerate(endpoints):
+            url = f"{base_url}/{endpoint}"
+            last = attempt == len(endpoints) - 1
+            with start_span(f"mcp.{server_name}.{endpoint}", url=url, attempt=attempt) as span:
+                try:
+                    async with httpx.AsyncClient(timeout=10) as client:
+                        response = await client.post(
+                            url,
+                            json=params,
+                            headers=inject({"User-Agent": "MCP Interview Crawler"})
+                        )
+                except httpx.TransportError:
+                    if last:
+                        raise
+                    RETRIES.labels("mcp_client").inc()
+                    continue
+                span.set_attribute("http.status", response.status_code)
+                if response.status_code >= 500 and not last:
+                    RETRIES.labels("mcp_client").inc()
+                    continue
+                response.raise_for_status()
+                return [self._create_interview_experience(exp) for exp in response.json()]
     
     def _create_interview_experience(self, data):
         """创建InterviewExperience对象"""
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+MCP服务器编排器
+
+在一个进程中启动并监管各平台MCP服务器的多个实例，替代手动开三个终端：
+
+- 每个实例是一个独立子进程，端口自动分配
+- 进程退出或连续健康检查失败时按指数退避重启
+- 控制接口提供实例注册表（/registry）和汇总健康状态（/health），
+  MCPClient 通过注册表发现实例并在实例间轮询、失败转移
+
+    python mcp_orchestrator.py --instances niuke=2,xiaohongshu=1,zhihu=3
+    MCP_REGISTRY_URL=http://localhost:8010/registry python main.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SERVERS_DIR = os.path.join(ROOT, "mcp_servers")
+
+with open(os.path.join(ROOT, "config.json"), "r", encoding="utf-8") as f:
+    PLATFORMS = list(json.load(f)["mcp_servers"])
+
+# 连续多少次健康检查失败视为卡死，强制重启
+MAX_PROBE_FAILURES = 3
+# 子进程启动后多久内不做健康判定(秒)
+STARTUP_GRACE = 5.0
+# 重启退避上限(秒)
+MAX_BACKOFF = 30.0
+
+
+def free_port(host: str) -> int:
+    """向系统申请一个空闲端口"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def port_available(host: str, port: int) -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        # 与uvicorn一致，允许复用处于TIME_WAIT的端口
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((host, port))
+        except OSError:
+            return False
+        return True
+
+
+class Instance:
+    """一个MCP服务器子进程"""
+
+    def __init__(self, platform: str, index: int, host: str, port: int):
+        self.platform = platform
+        self.index = index
+        self.host = host
+        self.port = port
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.failures_in_row = 0
+        self.healthy = False
+        self.probe_failures = 0
+        self.last_error: Optional[str] = None
+        self.next_start = 0.0
+
+    @property
+    def name(self) -> str:
+        return f"{self.platform}-{self.index}"
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    def snapshot(self) -> Dict:
+        return {
+            "name": self.name,
+            "url": self.url,
+            "pid": self.process.pid if self.running else None,
+            "running": self.running,
+            "healthy": self.healthy,
+            "restarts": self.restarts,
+            "uptime_s": round(time.monotonic() - self.started_at, 1) if self.running else 0,
+            "last_error": self.last_error,
+        }
+
+
+class Orchestrator:
+    """启动、监管并汇总各平台MCP服务器实例"""
+
+    def __init__(self, instances: Dict[str, int], host: str = "127.0.0.1",
+                 probe_interval: float = 2.0, log_level: str = "warning"):
+        """
+        :param instances: 各平台的实例数
+        :param host: 实例监听地址
+        :param probe_interval: 健康检查与进程巡检间隔(秒)
+        :param log_level: 子进程uvicorn日志级别
+        """
+        self.host = host
+        self.probe_interval = probe_interval
+        self.log_level = log_level
+        self.instances: List[Instance] = [
+            Instance(platform, index, host, free_port(host))
+            for platform, count in instances.items()
+            for index in range(count)
+        ]
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._stopping = False
+
+    async def _spawn(self, instance: Instance):
+        # 重启时优先沿用原端口，被占用时重新分配
+        if not port_available(self.host, instance.port):
+            instance.port = free_port(self.host)
+        script = os.path.join(SERVERS_DIR, f"{instance.platform}_server.py")
+        instance.process = await asyncio.create_subprocess_exec(
+            sys.executable, script,
+            "--host", self.host, "--port", str(instance.port), "--log-level", self.log_level,
+            cwd=ROOT,
+            # 独立进程组：Ctrl-C 只由编排器处理，再由编排器依次停止子进程
+            start_new_session=True,
+        )
+        instance.started_at = time.monotonic()
+        instance.healthy = False
+        instance.probe_failures = 0
+        print(f"▶️  {instance.name} 已启动: {instance.url} (pid {instance.process.pid})")
+
+    async def _terminate(self, instance: Instance, timeout: float = 5.0):
+        if not instance.running:
+            return
+        instance.process.terminate()
+        try:
+            await asyncio.wait_for(instance.process.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            instance.process.kill()
+            await instance.process.wait()
+
+    def _schedule_restart(self, instance: Instance, reason: str):
+        instance.healthy = False
+        instance.last_error = reason
+        backoff = min(MAX_BACKOFF, 0.5 * 2 ** instance.failures_in_row)
+        instance.next_start = time.monotonic() + backoff
+        instance.restarts += 1
+        instance.failures_in_row += 1
+        print(f"⚠️  {instance.name} {reason}，{backoff:.1f}秒后重启（第{instance.restarts}次）")
+
+    async def _probe(self, instance: Instance):
+        try:
+            response = await self._client.get(f"{instance.url}/health")
+            ok = response.status_code == 200
+            error = None if ok else f"HTTP {response.status_code}"
+        except httpx.HTTPError as e:
+            ok, error = False, type(e).__name__
+        if ok:
+            # 稳定运行一段时间后清零退避
+            if time.monotonic() - instance.started_at > MAX_BACKOFF:
+                instance.failures_in_row = 0
+            instance.healthy = True
+            instance.probe_failures = 0
+            return
+        instance.healthy = False
+        if time.monotonic() - instance.started_at < STARTUP_GRACE:
+            return
+        instance.last_error = error
+        instance.probe_failures += 1
+        if instance.probe_failures >= MAX_PROBE_FAILURES:
+            await self._terminate(instance)
+            self._schedule_restart(instance, f"连续{instance.probe_failures}次健康检查失败({error})")
+
+    async def _supervise(self):
+        while not self._stopping:
+            now = time.monotonic()
+            for instance in self.instances:
+                if instance.process is not None and instance.process.returncode is not None \
+                        and instance.next_start <= instance.started_at:
+                    self._schedule_restart(instance, f"进程退出(code {instance.process.returncode})")
+                if not instance.running and instance.next_start <= now:
+                    await self._spawn(instance)
+            await asyncio.gather(*(self._probe(i) for i in self.instances if i.running))
+            await asyncio.sleep(self.probe_interval)
+
+    async def start(self):
+        self._client = httpx.AsyncClient(timeout=2.0)
+        for instance in self.instances:
+            await self._spawn(instance)
+        self._task = asyncio.create_task(self._supervise())
+
+    async def stop(self):
+        self._stopping = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await asyncio.gather(*(self._terminate(i) for i in self.instances))
+        if self._client is not None:
+            await self._client.aclose()
+
+    def registry(self) -> Dict[str, List[str]]:
+        """各平台当前健康实例的地址，MCPClient据此分发请求"""
+        return {
+            platform: [i.url for i in self.instances if i.platform == platform and i.healthy]
+            for platform in dict.fromkeys(i.platform for i in self.instances)
+        }
+
+    def health(self) -> Dict:
+        """汇总健康状态：所有平台都至少有一个健康实例才算可用"""
+        platforms = {}
+        for platform in dict.fromkeys(i.platform for i in self.instances):
+            members = [i for i in self.instances if i.platform == platform]
+            healthy = sum(i.healthy for i in members)
+            platforms[platform] = {
+                "healthy": healthy,
+                "total": len(members),
+                "instances": [i.snapshot() for i in members],
+            }
+        if all(p["healthy"] == p["total"] for p in platforms.values()):
+            status = "healthy"
+        elif all(p["healthy"] for p in platforms.values()):
+            status = "degraded"
+        else:
+            status = "unhealthy"
+        return {"status": status, "platforms": platforms}
+
+
+def create_app(orchestrator: Orchestrator) -> FastAPI:
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # 在lifespan中停止子进程：uvicorn收到信号后先执行shutdown，再把信号重新抛给进程
+        await orchestrator.start()
+        yield
+        print("\n🛑 正在停止MCP服务器...")
+        await orchestrator.stop()
+
+    app = FastAPI(title="MCP Orchestrator", lifespan=lifespan)
+
+    @app.get("/health")
+    async def health():
+        """汇总健康状态，有平台没有任何健康实例时返回503"""
+        body = orchestrator.health()
+        return JSONResponse(body, status_code=503 if body["status"] == "unhealthy" else 200)
+
+    @app.get("/registry")
+    async def registry():
+        return orchestrator.registry()
+
+    return app
+
+
+def parse_instances(spec: str, default: int) -> Dict[str, int]:
+    """解析 "niuke=2,zhihu=3"，未列出的平台使用默认实例数"""
+    counts = {platform: default for platform in PLATFORMS}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        platform, _, count = item.partition("=")
+        if platform not in counts:
+            raise SystemExit(f"未知平台: {platform}，可选: {', '.join(PLATFORMS)}")
+        counts[platform] = int(count)
+    return {platform: count for platform, count in counts.items() if count > 0}
+
+
+def run(args):
+    orchestrator = Orchestrator(parse_instances(args.instances, args.default), host=args.host,
+                                log_level=args.log_level)
+    print(f"📡 编排器地址: http://localhost:{args.port}  (注册表 /registry，健康状态 /health)")
+    uvicorn.run(create_app(orchestrator), host="0.0.0.0", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="启动并监管各平台MCP服务器")
+    parser.add_argument("--instances", default=os.getenv("MCP_INSTANCES", ""),
+                        help="各平台实例数，如 niuke=2,zhihu=3")
+    parser.add_argument("--default", type=int, default=1, help="未指定平台的实例数")
+    parser.add_argument("--host", default="127.0.0.1", help="实例监听地址")
+    parser.add_argument("--port", type=int, default=int(os.getenv("ORCHESTRATOR_PORT", "8010")),
+                        help="编排器控制接口端口")
+    parser.add_argument("--log-level", default="warning", help="实例的uvicorn日志级别")
+    args = parser.parse_args()
+    run(args)
@@ -4,12 +4,17 @@ from datetime import datetime, timedelta
 import random
 import json
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from backend.tracing import trace_middleware
 
 # 加载配置
 with open(os.path.join(os.path.dirname(__file__), '..', 'config.json'), 'r', encoding='utf-8') as f:
     CONFIG = json.load(f)
 
 app = FastAPI()
+app.middleware("http")(trace_middleware("mcp-niuke"))
 
 # 模拟数据库
 mock_experiences = [
@@ -45,7 +50,17 @@ async def fetch_interviews(request: Request):
     
     return JSONResponse(filtered)
 
+@app.get("/health")
+async def health():
+    return {"status": "healthy", "server": "niuke", "pid": os.getpid()}
+
 if __name__ == "__main__":
+    import argparse
     import uvicorn
-    port = int(CONFIG["mcp_servers"]["niuke"].split(":")[-1])
-    uvicorn.run(app, host="0.0.0.0", port=port) 
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    # 由编排器启动时指定端口，单独启动时使用config.json中的端口
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(CONFIG["mcp_servers"]["niuke"].split(":")[-1]))
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level=args.log_level) 
\ No newline at end of file
@@ -1,12 +1,23 @@
 #!/usr/bin/env python3
 """
 面经爬取系统启动脚本
+
+开发模式（默认）：单进程，代码变更自动重载
+生产模式：多工作进程、按请求数回收进程、优雅退出
+
+    python start_server.py
+    python start_server.py --production --workers 4
 """
+import argparse
+import importlib
+import inspect
 import os
 import sys
 import uvicorn
 from pathlib import Path
 
+APP = "backend.MCP_for_website:app"
+
 def check_environment():
     """检查环境配置"""
     print("🔍 检查环境配置...")
@@ -36,6 +47,111 @@ def check_environment():
     
     return True
 
+def uvicorn_respawns_workers() -> bool:
+    """uvicorn 0.30 起多进程模式的主进程才会重新拉起退出的工作进程"""
+    try:
+        major, minor = (int(part) for part in uvicorn.__version__.split(".")[:2])
+    except ValueError:
+        return False
+    return (major, minor) >= (0, 30)
+
+def production_settings(workers=None) -> dict:
+    """生产模式的uvicorn参数，均可通过环境变量覆盖"""
+    settings = {
+        "workers": workers or int(os.getenv("WORKERS", os.cpu_count() or 1)),
+        # Chromium存在内存泄漏，工作进程处理一定数量请求后退出，由主进程拉起新进程
+        "limit_max_requests": int(os.getenv("MAX_REQUESTS", "500")) or None,
+        "timeout_graceful_shutdown": int(os.getenv("GRACEFUL_TIMEOUT", "30")),
+        "backlog": int(os.getenv("BACKLOG", "2048")),
+    }
+    # 旧版本不会补充退出的工作进程，回收会让服务逐渐停止响应
+    if settings["limit_max_requests"] and not uvicorn_respawns_workers():
+        print(f"⚠️  uvicorn {uvicorn.__version__} 不会重启退出的工作进程，已关闭按请求数回收（需要 uvicorn>=0.30）")
+        settings["limit_max_requests"] = None
+    if os.getenv("LIMIT_CONCURRENCY"):
+        settings["limit_concurrency"] = int(os.getenv("LIMIT_CONCURRENCY"))
+    # 加随机抖动，避免所有工作进程同时回收
+    if "limit_max_requests_jitter" in inspect.signature(uvicorn.run).parameters:
+        settings["limit_max_requests_jitter"] = int(os.getenv("MAX_REQUESTS_JITTER", "50"))
+    return settings
+
+def preload_app():
+    """在主进程中先导入一次应用：配置错误在启动阶段暴露，磁盘缓存的表结构也只创建一次
+
+    uvicorn以spawn方式启动工作进程，每个进程仍会各自导入应用，进程间只共享磁盘缓存。
+    """
+    print("📦 预加载应用...")
+    module_name, _ = APP.split(":")
+    module = importlib.import_module(module_name)
+    return module
+
+def report_concurrency(settings: dict, module):
+    """输出实际生效的并发配置"""
+    from backend import crawlers
+    
+    workers = settings["workers"]
+    queue_depth = module.health_monitor.max_queue_depth
+    platforms = len(module.controller.crawler_manager.crawlers)
+    if module.controller.query_planner is not None:
+        from backend.query_planner import QUERY_PLAN_PARALLEL
+        # 查询规划：同时进行 QUERY_PLAN_PARALLEL 个查询，对冲补充的查询共用同一个计划的并发限制
+        concurrent_queries = QUERY_PLAN_PARALLEL
+        per_request = f"{QUERY_PLAN_PARALLEL}个并行查询 x {platforms}个平台"
+    else:
+        # 对冲模式下讯飞星火补充的关键词会再爬一轮
+        concurrent_queries = 2 if module.controller.hedged and module.controller.context.spark_api else 1
+        per_request = f"{platforms}个平台 x {concurrent_queries}轮"
+    browsers = workers * queue_depth * platforms * concurrent_queries
+    cache = module.controller.crawler_manager.cache
+    
+    print("⚙️  生效的并发配置:")
+    print(f"   - 工作进程数: {workers}")
+    print(f"   - 单进程连接上限: {settings.get('limit_concurrency') or '不限'}，监听队列: {settings['backlog']}")
+    print(f"   - 单进程就绪阈值: {queue_depth} 个进行中的分析请求")
+    print(f"   - 每个分析请求的浏览器数: {platforms * concurrent_queries}（{per_request}）")
+    print(f"   - 理论浏览器峰值: {browsers}")
+    jitter = settings.get("limit_max_requests_jitter", 0)
+    recycle = f"{settings['limit_max_requests']} (±{jitter}) 个请求后回收" if settings["limit_max_requests"] else "不回收"
+    print(f"   - 工作进程回收: {recycle}")
+    print(f"   - 优雅退出等待: {settings['timeout_graceful_shutdown']} 秒")
+    if cache is not None and cache.disk is not None:
+        print(f"   - 共享爬取缓存: {os.path.abspath(cache.disk.path)}（{int(crawlers.CRAWL_CACHE_TTL)} 秒）")
+    else:
+        print("   - 共享爬取缓存: 关闭")
+
+def start_production(workers=None):
+    """生产模式：多工作进程，不监听文件变更"""
+    print("🚀 以生产模式启动面经爬取系统...")
+    
+    if not check_environment():
+        sys.exit(1)
+    
+    host = os.getenv("HOST", "0.0.0.0")
+    port = int(os.getenv("PORT", 8000))
+    settings = production_settings(workers)
+    module = preload_app()
+    report_concurrency(settings, module)
+    
+    print(f"📡 服务器地址: http://{host}:{port}")
+    print("🚦 就绪检查: /ready")
+    print("\n" + "="*50)
+    
+    try:
+        uvicorn.run(
+            APP,
+            host=host,
+            port=port,
+            reload=False,
+            log_level="warning",
+            access_log=False,
+            **settings
+        )
+    except KeyboardInterrupt:
+        print("\n👋 服务器已停止")
+    except Exception as e:
+        print(f"❌ 启动失败: {e}")
+        sys.exit(1)
+
 def start_server():
     """启动服务器"""
     print("🚀 启动面经爬取系统...")
@@ -53,12 +169,13 @@ def start_server():
     print(f"🔧 调试模式: {'开启' if debug else '关闭'}")
     print("📚 API文档: http://localhost:8000/docs")
     print("🔍 系统监控: http://localhost:8000/health")
+    print("🚦 就绪检查: http://localhost:8000/ready")
     print("\n" + "="*50)
     
     try:
         # 启动服务器
         uvicorn.run(
-            "backend.MCP_for_website:app",
+            APP,
             host=host,
             port=port,
             reload=debug,
@@ -72,4 +189,12 @@ def start_server():
         sys.exit(1)
 
 if __name__ == "__main__":
-    start_server() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="面经爬取系统启动脚本")
+    parser.add_argument("--production", action="store_true", help="生产模式（也可设置 MODE=production）")
+    parser.add_argument("--workers", type=int, help="工作进程数，默认CPU核数")
+    args = parser.parse_args()
+    
+    if args.production or os.getenv("MODE", "").lower() == "production":
+        start_production(args.workers)
+    else:
+        start_server() 
\ No newline at end of file
@@ -11,16 +11,21 @@ import hmac
 import hashlib
 import datetime
 import aiohttp
-from bs4 import BeautifulSoup
 from typing import List, Dict, Optional, Any, Tuple
 import re
-from urllib.parse import quote, urlencode
+import random
+from urllib.parse import quote, urlencode, urlsplit
 import functools
 import logging
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
 from dotenv import load_dotenv
 
+from backend.cache import cached
+from backend.html_parsers import ParseStage, parse_page, record_to_dict
+from backend.identities import BLOCKED_STATUSES, IdentityPool
+from backend.summarizer import MapReduceSummarizer
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -33,27 +38,17 @@ logger = logging.getLogger("MCP-System")
 load_dotenv()
 
 # 缓存装饰器，减少API调用
-def cache_response(ttl=3600):
+def cache_response(ttl=3600, max_size=1024):
     """缓存装饰器，用于减少重复请求
     
+    基于 backend.cache.TTLCache：容量有上限、按LRU淘汰、过期条目会被清理，
+    线程安全，缓存键只由参数决定（方法调用不包含self）。
+    
     Args:
         ttl: 缓存有效期(秒)
+        max_size: 最大缓存条目数
     """
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            cache_key = hashlib.md5((str(args) + str(kwargs)).encode()).hexdigest()
-            # 这里简化为内存缓存，实际应用可用Redis
-            if not hasattr(wrapper, 'cache'):
-                wrapper.cache = {}
-            if cache_key in wrapper.cache and time.time() - wrapper.cache[cache_key]['time'] < ttl:
-                logger.debug(f"Cache hit for {func.__name__}")
-                return wrapper.cache[cache_key]['data']
-            result = func(*args, **kwargs)
-            wrapper.cache[cache_key] = {'data': result, 'time': time.time()}
-            return result
-        return wrapper
-    return decorator
+    return cached(ttl=ttl, max_size=max_size)
 
 class RetryStrategy:
     """重试策略实现"""
@@ -93,6 +88,29 @@ class RetryStrategy:
             return func(*args, **kwargs)  # 最后一次尝试
         return wrapper
 
+class AsyncRetryStrategy(RetryStrategy):
+    """异步重试策略，退避等待使用asyncio.sleep，不阻塞事件循环"""
+    
+    def __call__(self, func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            retry_count = 0
+            current_delay = self.delay
+            
+            while True:
+                try:
+                    return await func(*args, **kwargs)
+                except self.exceptions as e:
+                    retry_count += 1
+                    if retry_count >= self.max_retries:
+                        logger.error(f"Max retries reached for {func.__name__}: {e}")
+                        raise
+                    
+                    logger.warning(f"Retry {retry_count}/{self.max_retries} for {func.__name__} after {current_delay}s: {e}")
+                    await asyncio.sleep(current_delay)
+                    current_delay *= self.backoff
+        return wrapper
+
 class SparkAPI:
     """讯飞星火API封装"""
     
@@ -143,22 +161,9 @@ class SparkAPI:
         url = self.spark_url + '?' + urlencode(v)
         return url
     
-    @RetryStrategy(max_retries=3, delay=2)
-    def chat(self, prompt: str, max_tokens: int = 2048, temperature: float = 0.5) -> Dict:
-        """发送对话请求
-        
-        Args:
-            prompt: 用户输入的文本
-            max_tokens: 最大生成token数
-            temperature: 温度参数，控制随机性
-            
-        Returns:
-            Dict: 解析后的响应结果
-        """
-        url = self._create_auth_url()
-        
-        # 构建请求数据
-        data = {
+    def _build_request(self, prompt: str, max_tokens: int, temperature: float) -> Dict:
+        """构建请求数据"""
+        return {
             "header": {
                 "app_id": self.app_id,
                 "uid": f"mcp_user_{int(time.time())}"
@@ -178,6 +183,31 @@ class SparkAPI:
                 }
             }
         }
+    
+    def _parse_response(self, result: Dict) -> Dict:
+        """解析响应"""
+        if result["header"]["code"] != 0:
+            logger.error(f"Spark API error: {result['header']['message']}")
+            return {"error": result["header"]["message"]}
+        
+        content = result["payload"]["choices"]["text"][0]["content"]
+        logger.info(f"Received response from Spark API, length: {len(content)}")
+        return {"content": content}
+    
+    @RetryStrategy(max_retries=3, delay=2)
+    def chat(self, prompt: str, max_tokens: int = 2048, temperature: float = 0.5) -> Dict:
+        """发送对话请求
+        
+        Args:
+            prompt: 用户输入的文本
+            max_tokens: 最大生成token数
+            temperature: 温度参数，控制随机性
+            
+        Returns:
+            Dict: 解析后的响应结果
+        """
+        url = self._create_auth_url()
+        data = self._build_request(prompt, max_tokens, temperature)
         
         logger.info(f"Sending request to Spark API, prompt length: {len(prompt)}")
         
@@ -190,48 +220,41 @@ class SparkAPI:
                 timeout=60
             )
             response.raise_for_status()
-            result = response.json()
-            
-            # 解析响应
-            if result["header"]["code"] != 0:
-                logger.error(f"Spark API error: {result['header']['message']}")
-                return {"error": result["header"]["message"]}
-            
-            content = result["payload"]["choices"]["text"][0]["content"]
-            logger.info(f"Received response from Spark API, length: {len(content)}")
-            return {"content": content}
+            return self._parse_response(response.json())
             
         except Exception as e:
             logger.error(f"Spark API request failed: {str(e)}")
             return {"error": str(e)}
 
-class UserAgentPool:
-    """User-Agent池，用于反爬虫"""
-    
-    def __init__(self):
-        self.agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.1 Safari/605.1.15",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:89.0) Gecko/20100101 Firefox/89.0",
-            "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36",
-            "Mozilla/5.0 (iPhone; CPU iPhone OS 14_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0 Mobile/15E148 Safari/604.1",
-            "Mozilla/5.0 (iPad; CPU OS 14_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0 Mobile/15E148 Safari/604.1"
-        ]
-        self.index = 0
-    
-    def get_random_agent(self) -> str:
-        """获取随机User-Agent"""
-        agent = self.agents[self.index]
-        self.index = (self.index + 1) % len(self.agents)
-        return agent
-
 class SpiderEngine:
     """多平台爬虫引擎"""
     
-    def __init__(self):
-        self.ua_pool = UserAgentPool()
+    def __init__(self, parse_workers: Optional[int] = None):
+        """
+        Args:
+            parse_workers: 解析进程数，为空时在调用线程内解析
+        """
+        # 按站点维护User-Agent与代理出口的身份池
+        self.identities: Dict[str, IdentityPool] = {}
         self.executor = ThreadPoolExecutor(max_workers=5)
         self.session = requests.Session()
+        self.parse_stage = ParseStage(parse_workers) if parse_workers else None
+        # 各平台站点根地址，基准测试时可指向本地替身服务器
+        self.base_urls = {
+            'nowcoder': 'https://www.nowcoder.com',
+            'xiaohongshu': 'https://www.xiaohongshu.com',
+            'zhihu': 'https://www.zhihu.com'
+        }
+        # 每次请求前的随机延迟范围(秒)
+        self.delay_range = (1, 2)
+    
+    def _identity_pool(self, url: str) -> IdentityPool:
+        """站点按IP限流，身份的表现按站点分别统计"""
+        host = urlsplit(url).hostname or ""
+        pool = self.identities.get(host)
+        if pool is None:
+            pool = self.identities.setdefault(host, IdentityPool(f"spider:{host}"))
+        return pool
     
     @cache_response(ttl=86400)  # 缓存一天
     @RetryStrategy(max_retries=3, delay=2)
@@ -244,26 +267,41 @@ class SpiderEngine:
         Returns:
             str: 页面HTML内容
         """
+        pool = self._identity_pool(url)
+        identity = pool.acquire()
         headers = {
-            'User-Agent': self.ua_pool.get_random_agent(),
+            'User-Agent': identity.user_agent,
             'Accept': 'text/html,application/xhtml+xml,application/xml',
             'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
             'Referer': 'https://www.google.com/'
         }
+        proxies = {'http': identity.proxy, 'https': identity.proxy} if identity.proxy else None
         
         logger.info(f"Fetching page: {url}")
         
+        reported = False
         try:
             # 随机延迟，避免被反爬
-            time.sleep(1 + time.random())
+            time.sleep(random.uniform(*self.delay_range))
             
-            response = self.session.get(url, headers=headers, timeout=15)
+            start = time.perf_counter()
+            response = self.session.get(url, headers=headers, proxies=proxies, timeout=15)
+            pool.report(identity, time.perf_counter() - start, ok=response.ok,
+                        burned=response.status_code in BLOCKED_STATUSES)
+            reported = True
             response.raise_for_status()
             return response.text
         except Exception as e:
+            if not reported:
+                pool.report(identity, None, ok=False)
             logger.error(f"Failed to fetch {url}: {str(e)}")
             return ""
     
+    def _parse_inline(self, platform: str, html: str) -> List[Dict]:
+        posts = [record_to_dict(r) for r in parse_page(platform, html)]
+        logger.info(f"Parsed {len(posts)} posts from {platform}")
+        return posts
+    
     def parse_nowcoder(self, html: str) -> List[Dict]:
         """解析牛客网面经
         
@@ -273,55 +311,7 @@ class SpiderEngine:
         Returns:
             List[Dict]: 解析出的面经列表
         """
-        soup = BeautifulSoup(html, 'html.parser')
-        posts = []
-        
-        try:
-            # 搜索结果页面
-            items = soup.select('.discuss-main') or soup.select('.post-item')
-            
-            for item in items:
-                try:
-                    title_elem = item.select_one('.post-title') or item.select_one('a')
-                    if not title_elem:
-                        continue
-                        
-                    title = title_elem.get_text(strip=True)
-                    
-                    # 获取链接
-                    link = title_elem.get('href', '')
-                    if link and not link.startswith('http'):
-                        link = f"https://www.nowcoder.com{link}"
-                    
-                    # 获取内容摘要
-                    content_elem = item.select_one('.post-content') or item.select_one('.post-topic-des')
-                    content = content_elem.get_text(strip=True) if content_elem else ""
-                    
-                    # 获取作者信息
-                    author_elem = item.select_one('.post-author') or item.select_one('.post-user')
-                    author = author_elem.get_text(strip=True) if author_elem else "匿名用户"
-                    
-                    # 过滤非面经内容
-                    if not any(keyword in title.lower() for keyword in ['面经', '面试', 'interview']):
-                        continue
-                    
-                    posts.append({
-                        'title': title,
-                        'content': content[:500],  # 限制内容长度
-                        'url': link,
-                        'author': author,
-                        'platform': 'nowcoder'
-                    })
-                    
-                except Exception as e:
-                    logger.warning(f"Error parsing nowcoder item: {str(e)}")
-                    continue
-                    
-        except Exception as e:
-            logger.error(f"Error parsing nowcoder page: {str(e)}")
-        
-        logger.info(f"Parsed {len(posts)} posts from nowcoder")
-        return posts
+        return self._parse_inline('nowcoder', html)
     
     def parse_xiaohongshu(self, html: str) -> List[Dict]:
         """解析小红书面经
@@ -332,79 +322,7 @@ class SpiderEngine:
         Returns:
             List[Dict]: 解析出的面经列表
         """
-        soup = BeautifulSoup(html, 'html.parser')
-        posts = []
-        
-        try:
-            # 小红书页面可能是动态加载的，这里尝试提取可见内容
-            script_tags = soup.select('script')
-            json_data = None
-            
-            # 尝试从script标签中提取数据
-            for script in script_tags:
-                script_text = script.string
-                if script_text and 'window.__INITIAL_STATE__' in script_text:
-                    json_str = script_text.split('window.__INITIAL_STATE__=')[1].split(';')[0]
-                    try:
-                        json_data = json.loads(json_str)
-                        break
-                    except:
-                        pass
-            
-            # 如果找到了JSON数据
-            if json_data and 'note' in json_data:
-                notes = json_data['note'].get('noteList', [])
-                for note in notes:
-                    title = note.get('title', '无标题')
-                    content = note.get('desc', '')
-                    author = note.get('nickname', '匿名用户')
-                    note_id = note.get('id', '')
-                    url = f"https://www.xiaohongshu.com/discovery/item/{note_id}" if note_id else ""
-                    
-                    posts.append({
-                        'title': title,
-                        'content': content[:500],
-                        'url': url,
-                        'author': author,
-                        'platform': 'xiaohongshu'
-                    })
-            else:
-                # 备用方案：直接从HTML中提取
-                items = soup.select('.note-item') or soup.select('.feed-item')
-                
-                for item in items:
-                    try:
-                        title_elem = item.select_one('.title') or item.select_one('.content-title')
-                        title = title_elem.get_text(strip=True) if title_elem else "无标题"
-                        
-                        content_elem = item.select_one('.desc') or item.select_one('.content')
-                        content = content_elem.get_text(strip=True) if content_elem else ""
-                        
-                        link_elem = item.select_one('a')
-                        link = link_elem.get('href', '') if link_elem else ""
-                        if link and not link.startswith('http'):
-                            link = f"https://www.xiaohongshu.com{link}"
-                        
-                        author_elem = item.select_one('.author') or item.select_one('.nickname')
-                        author = author_elem.get_text(strip=True) if author_elem else "匿名用户"
-                        
-                        posts.append({
-                            'title': title,
-                            'content': content[:500],
-                            'url': link,
-                            'author': author,
-                            'platform': 'xiaohongshu'
-                        })
-                        
-                    except Exception as e:
-                        logger.warning(f"Error parsing xiaohongshu item: {str(e)}")
-                        continue
-                
-        except Exception as e:
-            logger.error(f"Error parsing xiaohongshu page: {str(e)}")
-        
-        logger.info(f"Parsed {len(posts)} posts from xiaohongshu")
-        return posts
+        return self._parse_inline('xiaohongshu', html)
     
     def parse_zhihu(self, html: str) -> List[Dict]:
         """解析知乎面经
@@ -415,65 +333,10 @@ class SpiderEngine:
         Returns:
             List[Dict]: 解析出的面经列表
         """
-        soup = BeautifulSoup(html, 'html.parser')
-        posts = []
-        
-        try:
-            # 知乎搜索结果页
-            items = soup.select('.SearchResult-Card') or soup.select('.AnswerItem') or soup.select('.ContentItem')
-            
-            for item in items:
-                try:
-                    # 提取标题
-                    title_elem = item.select_one('.ContentItem-title') or item.select_one('.QuestionItem-title')
-                    title = title_elem.get_text(strip=True) if title_elem else "无标题"
-                    
-                    # 提取内容
-                    content_elem = item.select_one('.RichContent-inner') or item.select_one('.SearchResult-snippet')
-                    content = content_elem.get_text(strip=True) if content_elem else ""
-                    
-                    # 提取链接
-                    link_elem = item.select_one('a')
-                    link = link_elem.get('href', '') if link_elem else ""
-                    if link and not link.startswith('http'):
-                        link = f"https://www.zhihu.com{link}"
-                    
-                    # 提取作者
-                    author_elem = item.select_one('.AuthorInfo-name') or item.select_one('.UserLink-link')
-                    author = author_elem.get_text(strip=True) if author_elem else "匿名用户"
-                    
-                    # 过滤非面经内容
-                    if not any(keyword in title.lower() or keyword in content.lower() for keyword in ['面经', '面试', 'interview']):
-                        continue
-                    
-                    posts.append({
-                        'title': title,
-                        'content': content[:500],
-                        'url': link,
-                        'author': author,
-                        'platform': 'zhihu'
-                    })
-                    
-                except Exception as e:
-                    logger.warning(f"Error parsing zhihu item: {str(e)}")
-                    continue
-                    
-        except Exception as e:
-            logger.error(f"Error parsing zhihu page: {str(e)}")
-        
-        logger.info(f"Parsed {len(posts)} posts from zhihu")
-        return posts
+        return self._parse_inline('zhihu', html)
     
-    def search_posts(self, keywords: List[str], platform: str = 'all') -> List[Dict]:
-        """搜索各平台面经
-        
-        Args:
-            keywords: 搜索关键词列表
-            platform: 平台名称，'all'表示所有平台
-            
-        Returns:
-            List[Dict]: 搜索结果
-        """
+    def _search_urls(self, keywords: List[str], platform: str = 'all') -> List[Tuple[str, str]]:
+        """构建各平台搜索URL，返回 (url, 平台) 列表"""
         search_urls = []
         # 组合关键词，确保搜索面经
         search_query = " ".join(keywords[:3]) + " 面经"
@@ -481,44 +344,69 @@ class SpiderEngine:
         
         if platform == 'all' or platform == 'nowcoder':
             search_urls.append((
-                f'https://www.nowcoder.com/search?query={encoded_keyword}&type=post',
+                f"{self.base_urls['nowcoder']}/search?query={encoded_keyword}&type=post",
                 'nowcoder'
             ))
         
         if platform == 'all' or platform == 'xiaohongshu':
             search_urls.append((
-                f'https://www.xiaohongshu.com/search_result?keyword={encoded_keyword}',
+                f"{self.base_urls['xiaohongshu']}/search_result?keyword={encoded_keyword}",
                 'xiaohongshu'
             ))
         
         if platform == 'all' or platform == 'zhihu':
             search_urls.append((
-                f'https://www.zhihu.com/search?q={encoded_keyword}&type=content',
+                f"{self.base_urls['zhihu']}/search?q={encoded_keyword}&type=content",
                 'zhihu'
             ))
         
-        results = []
-        futures = []
-        
-        # 并发爬取各平台内容
-        for url, platform in search_urls:
-            futures.append(self.executor.submit(self.fetch_page, url))
-        
-        # 解析结果
-        parsers = {
+        return search_urls
+    
+    @property
+    def parsers(self) -> Dict:
+        return {
             'nowcoder': self.parse_nowcoder,
             'xiaohongshu': self.parse_xiaohongshu,
             'zhihu': self.parse_zhihu
         }
+    
+    def search_posts(self, keywords: List[str], platform: str = 'all') -> List[Dict]:
+        """搜索各平台面经
+        
+        Args:
+            keywords: 搜索关键词列表
+            platform: 平台名称，'all'表示所有平台
+            
+        Returns:
+            List[Dict]: 搜索结果
+        """
+        search_urls = self._search_urls(keywords, platform)
+        
+        # 并发爬取各平台内容
+        futures = {
+            self.executor.submit(self.fetch_page, url): platform
+            for url, platform in search_urls
+        }
         
-        for future, (url, platform) in zip(futures, search_urls):
+        if self.parse_stage is None:
+            results = []
+            parsers = self.parsers
+            for future, platform in futures.items():
+                html = future.result()
+                if html:
+                    results.extend(parsers[platform](html))
+            return results
+        
+        # 抓取完成一个就提交一个解析任务，解析队列满时在此阻塞形成背压
+        parse_futures = []
+        for future in as_completed(futures):
             html = future.result()
             if html:
-                parser = parsers.get(platform)
-                if parser:
-                    platform_results = parser(html)
-                    results.extend(platform_results)
+                parse_futures.append(self.parse_stage.submit(futures[future], html))
         
+        results = []
+        for future in parse_futures:
+            results.extend(record_to_dict(r) for r in future.result())
         return results
 
 class AnalysisEngine:
@@ -531,16 +419,8 @@ class AnalysisEngine:
         """
         self.spark_api = spark_api
     
-    def extract_keywords(self, jd: str) -> List[str]:
-        """从JD中提取关键词
-        
-        Args:
-            jd: 岗位JD文本
-            
-        Returns:
-            List[str]: 提取的关键词列表
-        """
-        prompt = f"""
+    def _keywords_prompt(self, jd: str) -> str:
+        return f"""
 请分析以下职位描述，提取5-8个关键技术词和面试考点，格式为逗号分隔的关键词列表，不要其他解释。
 
 职位描述:
@@ -548,8 +428,8 @@ class AnalysisEngine:
 
 关键词:
 """
-        
-        result = self.spark_api.chat(prompt, max_tokens=200, temperature=0.3)
+    
+    def _parse_keywords(self, result: Dict, jd: str) -> List[str]:
         if "error" in result:
             logger.error(f"Failed to extract keywords: {result['error']}")
             # 备用方案：简单规则提取
@@ -562,28 +442,25 @@ class AnalysisEngine:
         keywords = [kw.strip() for kw in content.split(',')]
         return [kw for kw in keywords if kw]
     
-    def analyze_posts(self, posts: List[Dict], jd: str) -> Dict:
-        """分析面经内容
+    def extract_keywords(self, jd: str) -> List[str]:
+        """从JD中提取关键词
         
         Args:
-            posts: 面经列表
-            jd: 岗位JD
+            jd: 岗位JD文本
             
         Returns:
-            Dict: 分析结果
+            List[str]: 提取的关键词列表
         """
-        if not posts:
-            return {
-                "error": "No posts to analyze"
-            }
-        
-        # 构建提示词
+        result = self.spark_api.chat(self._keywords_prompt(jd), max_tokens=200, temperature=0.3)
+        return self._parse_keywords(result, jd)
+    
+    def _analysis_prompt(self, posts: List[Dict], jd: str) -> str:
         posts_summary = "\n\n".join([
             f"【{p['platform']}】{p['title']}\n{p['content'][:300]}..."
             for p in posts[:10]  # 限制数量，避免超出token限制
         ])
         
-        prompt = f"""
+        return f"""
 作为一位资深技术面试专家，请根据以下岗位JD和收集到的面经进行分析：
 
 岗位JD:
@@ -600,8 +477,8 @@ class AnalysisEngine:
 
 请以结构化方式呈现，使用Markdown格式。
 """
-        
-        result = self.spark_api.chat(prompt, max_tokens=2048, temperature=0.5)
+    
+    def _analysis_result(self, result: Dict, posts: List[Dict]) -> Dict:
         if "error" in result:
             logger.error(f"Failed to analyze posts: {result['error']}")
             return {"error": result["error"]}
@@ -611,6 +488,24 @@ class AnalysisEngine:
             "post_count": len(posts),
             "platforms": list(set(p["platform"] for p in posts))
         }
+    
+    def analyze_posts(self, posts: List[Dict], jd: str) -> Dict:
+        """分析面经内容
+        
+        Args:
+            posts: 面经列表
+            jd: 岗位JD
+            
+        Returns:
+            Dict: 分析结果
+        """
+        if not posts:
+            return {
+                "error": "No posts to analyze"
+            }
+        
+        result = self.spark_api.chat(self._analysis_prompt(posts, jd), max_tokens=2048, temperature=0.5)
+        return self._analysis_result(result, posts)
 
 class MCPSystem:
     """MCP协议主系统"""
@@ -680,6 +575,279 @@ class MCPSystem:
             logger.error(f"Error processing JD: {str(e)}")
             return {"error": str(e)}
 
+class AsyncSparkAPI(SparkAPI):
+    """讯飞星火API异步封装，复用同一个aiohttp连接池"""
+    
+    def __init__(self, app_id: str, api_key: str, api_secret: str, domain: str = "generalv3",
+                 session: Optional[aiohttp.ClientSession] = None):
+        super().__init__(app_id, api_key, api_secret, domain)
+        self.session = session
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60))
+        return self.session
+    
+    @AsyncRetryStrategy(max_retries=3, delay=2, exceptions=(aiohttp.ClientError, asyncio.TimeoutError))
+    async def _post(self, url: str, data: Dict) -> Dict:
+        async with self._get_session().post(
+            url,
+            headers={'Content-Type': 'application/json'},
+            json=data
+        ) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+    
+    async def chat(self, prompt: str, max_tokens: int = 2048, temperature: float = 0.5) -> Dict:
+        """发送对话请求（异步）
+        
+        Args:
+            prompt: 用户输入的文本
+            max_tokens: 最大生成token数
+            temperature: 温度参数，控制随机性
+            
+        Returns:
+            Dict: 解析后的响应结果
+        """
+        data = self._build_request(prompt, max_tokens, temperature)
+        logger.info(f"Sending request to Spark API, prompt length: {len(prompt)}")
+        
+        try:
+            result = await self._post(self._create_auth_url(), data)
+            return self._parse_response(result)
+        except Exception as e:
+            logger.error(f"Spark API request failed: {str(e)}")
+            return {"error": str(e)}
+    
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+class AsyncSpiderEngine(SpiderEngine):
+    """异步多平台爬虫引擎，基于共享连接池的aiohttp会话"""
+    
+    def __init__(self, max_connections: int = 20, max_per_host: int = 4,
+                 parse_workers: Optional[int] = None):
+        """
+        Args:
+            max_connections: 连接池总连接数上限
+            max_per_host: 单个站点的并发连接数上限
+            parse_workers: 解析进程数，为空时在线程池中解析
+        """
+        super().__init__(parse_workers)
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.aio_session: Optional[aiohttp.ClientSession] = None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self.aio_session is None or self.aio_session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.max_per_host)
+            self.aio_session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=15)
+            )
+        return self.aio_session
+    
+    @AsyncRetryStrategy(max_retries=3, delay=2, exceptions=(aiohttp.ClientError, asyncio.TimeoutError))
+    async def _get(self, url: str, headers: Dict, proxy: Optional[str] = None) -> str:
+        async with self._get_session().get(url, headers=headers, proxy=proxy) as response:
+            response.raise_for_status()
+            return await response.text()
+    
+    async def fetch_page(self, url: str) -> str:
+        """获取页面内容（异步）
+        
+        Args:
+            url: 目标URL
+            
+        Returns:
+            str: 页面HTML内容，失败时返回空字符串
+        """
+        pool = self._identity_pool(url)
+        identity = pool.acquire()
+        headers = {
+            'User-Agent': identity.user_agent,
+            'Accept': 'text/html,application/xhtml+xml,application/xml',
+            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+            'Referer': 'https://www.google.com/'
+        }
+        
+        logger.info(f"Fetching page: {url}")
+        
+        try:
+            # 随机延迟，避免被反爬
+            await asyncio.sleep(random.uniform(*self.delay_range))
+            start = time.perf_counter()
+            text = await self._get(url, headers, identity.proxy)
+            pool.report(identity, time.perf_counter() - start, ok=True)
+            return text
+        except Exception as e:
+            pool.report(identity, None, ok=False, burned=getattr(e, "status", None) in BLOCKED_STATUSES)
+            logger.error(f"Failed to fetch {url}: {str(e)}")
+            return ""
+    
+    async def _fetch_and_parse(self, url: str, platform: str) -> List[Dict]:
+        html = await self.fetch_page(url)
+        parser = self.parsers.get(platform)
+        if not html or not parser:
+            return []
+        if self.parse_stage is not None:
+            return await self.parse_stage.parse(platform, html)
+        # 解析是CPU密集操作，放到线程池中执行，避免阻塞事件循环
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, parser, html)
+    
+    async def search_posts(self, keywords: List[str], platform: str = 'all') -> List[Dict]:
+        """搜索各平台面经（异步）
+        
+        Args:
+            keywords: 搜索关键词列表
+            platform: 平台名称，'all'表示所有平台
+            
+        Returns:
+            List[Dict]: 搜索结果
+        """
+        tasks = [self._fetch_and_parse(url, name) for url, name in self._search_urls(keywords, platform)]
+        results = []
+        for platform_results in await asyncio.gather(*tasks):
+            results.extend(platform_results)
+        return results
+    
+    async def close(self):
+        if self.aio_session is not None and not self.aio_session.closed:
+            await self.aio_session.close()
+        if self.parse_stage is not None:
+            self.parse_stage.shutdown(wait=False)
+
+class AsyncAnalysisEngine(AnalysisEngine):
+    """异步分析引擎，面经较多时切换为map-reduce层次化分析"""
+    
+    def __init__(self, spark_api: AsyncSparkAPI, hierarchical_threshold: int = 30):
+        """
+        Args:
+            spark_api: 讯飞星火异步API实例
+            hierarchical_threshold: 面经数超过该值时使用层次化分析
+        """
+        super().__init__(spark_api)
+        self.hierarchical_threshold = hierarchical_threshold
+        self.summarizer = MapReduceSummarizer(self._chat_text)
+    
+    async def _chat_text(self, prompt: str) -> Optional[str]:
+        result = await self.spark_api.chat(prompt, max_tokens=2048, temperature=0.5)
+        return result.get("content")
+    
+    async def extract_keywords(self, jd: str) -> List[str]:
+        """从JD中提取关键词（异步）"""
+        result = await self.spark_api.chat(self._keywords_prompt(jd), max_tokens=200, temperature=0.3)
+        return self._parse_keywords(result, jd)
+    
+    async def analyze_posts(self, posts: List[Dict], jd: str) -> Dict:
+        """分析面经内容（异步）"""
+        if not posts:
+            return {
+                "error": "No posts to analyze"
+            }
+        
+        if len(posts) > self.hierarchical_threshold:
+            result = await self.summarizer.summarize(posts, jd)
+            if "error" not in result:
+                result["platforms"] = list(set(p["platform"] for p in posts))
+            return result
+        
+        result = await self.spark_api.chat(self._analysis_prompt(posts, jd), max_tokens=2048, temperature=0.5)
+        return self._analysis_result(result, posts)
+
+class AsyncMCPSystem(MCPSystem):
+    """MCP协议主系统的异步版本，支持多个JD并发流水线处理"""
+    
+    def __init__(self, max_concurrency: int = 4):
+        """
+        Args:
+            max_concurrency: process_many 同时处理的JD数量上限
+        """
+        spark_app_id = os.getenv("SPARK_APP_ID", "")
+        spark_api_key = os.getenv("SPARK_API_KEY", "")
+        spark_api_secret = os.getenv("SPARK_API_SECRET", "")
+        
+        self.spark_api = AsyncSparkAPI(spark_app_id, spark_api_key, spark_api_secret)
+        # 批量处理JD时解析量大，默认启用进程池解析
+        self.spider = AsyncSpiderEngine(parse_workers=int(os.getenv("PARSE_WORKERS", os.cpu_count() or 1)))
+        self.analyzer = AsyncAnalysisEngine(self.spark_api)
+        self.max_concurrency = max_concurrency
+    
+    async def process_jd(self, job_description: str, platform: str = 'all') -> Dict:
+        """处理岗位JD，爬取并分析面经（异步）
+        
+        Args:
+            job_description: 岗位JD文本
+            platform: 指定平台，'all'表示所有平台
+            
+        Returns:
+            Dict: 处理结果
+        """
+        logger.info(f"Processing JD: {job_description[:50]}...")
+        
+        try:
+            keywords = await self.analyzer.extract_keywords(job_description)
+            logger.info(f"Extracted keywords: {keywords}")
+            
+            if not keywords:
+                return {"error": "Failed to extract keywords from JD"}
+            
+            posts = await self.spider.search_posts(keywords, platform)
+            logger.info(f"Found {len(posts)} posts")
+            
+            if not posts:
+                return {
+                    "job_description": job_description,
+                    "keywords": keywords,
+                    "error": "No relevant posts found"
+                }
+            
+            analysis_result = await self.analyzer.analyze_posts(posts, job_description)
+            
+            return {
+                'job_description': job_description,
+                'keywords': keywords,
+                'posts_count': len(posts),
+                'platforms': list(set(p['platform'] for p in posts)),
+                'posts_sample': posts[:5],
+                'analysis': analysis_result.get("analysis", "")
+            }
+            
+        except Exception as e:
+            logger.error(f"Error processing JD: {str(e)}")
+            return {"error": str(e)}
+    
+    async def process_many(self, jds: List[str], platform: str = 'all') -> List[Dict]:
+        """并发处理多个JD，同时进行的数量受 max_concurrency 限制
+        
+        Args:
+            jds: 岗位JD文本列表
+            platform: 指定平台，'all'表示所有平台
+            
+        Returns:
+            List[Dict]: 与输入顺序一致的处理结果
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def run(jd: str) -> Dict:
+            async with semaphore:
+                return await self.process_jd(jd, platform)
+        
+        return await asyncio.gather(*(run(jd) for jd in jds))
+    
+    async def close(self):
+        """关闭连接池"""
+        await self.spider.close()
+        await self.spark_api.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
 def create_env_file():
     """创建环境变量模板文件"""
     env_content = """# 讯飞星火API配置
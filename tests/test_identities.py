@@ -0,0 +1,143 @@
+"""
+爬虫身份池测试：通过本地替身代理驱动 IdentityPool
+
+三个出口：限流代理（每秒1个请求，超出返回429）、慢代理（每个请求延迟0.2秒）和正常代理。
+请求经代理转发到本地上游服务器，按真实耗时和状态码上报给身份池。
+"""
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.identities import BLOCKED_STATUSES, QUARANTINE_SECONDS, IdentityPool
+from benchmarks.proxy_server import ProxyServer
+
+SLOW_LATENCY = 0.2
+
+
+class _Upstream(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture(scope="module")
+def upstream():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Upstream)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield "http://127.0.0.1:%d/" % httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(scope="module")
+def proxies():
+    servers = {
+        "throttled": ProxyServer(rate=1).start(),
+        "slow": ProxyServer(latency=SLOW_LATENCY).start(),
+        "fast": ProxyServer().start(),
+    }
+    yield servers
+    for server in servers.values():
+        server.stop()
+
+
+def fetch(url: str, proxy: str) -> int:
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({"http": proxy}))
+    try:
+        with opener.open(url, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def drive(pool: IdentityPool, url: str, requests: int):
+    """按身份池的选择逐个发请求并上报耗时与结果"""
+    for _ in range(requests):
+        identity = pool.acquire()
+        start = time.perf_counter()
+        status = fetch(url, identity.proxy)
+        latency = time.perf_counter() - start
+        ok = status == 200
+        pool.report(identity, latency if ok else None, ok=ok, burned=status in BLOCKED_STATUSES)
+
+
+def by_proxy(pool: IdentityPool, proxies) -> dict:
+    names = {server.url: name for name, server in proxies.items()}
+    return {names[identity.proxy]: identity for identity in pool.identities}
+
+
+def test_throttled_proxy_is_quarantined(upstream, proxies):
+    pool = IdentityPool("test_quarantine", [server.url for server in proxies.values()], per_proxy=1)
+    identities = by_proxy(pool, proxies)
+    # 先让每个出口都有样本，限流代理在第二次请求时返回429
+    for identity in pool.identities:
+        for _ in range(2):
+            identity.in_flight += 1
+            status = fetch(upstream, identity.proxy)
+            pool.report(identity, None if status != 200 else 0.01, ok=status == 200,
+                        burned=status in BLOCKED_STATUSES)
+
+    now = time.monotonic()
+    assert proxies["throttled"].throttled >= 1
+    assert identities["throttled"].quarantined(now)
+    assert not identities["slow"].quarantined(now)
+    assert not identities["fast"].quarantined(now)
+    assert pool.quarantines == 1
+
+    # 隔离期间不再被选中
+    drive(pool, upstream, 10)
+    assert identities["throttled"].requests == 2
+
+    stats = {s["identity"]: s for s in pool.stats()}
+    assert stats[identities["throttled"].label]["quarantined_for_s"] > 0
+    assert stats[identities["throttled"].label]["strikes"] == 1
+
+
+def test_quarantine_doubles_on_repeat(upstream, proxies):
+    pool = IdentityPool("test_backoff", [proxies["throttled"].url], per_proxy=1)
+    identity = pool.identities[0]
+
+    pool.report(pool.acquire(), None, ok=False, burned=True)
+    first = identity.quarantined_until - time.monotonic()
+    # 期满后再次被封，隔离时间翻倍
+    identity.quarantined_until = 0.0
+    pool.report(pool.acquire(), None, ok=False, burned=True)
+    second = identity.quarantined_until - time.monotonic()
+
+    assert first == pytest.approx(QUARANTINE_SECONDS, abs=1)
+    assert second == pytest.approx(2 * QUARANTINE_SECONDS, abs=1)
+    assert identity.error_rate >= 0.5
+
+
+def test_fast_proxy_scores_higher_and_gets_more_traffic(upstream, proxies):
+    pool = IdentityPool("test_weighting", [proxies["slow"].url, proxies["fast"].url], per_proxy=1)
+    identities = by_proxy(pool, proxies)
+    drive(pool, upstream, 20)
+
+    slow, fast = identities["slow"], identities["fast"]
+    assert slow.latency >= SLOW_LATENCY
+    assert fast.latency < slow.latency
+    default_latency = pool._default_latency()
+    assert fast.score(default_latency) > 2 * slow.score(default_latency)
+
+    # 按得分加权随机选择，快代理被选中的次数明显更多
+    picks = {"slow": 0, "fast": 0}
+    for _ in range(500):
+        identity = pool.acquire()
+        picks["fast" if identity is fast else "slow"] += 1
+        pool.report(identity, None, ok=True)
+    assert picks["fast"] > 2 * picks["slow"]
+
+    ordered = sorted(pool.stats(), key=lambda s: s["score"], reverse=True)
+    assert ordered[0]["identity"] == fast.label